@@ -0,0 +1,105 @@
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from backend.core.metrics import POOL_PENDING
+
+# Execution layer for blocking work in the API.
+#   io pool  - threads for blocking I/O (the OpenAI call, one-off model/store loads)
+#   cpu pool - PDF parsing, spaCy and embedding; threads or processes (CPU_POOL=process)
+# Each pool also caps how many tasks may be queued or running. Past that cap
+# new requests are rejected with 429 instead of piling up behind a slow one.
+IO_WORKERS = int(os.getenv("IO_WORKERS", "8"))
+IO_MAX_PENDING = int(os.getenv("IO_MAX_PENDING", str(IO_WORKERS * 4)))
+
+CPU_POOL = os.getenv("CPU_POOL", "thread").lower()
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 2)))
+CPU_MAX_PENDING = int(os.getenv("CPU_MAX_PENDING", str(CPU_WORKERS * 4)))
+
+
+class StageSaturated(Exception):
+    """
+    Raised when a pool already has its maximum number of pending tasks.
+    """
+
+    def __init__(self, stage: str):
+        super().__init__(f"The {stage} stage is saturated, retry shortly")
+        self.stage = stage
+
+
+class StagePool:
+    """
+    An executor plus a cap on queued-or-running tasks, awaited from the event loop.
+    """
+
+    def __init__(self, name: str, executor: Executor, max_pending: int):
+        self.name = name
+        self.executor = executor
+        self.max_pending = max_pending
+        self.pending = 0
+
+    async def run(self, fn, *args, **kwargs):
+        # Only touched from the event loop thread, so a plain counter is enough
+        if self.pending >= self.max_pending:
+            raise StageSaturated(self.name)
+
+        self.pending += 1
+        POOL_PENDING.inc(pool=self.name)
+        try:
+            loop = asyncio.get_running_loop()
+            call = functools.partial(fn, *args, **kwargs)
+            if isinstance(self.executor, ThreadPoolExecutor):
+                # Carry the request's context over, so stage timings reach its Server-Timing header
+                call = functools.partial(contextvars.copy_context().run, call)
+            return await loop.run_in_executor(self.executor, call)
+        finally:
+            self.pending -= 1
+            POOL_PENDING.dec(pool=self.name)
+
+    async def run_when_free(self, fn, *args, poll: float = 0.05, **kwargs):
+        """
+        Like run(), but waits for room instead of raising StageSaturated. For work
+        a request has already committed to, e.g. the rest of a streamed batch.
+        """
+        while self.pending >= self.max_pending:
+            await asyncio.sleep(poll)
+        return await self.run(fn, *args, **kwargs)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_io_pool: StagePool | None = None
+_cpu_pool: StagePool | None = None
+
+
+def io_pool() -> StagePool:
+    global _io_pool
+    if _io_pool is None:
+        executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+        _io_pool = StagePool("io", executor, IO_MAX_PENDING)
+    return _io_pool
+
+
+def cpu_pool() -> StagePool:
+    global _cpu_pool
+    if _cpu_pool is None:
+        if CPU_POOL == "process":
+            # spawn, not fork: the server process already runs threads
+            # Each worker loads its own models lazily on first use
+            executor = ProcessPoolExecutor(max_workers=CPU_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+        _cpu_pool = StagePool("cpu", executor, CPU_MAX_PENDING)
+    return _cpu_pool
+
+
+def shutdown_pools():
+    global _io_pool, _cpu_pool
+    for pool in (_io_pool, _cpu_pool):
+        if pool is not None:
+            pool.shutdown()
+    _io_pool = _cpu_pool = None
@@ -0,0 +1,83 @@
+import asyncio
+import os
+from collections.abc import Callable
+
+from backend.core.analyzer import analyze_skills
+from backend.core.catalog import get_catalog
+from backend.core.jobs import JobQueue, SQLiteJobTable
+from backend.core.metrics import stage
+from backend.core.parser import extract_user_skills_manual, parse_resume
+from backend.core.recommender import FallbackRecommendations, aget_recommendations
+
+# Background analysis jobs (POST /api/jobs). JOB_DB=none keeps them in memory only;
+# point it at a database (e.g. sqlite:///backend/.cache/jobs.db) to survive restarts.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "100"))
+JOB_TTL = float(os.getenv("JOB_TTL", "3600"))   # seconds a finished job stays pollable
+JOB_DB = os.getenv("JOB_DB", "none")
+
+# The API's event loop (see start_jobs). Job recommendations run there, so they
+# share its LLM client, timeouts, retry budget and circuit breaker.
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def recommend(missing: list[str]) -> dict:
+    """
+    aget_recommendations from a job worker thread.
+    """
+    if _loop is None or _loop.is_closed():
+        # Outside the API (scripts, tests): a loop of its own
+        return asyncio.run(aget_recommendations(missing))
+    return asyncio.run_coroutine_threadsafe(aget_recommendations(missing), _loop).result()
+
+
+def run_analysis_job(payload: dict, pdf: bytes | None, update: Callable[[dict], None]) -> None:
+    """
+    The /api/analyze pipeline, publishing each part of the result as soon as it exists:
+    skills, then score and missing skills, then recommendations.
+    """
+    catalog = get_catalog()
+    role = payload["role"]
+    if role not in catalog.roles:
+        raise ValueError(f"Unknown role: {role}")
+
+    with stage("parse"):
+        if pdf is not None:
+            user_skills = parse_resume(pdf, catalog.known_skills)
+        else:
+            user_skills = extract_user_skills_manual(payload["manual_skills"], catalog.known_skills)
+    job_skills = catalog.roles[role]
+    update({"user_skills": user_skills, "job_skills": job_skills, "catalog_version": catalog.version})
+
+    with stage("analysis"):
+        analysis = analyze_skills(user_skills, job_skills)
+    update({
+        "match_score": analysis.score,
+        "missing_skills": analysis.missing,
+        "similarity_details": analysis.details,
+    })
+
+    # While the LLM is unavailable the job still finishes, flagged as a fallback
+    with stage("recommendations"):
+        recs = recommend(analysis.missing)
+    update({"recommendations": recs, "recommendations_fallback": isinstance(recs, FallbackRecommendations)})
+
+
+_queue: JobQueue | None = None
+
+
+def start_jobs() -> None:
+    """
+    Start the job workers. Call from the API's event loop.
+    """
+    global _loop
+    _loop = asyncio.get_running_loop()
+    job_queue().start()
+
+
+def job_queue() -> JobQueue:
+    global _queue
+    if _queue is None:
+        table = None if JOB_DB.lower() == "none" else SQLiteJobTable(JOB_DB)
+        _queue = JobQueue(run_analysis_job, JOB_WORKERS, JOB_MAX_QUEUED, JOB_TTL, table)
+    return _queue
@@ -1,5 +1,114 @@
-from fastapi import FastAPI
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from backend.core.catalog import catalog_service, get_catalog
+from backend.core.embedder import get_model, get_store
+from backend.core.metrics import (
+    METRICS_ENABLED,
+    REGISTRY,
+    REQUEST_SECONDS,
+    REQUESTS,
+    REQUESTS_IN_FLIGHT,
+    SERVER_TIMING,
+    server_timing,
+    start_request_timings,
+)
+from backend.core.parser import get_nlp
+
+from .execution import StageSaturated, shutdown_pools
+from .jobs import job_queue, start_jobs
 from .routes import router
 
-app = FastAPI(title="AI Skill Gap Analyzer")
+logger = logging.getLogger(__name__)
+
+# How models are loaded at startup:
+#   background - start serving immediately, load models in a thread (default)
+#   blocking   - finish loading before accepting requests
+#   off        - load lazily on the first request that needs them
+WARMUP_MODELS = os.getenv("WARMUP_MODELS", "background").lower()
+
+
+def warm_up():
+    """
+    Load spaCy, the SentenceTransformer model, the embedding store and the role matrix.
+    """
+    try:
+        get_nlp()
+        get_model()
+        get_store()
+        get_catalog().role_matrix()
+        logger.info("Model warm-up finished")
+    except Exception:
+        # Requests will retry the lazy load; /api/ready keeps reporting what is missing
+        logger.exception("Model warm-up failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_MODELS == "blocking":
+        await run_in_threadpool(warm_up)
+    elif WARMUP_MODELS == "background":
+        threading.Thread(target=warm_up, name="model-warmup", daemon=True).start()
+    # Pick up edits to roles.json / known_skills.json without a restart
+    catalog_service().start()
+    start_jobs()
+    yield
+    # Off the loop: running jobs may still be waiting for recommendations on it
+    await run_in_threadpool(job_queue().stop)
+    catalog_service().stop()
+    shutdown_pools()
+
+
+app = FastAPI(title="AI Skill Gap Analyzer", lifespan=lifespan)
 app.include_router(router, prefix="/api")
+
+
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    """
+    Count requests, track in-flight ones and time them per endpoint.
+    With SERVER_TIMING=on the stage timings are also returned in a Server-Timing header.
+    """
+    if not METRICS_ENABLED:
+        return await call_next(request)
+
+    timings = start_request_timings()
+    REQUESTS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        REQUESTS_IN_FLIGHT.dec()
+        # Label by endpoint function, not raw path, to keep label values bounded
+        endpoint = request.scope.get("endpoint")
+        handler = endpoint.__name__ if endpoint is not None else "unmatched"
+        REQUESTS.inc(handler=handler, status=status)
+        REQUEST_SECONDS.observe(elapsed, handler=handler)
+
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = server_timing(timings, elapsed)
+    return response
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Prometheus text exposition of every counter, gauge and histogram.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.exception_handler(StageSaturated)
+async def saturated_handler(request: Request, exc: StageSaturated):
+    # Backpressure: tell clients to back off instead of queueing without bound
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "1"})
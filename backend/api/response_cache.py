@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
+
+from backend.core import parser, recommender
+from backend.core.config import CACHE_DIR, EMBEDDING_BACKEND, EMBEDDING_MODEL
+from backend.core.lru import LRUCache
+from backend.core.metrics import CACHE_EVENTS
+from backend.core.rec_cache import RecommendationCache, SQLiteTier
+
+# Whole /analyze responses, keyed by everything that decides their content:
+# the input (PDF SHA-256 or manual skill list), role, catalog version and the
+# model/prompt settings. RESPONSE_CACHE_DB=on (or a SQLAlchemy URL) adds a
+# SQLite tier; RESPONSE_CACHE_SIZE=0 turns the cache off.
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(24 * 3600)))
+RESPONSE_CACHE_DB = os.getenv("RESPONSE_CACHE_DB", "none")
+
+_cache: RecommendationCache | None = None
+
+
+def response_cache() -> RecommendationCache | None:
+    global _cache
+    if RESPONSE_CACHE_SIZE <= 0:
+        return None
+    if _cache is None:
+        disk = None
+        if RESPONSE_CACHE_DB.lower() != "none":
+            url = RESPONSE_CACHE_DB if "://" in RESPONSE_CACHE_DB else f"sqlite:///{CACHE_DIR / 'responses.db'}"
+            disk = SQLiteTier(url, ttl=RESPONSE_CACHE_TTL, table="responses")
+        _cache = RecommendationCache(LRUCache(max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL), disk, name="responses")
+    return _cache
+
+
+def _package_version(name: str) -> str:
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return "none"
+
+
+@lru_cache(maxsize=1)
+def model_versions() -> tuple:
+    """
+    Settings and package versions that change an analysis for the same input.
+    """
+    return (
+        EMBEDDING_MODEL,
+        EMBEDDING_BACKEND,
+        _package_version("en_core_web_sm"),
+        parser.SKILL_NER,
+        parser.SEMANTIC_NORMALIZE,
+        parser.SEMANTIC_CUTOFF,
+        recommender.MODEL,
+        recommender.REC_MODE,
+        recommender.PROMPT_VERSION,
+        recommender.PER_SKILL_PROMPT_VERSION,
+    )
+
+
+def normalize_manual(manual_skills: str) -> list[str]:
+    # Extraction returns a sorted set of stripped entries, so order, surrounding
+    # spaces and repeats never change it. Case can: unknown skills keep their spelling.
+    return sorted({s.strip() for s in manual_skills.split(",") if s.strip()})
+
+
+def analysis_key(pdf_bytes: bytes | None, manual_skills: str | None, role: str, catalog_version: str) -> str:
+    if pdf_bytes is not None:
+        source = ["pdf", hashlib.sha256(pdf_bytes).hexdigest()]
+    else:
+        source = ["manual", normalize_manual(manual_skills or "")]
+    payload = json.dumps([source, role, catalog_version, model_versions()], default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def etag_for(body: dict) -> str:
+    digest = hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    True if an If-None-Match header value names this ETag (or is "*").
+    """
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def count_miss() -> None:
+    # RecommendationCache.get only counts hits
+    CACHE_EVENTS.inc(cache="responses", result="miss")
@@ -1,84 +1,488 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from typing import List, Optional
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Annotated
 
-from backend.core.parser import load_known_skills
+from fastapi import (
+    APIRouter,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
 
+from backend.core.analyzer import (
+    analyze_skills,
+    rank_roles,
+)
+from backend.core.batch import (
+    BATCH_GROUP_SIZE,
+    BATCH_MAX_IN_FLIGHT,
+    analyze_group,
+    iter_pdfs,
+    take,
+)
+from backend.core.candidates import STORE_CANDIDATES, get_candidate_store
+from backend.core.catalog import get_catalog
+from backend.core.embedder import embedding_stats, model_loaded, store_loaded
+from backend.core.jobs import QueueFull
+from backend.core.metrics import stage
 from backend.core.parser import (
-    extract_text_from_pdf,
-    extract_skills,
+    MAX_PDF_BYTES,
+    PDFLimitError,
     extract_user_skills_manual,
+    nlp_loaded,
+    parse_resume,
 )
-from backend.core.analyzer import (
-    load_role_skills,
-    compute_match_score,
-    compute_missing,
-    compute_similarity_details,
+from backend.core.recommender import FallbackRecommendations, aget_recommendations
+
+from .execution import StageSaturated, cpu_pool, io_pool
+from .jobs import job_queue
+from .response_cache import (
+    analysis_key,
+    count_miss,
+    etag_for,
+    etag_matches,
+    response_cache,
+)
+from .schemas import (
+    AnalyzeResponse,
+    CandidateMatch,
+    CandidatesResponse,
+    JobStatus,
+    RankRolesResponse,
+    RoleRanking,
 )
-from backend.core.recommender import get_recommendations
-from .schemas import AnalyzeResponse
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+async def read_pdf(file: UploadFile) -> bytes:
+    # Reject oversized uploads before reading them into memory
+    if file.size is not None and file.size > MAX_PDF_BYTES:
+        raise HTTPException(status_code=413, detail=f"PDF is larger than {MAX_PDF_BYTES} bytes")
+    return await file.read()
+
+
+async def read_user_skills(
+    file: UploadFile | None,
+    manual_skills: str | None,
+    known_skills: list[str],
+    pdf_bytes: bytes | None = None,
+) -> list[str]:
+    """
+    Get user skills from either an uploaded resume or comma-separated manual input.
+    Parsing runs on the CPU pool so the event loop stays free.
+    Pass pdf_bytes if the upload has already been read.
+    """
+    if file:
+        if pdf_bytes is None:
+            pdf_bytes = await read_pdf(file)
+        try:
+            skills = await cpu_pool().run(parse_resume, pdf_bytes, known_skills)
+        except PDFLimitError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+
+        if STORE_CANDIDATES:
+            # Keep the resume for candidate search; the same PDF uploaded again replaces itself
+            try:
+                candidate_id = hashlib.sha256(pdf_bytes).hexdigest()
+                await io_pool().run(_keep_candidate, candidate_id, file.filename or "resume.pdf", skills)
+            except Exception:
+                logger.exception("Could not add the resume to the candidate store")
+        return skills
 
-# Load role definitions once at startup
-roles_map = load_role_skills()
+    if not manual_skills:
+        raise HTTPException(status_code=400, detail="Manual skills input is missing")
 
+    return await cpu_pool().run(extract_user_skills_manual, manual_skills, known_skills)
 
-@router.get("/roles", response_model=List[str])
-def list_roles():
+
+@router.get("/roles", response_model=list[str])
+def list_roles(response: Response):
     """
     Return all available role names for the frontend dropdown.
     """
-    return list(roles_map.keys())
+    catalog = get_catalog()
+    response.headers["X-Catalog-Version"] = catalog.version
+    return list(catalog.roles.keys())
+
+
+def _keep_candidate(candidate_id: str, name: str, skills: list[str]) -> None:
+    # The first use opens the database and reads it, so this runs on the I/O pool
+    get_candidate_store().add(candidate_id, name, skills)
+
+
+def _search_candidates(role_skills: list[str], top_k: int) -> tuple[list, int]:
+    store = get_candidate_store()
+    return store.search(role_skills, top_k=top_k), len(store)
+
+
+@router.get("/roles/{role}/candidates", response_model=CandidatesResponse)
+async def role_candidates(role: str, top_k: int = 10):
+    """
+    The top_k stored candidates (previously analyzed resumes) for a role, best first.
+    """
+    catalog = get_catalog()
+    if role not in catalog.roles:
+        raise HTTPException(status_code=404, detail="Unknown role")
+    if top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1")
+    if not STORE_CANDIDATES:
+        raise HTTPException(status_code=404, detail="Candidate search is disabled (STORE_CANDIDATES=off)")
+
+    # The store lives in this process, so it is searched on an I/O thread (NumPy releases the GIL)
+    matches, total = await io_pool().run(_search_candidates, catalog.roles[role], top_k)
+    return CandidatesResponse(
+        role=role,
+        total=total,
+        candidates=[
+            CandidateMatch(candidate_id=m.candidate_id, name=m.name, match_score=m.score, missing_skills=m.missing)
+            for m in matches
+        ],
+        catalog_version=catalog.version,
+    )
+
+
+@router.get("/ready")
+def ready(response: Response):
+    """
+    Readiness probe: reports which models are loaded, 503 until all of them are.
+    """
+    models = {
+        "spacy": nlp_loaded(),
+        "sentence_transformer": model_loaded(),
+        "embedding_store": store_loaded(),
+        "role_matrix": get_catalog().role_matrix_loaded(),
+    }
+    is_ready = all(models.values())
+    if not is_ready:
+        response.status_code = 503
+    return {"ready": is_ready, "models": models}
+
+
+@router.get("/stats")
+def stats():
+    """
+    Embedding cache hit ratio and model batch-size / latency histograms.
+    """
+    return {"embeddings": embedding_stats()}
 
 
 @router.post("/analyze", response_model=AnalyzeResponse)
 async def analyze(
-    file: Optional[UploadFile] = File(None),
+    response: Response,
+    file: Annotated[UploadFile | None, File()] = None,
     role: str = Form(...),
-    manual_skills: Optional[str] = Form(None),
+    manual_skills: str | None = Form(None),
+    if_none_match: str | None = Header(None),
 ):
     """
     Analyze a resume PDF or manual skills list against a chosen role.
     Returns match score, extracted or manual user skills, missing skills, and LLM recommendations.
+    Responses carry an ETag; repeats of the same input are served from the response
+    cache, and a matching If-None-Match gets 304 Not Modified.
     """
 
-    # Step 1: Get user skills from either resume or manual input
-    if file:
-        pdf_bytes = await file.read()
-        text = extract_text_from_pdf(pdf_bytes)
-
-        # Build flat list of known skills for normalization
-        known_skills = load_known_skills()
-        user_skills = extract_skills(text, known_skills)
-    else:
-        if not manual_skills:
-            raise HTTPException(status_code=400, detail="Manual skills input is missing")
-
-        # Build flat list of known skills for normalization
-        known_skills = load_known_skills()
-        user_skills = extract_user_skills_manual(manual_skills, known_skills)
-
-    # Step 2: Validate role
-    if role not in roles_map:
+    # One catalog snapshot for the whole request, even if a reload lands midway
+    catalog = get_catalog()
+
+    # Step 1: Validate role
+    if role not in catalog.roles:
         raise HTTPException(status_code=400, detail="Unknown role")
 
-    # Step 3: Analyze
-    role_skills = roles_map[role]
-    score = compute_match_score(user_skills, role_skills)
-    missing = compute_missing(user_skills, role_skills)
-    job_skills = role_skills
+    # Step 2: Look the input up in the response cache (hashing the PDF is all it costs)
+    pdf_bytes = await read_pdf(file) if file else None
+    if pdf_bytes is None and not manual_skills:
+        raise HTTPException(status_code=400, detail="Manual skills input is missing")
+    cache = response_cache()
+    key = analysis_key(pdf_bytes, manual_skills, role, catalog.version)
+    # The cache may read its SQLite tier, so lookups run on the I/O pool like stores do
+    cached = await io_pool().run(cache.get, key) if cache is not None else None
+    if cached is not None:
+        response.headers["X-Cache"] = "hit"
+        return _conditional(cached["body"], cached["etag"], if_none_match, response)
+    if cache is not None:
+        count_miss()
+
+    # Step 3: Get user skills from either resume or manual input
+    with stage("parse"):
+        user_skills = await read_user_skills(file, manual_skills, catalog.known_skills, pdf_bytes)
 
-    # compute per-skill similarity details
-    similarity_details = compute_similarity_details(user_skills, job_skills)
+    # Step 4: Analyze (embedding and similarity happen once for score, missing and details)
+    job_skills = catalog.roles[role]
+    with stage("analysis"):
+        analysis = await cpu_pool().run(analyze_skills, user_skills, job_skills)
 
-    recs = get_recommendations(missing)
+    # Async OpenAI call: pooled connections, timeouts and retries, no thread needed
+    with stage("recommendations"):
+        recs = await aget_recommendations(analysis.missing)
 
-    # Step 4: Return response
-    return AnalyzeResponse(
-        match_score=score,
+    # Step 5: Return response; fallback recommendations are never cached
+    body = AnalyzeResponse(
+        match_score=analysis.score,
         user_skills=user_skills,
-        job_skills=job_skills,                
-        missing_skills=missing,
+        job_skills=job_skills,
+        missing_skills=analysis.missing,
         recommendations=recs,
-        similarity_details=similarity_details,
-    )
\ No newline at end of file
+        recommendations_fallback=isinstance(recs, FallbackRecommendations),
+        similarity_details=analysis.details,
+        catalog_version=catalog.version,
+    ).model_dump()
+    if isinstance(recs, FallbackRecommendations):
+        return body
+
+    etag = etag_for(body)
+    if cache is not None:
+        await io_pool().run(cache.set, key, {"etag": etag, "body": body})
+        response.headers["X-Cache"] = "miss"
+    return _conditional(body, etag, if_none_match, response)
+
+
+def _conditional(body: dict, etag: str, if_none_match: str | None, response: Response):
+    # 304 with no body if the client already has this representation
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={**headers, **response.headers})
+    response.headers.update(headers)
+    return body
+
+
+def _sse(event: str, data: dict) -> str:
+    # One Server-Sent Events message
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/analyze/stream")
+async def analyze_stream(
+    file: Annotated[UploadFile | None, File()] = None,
+    role: str = Form(...),
+    manual_skills: str | None = Form(None),
+):
+    """
+    Same inputs as /analyze, answered as Server-Sent Events in pipeline order:
+      skills          - {"user_skills", "job_skills"}
+      analysis        - {"match_score", "missing_skills"}
+      similarity      - {"similarity_details"}
+      recommendations - {"recommendations"}
+      result          - the full AnalyzeResponse
+    A failure after the stream has started is sent as an "error" event {"detail"}.
+    Shares the response cache with /analyze; a hit sends every event at once.
+    """
+    catalog = get_catalog()
+    if role not in catalog.roles:
+        raise HTTPException(status_code=400, detail="Unknown role")
+    # no-cache and no proxy buffering, so each event reaches the client as it is sent
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Catalog-Version": catalog.version}
+
+    pdf_bytes = await read_pdf(file) if file else None
+    if pdf_bytes is None and not manual_skills:
+        raise HTTPException(status_code=400, detail="Manual skills input is missing")
+    cache = response_cache()
+    key = analysis_key(pdf_bytes, manual_skills, role, catalog.version)
+    # The cache may read its SQLite tier, so lookups run on the I/O pool like stores do
+    cached = await io_pool().run(cache.get, key) if cache is not None else None
+    if cached is not None:
+        return StreamingResponse(
+            iter(_replay(cached["body"])), media_type="text/event-stream", headers={**headers, "X-Cache": "hit"}
+        )
+    if cache is not None:
+        count_miss()
+
+    # Parse before streaming so bad input still gets a proper status code
+    with stage("parse"):
+        user_skills = await read_user_skills(file, manual_skills, catalog.known_skills, pdf_bytes)
+    job_skills = catalog.roles[role]
+
+    async def events():
+        yield _sse("skills", {"user_skills": user_skills, "job_skills": job_skills})
+        try:
+            with stage("analysis"):
+                analysis = await cpu_pool().run(analyze_skills, user_skills, job_skills)
+            yield _sse("analysis", {"match_score": analysis.score, "missing_skills": analysis.missing})
+            yield _sse("similarity", {"similarity_details": analysis.details})
+
+            with stage("recommendations"):
+                recs = await aget_recommendations(analysis.missing)
+            yield _sse("recommendations", {"recommendations": recs})
+
+            result = AnalyzeResponse(
+                match_score=analysis.score,
+                user_skills=user_skills,
+                job_skills=job_skills,
+                missing_skills=analysis.missing,
+                recommendations=recs,
+                recommendations_fallback=isinstance(recs, FallbackRecommendations),
+                similarity_details=analysis.details,
+                catalog_version=catalog.version,
+            )
+            body = result.model_dump()
+            yield _sse("result", body)
+
+            if cache is not None and not isinstance(recs, FallbackRecommendations):
+                await io_pool().run(cache.set, key, {"etag": etag_for(body), "body": body})
+        except (StageSaturated, OSError, RuntimeError, ValueError) as e:
+            yield _sse("error", {"detail": str(e)})
+        except Exception:
+            # Anything else is a bug: the client still gets an error event, the log gets the traceback
+            logger.exception("Streamed analysis failed")
+            yield _sse("error", {"detail": "Internal error"})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+
+def _replay(body: dict) -> list[str]:
+    # The events /analyze/stream sends, rebuilt from a cached AnalyzeResponse
+    return [
+        _sse("skills", {"user_skills": body["user_skills"], "job_skills": body["job_skills"]}),
+        _sse("analysis", {"match_score": body["match_score"], "missing_skills": body["missing_skills"]}),
+        _sse("similarity", {"similarity_details": body["similarity_details"]}),
+        _sse("recommendations", {"recommendations": body["recommendations"]}),
+        _sse("result", body),
+    ]
+
+
+@router.post("/jobs", response_model=JobStatus, status_code=202)
+async def submit_job(
+    request: Request,
+    response: Response,
+    file: Annotated[UploadFile | None, File()] = None,
+    role: str = Form(...),
+    manual_skills: str | None = Form(None),
+):
+    """
+    Queue an analysis (same inputs as /analyze) and return its job id right away.
+    Poll GET /api/jobs/{job_id} for status and partial results.
+    """
+    if role not in get_catalog().roles:
+        raise HTTPException(status_code=400, detail="Unknown role")
+
+    pdf = None
+    if file:
+        pdf = await read_pdf(file)
+    elif not manual_skills:
+        raise HTTPException(status_code=400, detail="Manual skills input is missing")
+
+    try:
+        job = job_queue().submit({"role": role, "manual_skills": manual_skills}, pdf)
+    except QueueFull:
+        raise StageSaturated("jobs")
+
+    response.headers["Location"] = str(request.url_for("get_job", job_id=job.id))
+    return job.view()
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+def get_job(job_id: str):
+    """
+    Status of a queued analysis; score and missing skills appear before recommendations.
+    """
+    job = job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+
+@router.post("/rank-roles", response_model=RankRolesResponse)
+async def rank_all_roles(
+    file: Annotated[UploadFile | None, File()] = None,
+    manual_skills: str | None = Form(None),
+    roles: str | None = Form(None),
+    top_k: int = Form(5),
+):
+    """
+    Parse a resume (or manual skills) once and score it against every role,
+    or against a comma-separated subset of roles.
+    Returns the top_k roles by match score with their missing skills.
+    """
+    catalog = get_catalog()
+    user_skills = await read_user_skills(file, manual_skills, catalog.known_skills)
+
+    subset = None
+    if roles:
+        subset = list(dict.fromkeys(r.strip() for r in roles.split(",") if r.strip()))
+        unknown = [r for r in subset if r not in catalog.roles]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown role(s): {', '.join(unknown)}")
+
+    if top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1")
+
+    # The matrix is built (once) in this process and scored here on a thread: the
+    # matmul releases the GIL, while the cpu pool's processes (CPU_POOL=process)
+    # would be sent a pickled copy of the whole matrix on every request
+    matrix = await io_pool().run(catalog.role_matrix)
+    matches = await io_pool().run(rank_roles, user_skills, matrix, roles=subset, top_k=top_k)
+
+    return RankRolesResponse(
+        user_skills=user_skills,
+        rankings=[
+            RoleRanking(role=m.role, match_score=m.score, missing_skills=m.missing)
+            for m in matches
+        ],
+        catalog_version=catalog.version,
+    )
+
+
+@router.post("/analyze/batch")
+async def analyze_many(
+    files: Annotated[list[UploadFile], File()],
+    role: str = Form(...),
+):
+    """
+    Analyze many resume PDFs (or zip archives of PDFs) against one role.
+    Streams one NDJSON line per resume as soon as its group is scored:
+    {"filename", "match_score", "user_skills", "missing_skills"} or {"filename", "error"}.
+    Uploads are read on the I/O pool and groups of resumes analyzed on the CPU pool.
+    """
+    catalog = get_catalog()
+    if role not in catalog.roles:
+        raise HTTPException(status_code=400, detail="Unknown role")
+    # The whole batch uses the catalog snapshot it started with
+    role_skills, known_skills = catalog.roles[role], catalog.known_skills
+
+    docs = (doc for upload in files for doc in iter_pdfs(upload.filename or "upload.pdf", upload.file))
+
+    # The first group runs before the response starts, so a saturated pool is still a 429
+    first = await io_pool().run(take, docs, BATCH_GROUP_SIZE)
+    first_results = await cpu_pool().run(analyze_group, first, role_skills, known_skills)
+
+    async def analyze_next(group):
+        return await cpu_pool().run_when_free(analyze_group, group, role_skills, known_skills)
+
+    async def lines():
+        for result in first_results:
+            yield json.dumps(result) + "\n"
+
+        # Once streaming, later groups wait for room in the pools rather than fail
+        groups_in_flight = max(1, BATCH_MAX_IN_FLIGHT // BATCH_GROUP_SIZE)
+        pending = set()
+        exhausted = len(first) < BATCH_GROUP_SIZE
+        try:
+            while True:
+                while not exhausted and len(pending) < groups_in_flight:
+                    group = await io_pool().run_when_free(take, docs, BATCH_GROUP_SIZE)
+                    exhausted = len(group) < BATCH_GROUP_SIZE
+                    if group:
+                        pending.add(asyncio.ensure_future(analyze_next(group)))
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    for result in task.result():
+                        yield json.dumps(result) + "\n"
+        finally:
+            for task in pending:
+                task.cancel()
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"X-Catalog-Version": catalog.version},
+    )
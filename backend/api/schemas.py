@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+
 
 class SimilarityDetail(BaseModel):
     matched_skill: str
@@ -7,8 +7,52 @@ class SimilarityDetail(BaseModel):
 
 class AnalyzeResponse(BaseModel):
     match_score: float
-    user_skills: List[str]
-    job_skills: List[str]  
-    missing_skills: List[str]
-    recommendations: Dict[str, List[str]]
-    similarity_details: Optional[Dict[str, SimilarityDetail]] = None
\ No newline at end of file
+    user_skills: list[str]
+    job_skills: list[str]  
+    missing_skills: list[str]
+    recommendations: dict[str, list[str]]
+    recommendations_fallback: bool = False   # True if the LLM was unavailable
+    similarity_details: dict[str, SimilarityDetail] | None = None
+    catalog_version: str | None = None
+
+
+class JobResult(BaseModel):
+    # Filled in stage by stage while the job runs
+    user_skills: list[str] | None = None
+    job_skills: list[str] | None = None
+    match_score: float | None = None
+    missing_skills: list[str] | None = None
+    similarity_details: dict[str, SimilarityDetail] | None = None
+    recommendations: dict[str, list[str]] | None = None
+    recommendations_fallback: bool | None = None   # True if the LLM was unavailable
+    catalog_version: str | None = None
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str   # queued, running, done or failed
+    result: JobResult = JobResult()
+    error: str | None = None
+
+
+class RoleRanking(BaseModel):
+    role: str
+    match_score: float
+    missing_skills: list[str]
+
+class RankRolesResponse(BaseModel):
+    user_skills: list[str]
+    rankings: list[RoleRanking]
+    catalog_version: str | None = None
+
+
+class CandidateMatch(BaseModel):
+    candidate_id: str
+    name: str
+    match_score: float
+    missing_skills: list[str]
+
+class CandidatesResponse(BaseModel):
+    role: str
+    total: int
+    candidates: list[CandidateMatch]
+    catalog_version: str | None = None
@@ -1,9 +1,13 @@
 import json
-from pathlib import Path # safer and cleaner way to handle file paths than regular strings
+from dataclasses import dataclass
+from pathlib import Path
+
 import numpy as np
+
+from .config import ROLES_PATH
 from .embedder import get_embeddings
+from .metrics import stage
 
-ROLES_PATH = Path(__file__).parent.parent / "roles.json"
 
 # Load job roles and their required skills from roles.json
 # Returns a dictionary like: { "Data Scientist": ["Python", "SQL", ...], ... }
@@ -12,85 +16,191 @@ def load_role_skills(path: Path = ROLES_PATH) -> dict[str, list[str]]:
         return json.load(f)
     
 
-def compute_missing(user_skills: list[str], role_skills: list[str], threshold: float = 0.8) -> list[str]:
+@dataclass(frozen=True)
+class SkillAnalysis:
     """
-    Return list of role skills that are not semantically similar to any user skill.
-    Uses cosine similarity to find best matches. Anything below threshold is 'missing'.
+    Everything the API reports about one user/role comparison:
+      - score: mean best similarity per role skill, as a percentage
+      - missing: sorted role skills whose best similarity is below the threshold
+      - details: best-matching user skill and its similarity (%) per role skill
     """
-    if not role_skills or not user_skills:
-        return sorted(role_skills)
+    score: float
+    missing: list[str]
+    details: dict[str, dict[str, float | str]]
 
-    # Get embeddings
-    all_skills = list(set(user_skills + role_skills))
-    embeddings = get_embeddings(all_skills)
-    skill_to_index = {s: i for i, s in enumerate(all_skills)}
 
-    missing = []
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    # L2-normalize each row so a dot product is a cosine similarity
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-8)
 
-    for role_skill in role_skills:
-        best_score = 0.0
-        r_idx = skill_to_index[role_skill]
-        r_vec = embeddings[r_idx]
-        r_norm = np.linalg.norm(r_vec)
 
-        for user_skill in user_skills:
-            # Case-insensitive exact match → full credit
-            if user_skill.strip().lower() == role_skill.strip().lower():
-                best_score = 1.0
-                break
-
-            u_idx = skill_to_index[user_skill]
-            u_vec = embeddings[u_idx]
-            u_norm = np.linalg.norm(u_vec)
+def _exact_match_mask(user_skills: list[str], role_skills: list[str]) -> np.ndarray:
+    """
+    Boolean (role x user) mask of case-insensitive exact matches.
+    Skills are mapped to integer ids so the comparison is a single broadcast.
+    """
+    ids: dict[str, int] = {}
+    role_ids = np.array([ids.setdefault(s.strip().lower(), len(ids)) for s in role_skills])
+    user_ids = np.array([ids.setdefault(s.strip().lower(), len(ids)) for s in user_skills])
+    return role_ids[:, None] == user_ids[None, :]
 
-            sim = float(np.dot(r_vec, u_vec) / (r_norm * u_norm + 1e-8))
-            best_score = max(best_score, sim)
 
-        if best_score < threshold:
-            missing.append(role_skill)
+def analyze_vectors(
+    user_skills: list[str],
+    user_vecs: np.ndarray,
+    role_skills: list[str],
+    role_vecs: np.ndarray,
+    threshold: float = 0.8,
+) -> SkillAnalysis:
+    """
+    Compare already-embedded skills: one (role x user) cosine matrix,
+    exact matches forced to 1.0, then a row-wise argmax/max per role skill.
+    """
+    if not role_skills:
+        return SkillAnalysis(score=0.0, missing=[], details={})
+    if not user_skills:
+        details = {r: {"matched_skill": "", "score": 0.0} for r in role_skills}
+        return SkillAnalysis(score=0.0, missing=sorted(role_skills), details=details)
+
+    sims = _normalize_rows(role_vecs) @ _normalize_rows(user_vecs).T
+    # Case-insensitive exact match → full credit
+    sims[_exact_match_mask(user_skills, role_skills)] = 1.0
+
+    best_idx = sims.argmax(axis=1)
+    best = np.maximum(sims[np.arange(len(role_skills)), best_idx], 0.0)
+
+    score = round(float(np.mean(best)) * 100.0, 2)
+    missing = sorted(r for r, b in zip(role_skills, best) if b < threshold)
+    details = {
+        r: {
+            "matched_skill": user_skills[i] if b > 0 else "",
+            "score": round(float(b) * 100, 2),   # percent
+        }
+        for r, i, b in zip(role_skills, best_idx, best)
+    }
+    return SkillAnalysis(score=score, missing=missing, details=details)
 
-    return sorted(missing)
 
-def compute_per_skill_score(user_skills: list[str], role_skills: list[str]) -> float:
+def analyze_skills(user_skills: list[str], role_skills: list[str], threshold: float = 0.8) -> SkillAnalysis:
     """
-    Compute a semantic match score between user_skills and role_skills by averaging
-    the best cosine similarity for each required skill.
-    Exact string matches (case-insensitive) get full credit.
-    Returns a percentage (0.0 to 100.0).
+    Embed every unique skill once and compute score, missing skills and
+    per-skill details in a single pass.
     """
     if not role_skills or not user_skills:
-        return 0.0
+        return analyze_vectors(user_skills, None, role_skills, None, threshold)
 
-    # Embed all unique skills
-    all_skills = list({s for s in user_skills + role_skills})
-    embeds = get_embeddings(all_skills)
+    all_skills = list(dict.fromkeys([*user_skills, *role_skills]))
+    with stage("embed"):
+        embeds = get_embeddings(all_skills)
     idx = {skill: i for i, skill in enumerate(all_skills)}
 
-    # Precompute norms
-    norms = np.linalg.norm(embeds, axis=1)
+    user_vecs = embeds[[idx[s] for s in user_skills]]
+    role_vecs = embeds[[idx[s] for s in role_skills]]
+    with stage("similarity"):
+        return analyze_vectors(user_skills, user_vecs, role_skills, role_vecs, threshold)
 
-    # Compute per-role-skill similarity
-    sims = []
-    for r in role_skills:
-        r_idx = idx[r]
-        r_vec = embeds[r_idx]
-        r_norm = norms[r_idx]
 
-        best = 0.0
-        for u in user_skills:
-            # Case-insensitive exact match
-            if u.strip().lower() == r.strip().lower():
-                best = 1.0
-                break
-            u_idx = idx[u]
-            u_vec = embeds[u_idx]
-            u_norm = norms[u_idx]
-            sim = float(np.dot(r_vec, u_vec) / (r_norm * u_norm + 1e-8))
-            best = max(best, sim)
-        sims.append(best)
+@dataclass(frozen=True)
+class RoleMatrix:
+    """
+    Every role's skills stacked into one L2-normalized embedding matrix.
+    Role i owns rows offsets[i]:offsets[i + 1] of `skills` and `vectors`.
+    """
+    roles: list[str]
+    skills: list[str]
+    offsets: np.ndarray
+    vectors: np.ndarray
+
 
-    score = float(np.mean(sims)) * 100.0
-    return round(score, 2)
+@dataclass(frozen=True)
+class RoleMatch:
+    role: str
+    score: float
+    missing: list[str]
+
+
+def build_role_matrix(roles_map: dict[str, list[str]]) -> RoleMatrix:
+    """
+    Embed all role skills in one call and record where each role's segment starts.
+    """
+    roles = list(roles_map)
+    skills = [s for r in roles for s in roles_map[r]]
+    offsets = np.cumsum([0] + [len(roles_map[r]) for r in roles])
+    vectors = _normalize_rows(get_embeddings(skills)) if skills else np.empty((0, 0), dtype=np.float32)
+    return RoleMatrix(roles=roles, skills=skills, offsets=offsets, vectors=vectors)
+
+
+def rank_roles(
+    user_skills: list[str],
+    matrix: RoleMatrix,
+    roles: list[str] | None = None,
+    top_k: int | None = None,
+    threshold: float = 0.8,
+) -> list[RoleMatch]:
+    """
+    Score user_skills against every role (or the given subset) at once:
+    one (role skills x user skills) matmul, a max over users for each role skill,
+    then a segmented mean per role. Returns the top_k roles, best first.
+    """
+    # Pick the segments to score, keeping roles.json order for ties
+    positions = {r: i for i, r in enumerate(matrix.roles)}
+    selected = list(range(len(matrix.roles))) if roles is None else [positions[r] for r in roles]
+    starts, ends = matrix.offsets[selected], matrix.offsets[np.array(selected, dtype=int) + 1]
+    counts = ends - starts
+    rows = np.concatenate([np.arange(a, b) for a, b in zip(starts, ends)] + [np.empty(0, dtype=int)])
+    skills = [matrix.skills[i] for i in rows]
+
+    if user_skills and len(rows):
+        user_vecs = _normalize_rows(get_embeddings(user_skills))
+        sims = matrix.vectors[rows] @ user_vecs.T
+        # Case-insensitive exact match → full credit
+        sims[_exact_match_mask(user_skills, skills)] = 1.0
+        best = np.maximum(sims.max(axis=1), 0.0)
+    else:
+        best = np.zeros(len(rows))
+
+    # Segmented mean over each role's rows (empty roles score 0)
+    seg_starts = np.cumsum(counts) - counts
+    scores = np.zeros(len(selected))
+    nonempty = counts > 0
+    if nonempty.any():
+        sums = np.add.reduceat(best, seg_starts[nonempty])
+        scores[nonempty] = sums / counts[nonempty]
+
+    order = np.argsort(-scores, kind="stable")
+    if top_k is not None:
+        order = order[:top_k]
+
+    # Missing lists are only built for the roles we return
+    missing_flags = best < threshold
+    results = []
+    for i in order:
+        a, b = seg_starts[i], seg_starts[i] + counts[i]
+        missing = sorted(skills[j] for j in range(a, b) if missing_flags[j])
+        results.append(RoleMatch(
+            role=matrix.roles[selected[i]],
+            score=round(float(scores[i]) * 100.0, 2),
+            missing=missing,
+        ))
+    return results
+
+
+def compute_missing(user_skills: list[str], role_skills: list[str], threshold: float = 0.8) -> list[str]:
+    """
+    Return list of role skills that are not semantically similar to any user skill.
+    Uses cosine similarity to find best matches. Anything below threshold is 'missing'.
+    """
+    return analyze_skills(user_skills, role_skills, threshold).missing
+
+def compute_per_skill_score(user_skills: list[str], role_skills: list[str]) -> float:
+    """
+    Compute a semantic match score between user_skills and role_skills by averaging
+    the best cosine similarity for each required skill.
+    Exact string matches (case-insensitive) get full credit.
+    Returns a percentage (0.0 to 100.0).
+    """
+    return analyze_skills(user_skills, role_skills).score
 
 
 
@@ -103,30 +213,7 @@ def compute_similarity_details(
       - which user_skill gave the highest cosine sim
       - that sim (%) rounded to 2 decimals
     """
-    # 1. Embed every unique skill once
-    all_skills = list({*user_skills, *job_skills})
-    embeds = get_embeddings(all_skills)
-    idx = {skill: i for i, skill in enumerate(all_skills)}
-    norms = np.linalg.norm(embeds, axis=1)
-
-    details: dict[str, dict[str, float | str]] = {}
-    for js in job_skills:
-        r_vec = embeds[idx[js]]
-        r_norm = norms[idx[js]]
-        best_sim = 0.0
-        best_match = None
-        for us in user_skills:
-            u_vec = embeds[idx[us]]
-            u_norm = norms[idx[us]]
-            sim = float(np.dot(r_vec, u_vec) / (r_norm * u_norm + 1e-8))
-            if sim > best_sim:
-                best_sim = sim
-                best_match = us
-        details[js] = {
-            "matched_skill": best_match or "",
-            "score": round(best_sim * 100, 2)   # percent
-        }
-    return details
+    return analyze_skills(user_skills, job_skills).details
 
 
 def compute_match_score(user_skills: list[str], role_skills: list[str]) -> float:
@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import sys
+import zipfile
+import zlib
+from collections.abc import Iterable, Iterator
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO
+
+from .analyzer import analyze_vectors, load_role_skills
+from .embedder import get_embeddings
+from .parser import (
+    MAX_PDF_BYTES,
+    PDFLimitError,
+    extract_skills_batch,
+    extract_text_from_pdf,
+    load_known_skills,
+)
+
+# Resumes parsed (one nlp.pipe) and scored (one embedding call) together
+BATCH_GROUP_SIZE = int(os.getenv("BATCH_GROUP_SIZE", "8"))
+# Resumes one /analyze/batch request holds in memory (read or being analyzed) at once
+BATCH_MAX_IN_FLIGHT = int(os.getenv("BATCH_MAX_IN_FLIGHT", "32"))
+
+# Errors reading a zip archive or one of its members (corrupt data, bad CRC,
+# unsupported compression, encrypted members)
+ZIP_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError, RuntimeError, OSError)
+
+# Errors parsing one PDF: PyMuPDF reports unreadable documents as RuntimeError
+# subclasses, and the byte, page and time limits raise PDFLimitError (a ValueError)
+PDF_ERRORS = (RuntimeError, ValueError)
+
+
+def _read_limited(fileobj: BinaryIO, max_bytes: int) -> bytes | PDFLimitError:
+    # At most one byte past the limit is read, however large the file (or zip bomb) is
+    data = fileobj.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        return PDFLimitError(f"PDF is larger than {max_bytes} bytes")
+    return data
+
+
+def iter_pdfs(name: str, fileobj: BinaryIO, max_bytes: int = MAX_PDF_BYTES) -> Iterator[tuple[str, bytes | Exception]]:
+    """
+    Yield (filename, pdf_bytes) for a single PDF, or for every PDF inside a zip.
+    Zip members are read one at a time, and never more than max_bytes of one,
+    so memory stays bounded. A document that cannot be read is yielded with
+    the exception in place of its bytes, and becomes an error line.
+    """
+    if name.lower().endswith(".zip") or zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        try:
+            archive = zipfile.ZipFile(fileobj)
+        except ZIP_ERRORS as e:
+            yield name, e
+            return
+        with archive:
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(".pdf"):
+                    continue
+                if info.file_size > max_bytes:
+                    yield info.filename, PDFLimitError(f"PDF is larger than {max_bytes} bytes")
+                    continue
+                try:
+                    with archive.open(info) as member:
+                        data = _read_limited(member, max_bytes)
+                except ZIP_ERRORS as e:
+                    data = e
+                yield info.filename, data
+    else:
+        fileobj.seek(0)
+        yield name, _read_limited(fileobj, max_bytes)
+
+
+def take(documents: Iterator[tuple[str, bytes | Exception]], n: int) -> list[tuple[str, bytes | Exception]]:
+    """
+    The next n documents (fewer at the end). Reads files, so callers run it off the event loop.
+    """
+    return list(islice(documents, n))
+
+
+def _parse_group(docs: list[tuple[str, bytes | Exception]], known_skills: list[str]) -> list[dict]:
+    # A broken PDF becomes an error line instead of failing the batch
+    parsed, texts = [], []
+    for name, pdf_bytes in docs:
+        if isinstance(pdf_bytes, Exception):
+            parsed.append({"filename": name, "error": str(pdf_bytes)})
+            continue
+        try:
+            texts.append(extract_text_from_pdf(pdf_bytes))
+        except PDF_ERRORS as e:
+            parsed.append({"filename": name, "error": str(e)})
+            continue
+        parsed.append({"filename": name})
+
+    # Every readable resume in the group goes through one nlp.pipe
+    readable = [p for p in parsed if "error" not in p]
+    for p, skills in zip(readable, extract_skills_batch(texts, known_skills)):
+        p["user_skills"] = skills
+    return parsed
+
+
+def _score_parsed(parsed: list[dict], role_skills: list[str], threshold: float) -> Iterator[dict]:
+    """
+    Score a group of parsed resumes. All their skills are embedded in one call,
+    so anything not in the embedding store reaches the model as a single batch.
+    """
+    role_vecs = get_embeddings(role_skills) if role_skills else None
+    skills = list(dict.fromkeys(s for p in parsed for s in p.get("user_skills", [])))
+    vecs = get_embeddings(skills) if skills else None
+    idx = {s: i for i, s in enumerate(skills)}
+
+    for p in parsed:
+        if "error" in p:
+            yield p
+            continue
+
+        user_skills = p["user_skills"]
+        user_vecs = vecs[[idx[s] for s in user_skills]] if user_skills else None
+        analysis = analyze_vectors(user_skills, user_vecs, role_skills, role_vecs, threshold)
+        yield {
+            "filename": p["filename"],
+            "match_score": analysis.score,
+            "user_skills": user_skills,
+            "missing_skills": analysis.missing,
+        }
+
+
+def analyze_group(
+    docs: list[tuple[str, bytes | Exception]],
+    role_skills: list[str],
+    known_skills: list[str],
+    threshold: float = 0.8,
+) -> list[dict]:
+    """
+    Analyze a group of resumes against one role: one extract_skills_batch call
+    for their text and one embedding call for their skills. Runs in a worker
+    thread or process; returns a result dict per document, in order.
+    """
+    return list(_score_parsed(_parse_group(docs, known_skills), role_skills, threshold))
+
+
+def analyze_batch(
+    documents: Iterable[tuple[str, bytes | Exception]],
+    role_skills: list[str],
+    known_skills: list[str] | None = None,
+    threshold: float = 0.8,
+    workers: int = 4,
+    max_in_flight: int = 32,
+    executor: Executor | None = None,
+    group_size: int = BATCH_GROUP_SIZE,
+) -> Iterator[dict]:
+    """
+    Analyze many resumes against one role, yielding a result dict per resume
+    as soon as its group is done (group completion order, not input order).
+
+    Documents are pulled lazily in groups of group_size (see analyze_group),
+    and at most max_in_flight of them are held at once, so memory stays
+    bounded however many resumes the batch contains.
+    """
+    if known_skills is None:
+        known_skills = load_known_skills()
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+    try:
+        docs = iter(documents)
+        groups_in_flight = max(1, max_in_flight // group_size)
+        pending = set()
+        while True:
+            while len(pending) < groups_in_flight:
+                group = take(docs, group_size)
+                if not group:
+                    break
+                pending.add(executor.submit(analyze_group, group, role_skills, known_skills, threshold))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+    finally:
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+
+
+def iter_paths(paths: Iterable[str]) -> Iterator[tuple[str, bytes]]:
+    """
+    Expand CLI arguments (PDFs, zips or directories of them) into documents.
+    """
+    for raw in paths:
+        path = Path(raw)
+        files = sorted(p for p in path.rglob("*") if p.suffix.lower() in (".pdf", ".zip")) if path.is_dir() else [path]
+        for f in files:
+            with open(f, "rb") as fileobj:
+                yield from iter_pdfs(str(f), fileobj)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Analyze many resumes against one role and print NDJSON results.")
+    parser.add_argument("paths", nargs="+", help="PDF files, zip archives or directories")
+    parser.add_argument("--role", required=True, help="Role name from roles.json")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel parse workers")
+    parser.add_argument("--processes", action="store_true", help="Parse in processes instead of threads")
+    parser.add_argument("--max-in-flight", type=int, default=32, help="Resumes held in memory at once")
+    args = parser.parse_args(argv)
+
+    roles_map = load_role_skills()
+    if args.role not in roles_map:
+        parser.error(f"Unknown role: {args.role}")
+
+    pool_cls = ProcessPoolExecutor if args.processes else ThreadPoolExecutor
+    with pool_cls(max_workers=args.workers) as executor:
+        results = analyze_batch(
+            iter_paths(args.paths),
+            roles_map[args.role],
+            max_in_flight=args.max_in_flight,
+            executor=executor,
+        )
+        for result in results:
+            sys.stdout.write(json.dumps(result) + "\n")
+            sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
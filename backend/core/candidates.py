@@ -0,0 +1,341 @@
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import (
+    Column,
+    Float,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    bindparam,
+    create_engine,
+    func,
+    select,
+    update,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .config import CACHE_DIR, EMBEDDING_BACKEND, EMBEDDING_MODEL
+from .embedder import get_embeddings, storage_dtype
+from .skill_index import SkillIndex
+
+# Analyzed resumes are personal data, so they are only kept for candidate search
+# (/api/roles/{role}/candidates) with STORE_CANDIDATES=on. They go to CANDIDATE_DB;
+# set CANDIDATE_DB=none to keep the store in memory only.
+STORE_CANDIDATES = os.getenv("STORE_CANDIDATES", "off").lower() == "on"
+CANDIDATE_DB = os.getenv("CANDIDATE_DB", f"sqlite:///{CACHE_DIR / 'candidates.db'}")
+
+# Candidates scored per block; bounds the temporary (skills x role skills) array
+CANDIDATE_BLOCK = int(os.getenv("CANDIDATE_BLOCK", "16384"))
+
+
+def embedding_tag() -> str:
+    """
+    What stored skill vectors depend on: the model and how it is run
+    (backend and dtype), as in the embedding store's fingerprint.
+    """
+    return f"{EMBEDDING_MODEL}|{EMBEDDING_BACKEND}|{storage_dtype().name}"
+
+
+@dataclass(frozen=True)
+class CandidateMatch:
+    candidate_id: str
+    name: str
+    score: float          # same scale as SkillAnalysis.score
+    missing: list[str]
+
+
+class SQLiteCandidateTable:
+    """
+    Persistent copy of the store: the skill vocabulary with its embeddings, and
+    one row per candidate holding its skills as packed skill ids.
+
+    Several processes can share one database. SQLite assigns the skill ids, and
+    every candidate write takes the next `seq`, so each process can read what
+    the others added since it last looked.
+    """
+
+    def __init__(self, url: str):
+        if url.startswith("sqlite:///") and url != "sqlite:///:memory:":
+            Path(url.removeprefix("sqlite:///")).parent.mkdir(parents=True, exist_ok=True)
+        self.engine = create_engine(url)
+        metadata = MetaData()
+        self.skills = Table(
+            "candidate_skills",
+            metadata,
+            Column("id", Integer, primary_key=True),          # assigned by SQLite
+            Column("name", String, nullable=False, unique=True),
+            Column("model", String, nullable=False),
+            Column("vector", LargeBinary, nullable=False),   # float32
+        )
+        self.candidates = Table(
+            "candidates",
+            metadata,
+            Column("id", String(64), primary_key=True),
+            Column("name", String, nullable=False),
+            Column("skill_ids", LargeBinary, nullable=False),  # int32
+            Column("added_at", Float, nullable=False),
+            Column("seq", Integer, nullable=False, index=True),
+        )
+        metadata.create_all(self.engine)
+
+    def skills_after(self, last_id: int) -> list:
+        with self.engine.connect() as conn:
+            return conn.execute(select(self.skills).where(self.skills.c.id > last_id).order_by(self.skills.c.id)).all()
+
+    def candidates_after(self, last_seq: int) -> list:
+        with self.engine.connect() as conn:
+            return conn.execute(
+                select(self.candidates).where(self.candidates.c.seq > last_seq).order_by(self.candidates.c.seq)
+            ).all()
+
+    def add_skills(self, rows: list[dict]) -> None:
+        # Skills another process stored first keep their id and vector
+        stmt = sqlite_insert(self.skills).on_conflict_do_nothing(index_elements=[self.skills.c.name])
+        with self.engine.begin() as conn:
+            conn.execute(stmt, rows)
+
+    def update_vectors(self, rows: list[dict]) -> None:
+        stmt = (
+            update(self.skills)
+            .where(self.skills.c.id == bindparam("skill_id"))
+            .values(model=bindparam("model"), vector=bindparam("vector"))
+        )
+        with self.engine.begin() as conn:
+            conn.execute(stmt, rows)
+
+    def save_candidate(self, row: dict) -> None:
+        # The next seq is read and written in one statement, under SQLite's write lock
+        seq = select(func.coalesce(func.max(self.candidates.c.seq), 0) + 1).scalar_subquery()
+        stmt = sqlite_insert(self.candidates).values(**row, seq=seq)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[self.candidates.c.id],
+            set_={"name": stmt.excluded.name, "skill_ids": stmt.excluded.skill_ids, "seq": stmt.excluded.seq},
+        )
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+
+
+class CandidateStore:
+    """
+    Candidates (resumes) with their extracted skills, searchable by role.
+
+    Skills are kept once in a vocabulary with their embeddings; a candidate is a
+    short array of vocabulary rows, and all candidates are packed into one flat
+    array plus offsets. Scoring a role embeds only its own skills: the role x
+    vocabulary similarities are one small matrix product, and each candidate's
+    best match per role skill is a gather plus a segment max over its rows, done
+    for a block of candidates at a time. Scores match analyze_skills.
+
+    With a table, the store is a cache of it: every add and search first reads
+    the skills and candidates other processes have written since.
+    """
+
+    def __init__(
+        self,
+        table: SQLiteCandidateTable | None = None,
+        embed: Callable[[list[str]], np.ndarray] = get_embeddings,
+        model: str | None = None,
+        block: int = CANDIDATE_BLOCK,
+    ):
+        self.table = table
+        self.embed = embed
+        # Stored vectors are tagged with this; rows tagged otherwise are embedded again
+        self.model = model or embedding_tag()
+        self.block = block
+        self.vocab: SkillIndex | None = None   # created with the first skill vectors
+        self._lowered: dict[str, list[int]] = {}  # stripped, lowercased skill -> vocabulary rows
+        self._skill_ids: list[int] = []           # vocabulary row -> id in the table
+        self._vocab_row: dict[int, int] = {}      # id in the table -> vocabulary row
+        self._last_seq = 0
+        self.ids: list[str] = []
+        self.names: list[str] = []
+        self.position: dict[str, int] = {}
+        self._rows: list[np.ndarray] = []
+        # Packed copy of _rows[:_packed_count]; extended or rebuilt lazily
+        self._flat = np.empty(0, dtype=np.int32)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._packed_count = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self.ids)
+
+    def add(self, candidate_id: str, name: str, skills: list[str]) -> bool:
+        """
+        Add or replace a candidate. Returns False (and stores nothing) if it has no skills.
+        """
+        skills = list(dict.fromkeys(s for s in skills if s))
+        if not skills:
+            return False
+
+        with self._lock:
+            self._refresh()
+            new = [s for s in skills if self.vocab is None or s not in self.vocab]
+            if new:
+                vectors = np.atleast_2d(np.asarray(self.embed(new), dtype=np.float32))
+                if self.table is None:
+                    self._add_vocab(new, vectors)
+                else:
+                    self.table.add_skills([
+                        {"name": s, "model": self.model, "vector": vectors[i].tobytes()} for i, s in enumerate(new)
+                    ])
+                    self._refresh()
+            rows = np.array([self.vocab.index[s] for s in skills], dtype=np.int32)
+
+            if self.table is None:
+                self._put(candidate_id, name, rows)
+            else:
+                skill_ids = np.array([self._skill_ids[r] for r in rows], dtype=np.int32)
+                self.table.save_candidate(
+                    {"id": candidate_id, "name": name, "skill_ids": skill_ids.tobytes(), "added_at": time.time()}
+                )
+                self._refresh()
+        return True
+
+    def search(
+        self,
+        role_skills: list[str],
+        role_vecs: np.ndarray | None = None,
+        top_k: int = 10,
+        threshold: float = 0.8,
+    ) -> list[CandidateMatch]:
+        """
+        The top_k candidates for a role, best first.
+        """
+        with self._lock:
+            self._refresh()
+            if not self.ids or not role_skills:
+                return []
+            flat, offsets = self._pack()
+            n = len(offsets) - 1
+            ids, names = self.ids[:n], self.names[:n]
+            vocab, vocab_vecs = self.vocab.snapshot()
+            exact = [[v for v in self._lowered.get(r.strip().lower(), []) if v < len(vocab)] for r in role_skills]
+
+        if role_vecs is None:
+            role_vecs = self.embed(role_skills)
+        role_vecs = np.atleast_2d(np.asarray(role_vecs, dtype=np.float32))
+        role_vecs = role_vecs / np.maximum(np.linalg.norm(role_vecs, axis=1, keepdims=True), 1e-8)
+
+        # Vocabulary x role skill similarity, with the same exact-match rule as the analyzer
+        sims = vocab_vecs @ role_vecs.T
+        for r, matches in enumerate(exact):
+            sims[matches, r] = 1.0
+        np.maximum(sims, 0.0, out=sims)
+
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, self.block):
+            end = min(start + self.block, n)
+            lo, hi = offsets[start], offsets[end]
+            # Best similarity per (candidate, role skill): max over each candidate's rows
+            best = np.maximum.reduceat(sims[flat[lo:hi]], offsets[start:end] - lo, axis=0)
+            scores[start:end] = best.mean(axis=1)
+
+        k = min(top_k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        # Missing lists are only built for the candidates we return
+        results = []
+        for i in top:
+            best = sims[flat[offsets[i]:offsets[i + 1]]].max(axis=0)
+            results.append(CandidateMatch(
+                candidate_id=ids[i],
+                name=names[i],
+                score=round(float(scores[i]) * 100.0, 2),
+                missing=sorted(r for r, b in zip(role_skills, best) if b < threshold),
+            ))
+        return results
+
+    def _put(self, candidate_id: str, name: str, rows: np.ndarray) -> None:
+        # Caller holds the lock
+        pos = self.position.get(candidate_id)
+        if pos is None:
+            self.position[candidate_id] = len(self.ids)
+            self.ids.append(candidate_id)
+            self.names.append(name)
+            self._rows.append(rows)
+        else:
+            self.names[pos] = name
+            self._rows[pos] = rows
+            self._packed_count = 0   # repack everything on the next search
+
+    def _add_vocab(self, skills: list[str], vectors: np.ndarray) -> None:
+        # Caller holds the lock; skills are all new, so rows are assigned in order
+        if self.vocab is None:
+            self.vocab = SkillIndex(vectors.shape[1])
+        start = len(self.vocab)
+        self.vocab.add(skills, vectors)
+        for i, skill in enumerate(skills):
+            self._lowered.setdefault(skill.strip().lower(), []).append(start + i)
+
+    def _pack(self) -> tuple[np.ndarray, np.ndarray]:
+        # Caller holds the lock; appends only touch the new candidates
+        if self._packed_count < len(self._rows):
+            new = self._rows[self._packed_count:]
+            if self._packed_count == 0:
+                self._flat = np.empty(0, dtype=np.int32)
+                self._offsets = np.zeros(1, dtype=np.int64)
+            lengths = np.fromiter((len(a) for a in new), dtype=np.int64, count=len(new))
+            self._flat = np.concatenate([self._flat, *new])
+            self._offsets = np.concatenate([self._offsets, self._offsets[-1] + np.cumsum(lengths)])
+            self._packed_count = len(self._rows)
+        return self._flat, self._offsets
+
+    def _refresh(self) -> None:
+        # Caller holds the lock. Candidates are read before skills: a candidate is
+        # written after its skills, so every skill it uses is then known.
+        if self.table is None:
+            return
+        candidates = self.table.candidates_after(self._last_seq)
+        skills = self.table.skills_after(self._skill_ids[-1] if self._skill_ids else 0)
+
+        if skills:
+            names = [row.name for row in skills]
+            vectors = np.stack([np.frombuffer(row.vector, dtype=np.float32) for row in skills])
+            stale = [i for i, row in enumerate(skills) if row.model != self.model]
+            if stale:
+                # Stored vectors come from another model or backend: embed those skills again
+                fresh = np.atleast_2d(np.asarray(self.embed([names[i] for i in stale]), dtype=np.float32))
+                if len(stale) == len(skills):
+                    vectors = fresh
+                else:
+                    vectors[stale] = fresh
+                self.table.update_vectors([
+                    {"skill_id": skills[i].id, "model": self.model, "vector": fresh[j].tobytes()}
+                    for j, i in enumerate(stale)
+                ])
+            start = len(self.vocab) if self.vocab is not None else 0
+            self._add_vocab(names, vectors)
+            for i, row in enumerate(skills):
+                self._skill_ids.append(row.id)
+                self._vocab_row[row.id] = start + i
+
+        for row in candidates:
+            skill_ids = np.frombuffer(row.skill_ids, dtype=np.int32)
+            rows = np.fromiter((self._vocab_row[int(i)] for i in skill_ids), dtype=np.int32, count=len(skill_ids))
+            self._put(row.id, row.name, rows)
+            self._last_seq = row.seq
+
+
+_store: CandidateStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_candidate_store() -> CandidateStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            table = None if CANDIDATE_DB.lower() == "none" else SQLiteCandidateTable(CANDIDATE_DB)
+            _store = CandidateStore(table)
+        return _store
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+
+from .analyzer import RoleMatrix, build_role_matrix
+from .config import CACHE_DIR, KNOWN_SKILLS_PATH, ROLES_PATH
+from .embedder import fingerprint, reload_store, store_loaded
+from .embedding_store import write_atomic
+from .matcher import SkillMatcher, get_matcher
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of the catalog files; 0 disables watching
+CATALOG_POLL_SECONDS = float(os.getenv("CATALOG_POLL_SECONDS", "2"))
+
+# Role matrices are saved here and memory-mapped, so every worker process
+# shares one copy through the page cache instead of building its own
+ROLE_MATRIX_DIR = CACHE_DIR / "role_matrix"
+
+# Matrices for other catalog versions are removed this long after they were written
+ROLE_MATRIX_KEEP_SECONDS = float(os.getenv("ROLE_MATRIX_KEEP_SECONDS", str(24 * 3600)))
+
+
+def load_or_build_role_matrix(
+    roles: dict[str, list[str]],
+    key: str,
+    directory: Path = ROLE_MATRIX_DIR,
+    build: Callable[[dict[str, list[str]]], RoleMatrix] = build_role_matrix,
+) -> RoleMatrix:
+    """
+    The role matrix from `directory`/`key`.npy (memory-mapped, read-only), or
+    built, saved there and mapped if the file is missing or does not fit.
+    """
+    directory = Path(directory)
+    path = directory / f"{key}.npy"
+    skills = [s for r in roles for s in roles[r]]
+    try:
+        vectors = np.load(path, mmap_mode="r")
+        if vectors.ndim == 2 and len(vectors) == len(skills):
+            offsets = np.cumsum([0] + [len(roles[r]) for r in roles])
+            return RoleMatrix(roles=list(roles), skills=skills, offsets=offsets, vectors=vectors)
+    except (OSError, ValueError):
+        pass
+
+    matrix = build(roles)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, lambda f: np.save(f, np.ascontiguousarray(matrix.vectors, dtype=np.float32)))
+        vectors = np.load(path, mmap_mode="r")
+        _remove_stale_matrices(directory, keep=path)
+    except OSError:
+        # Read-only filesystem: keep serving from memory
+        return matrix
+    return RoleMatrix(roles=matrix.roles, skills=matrix.skills, offsets=matrix.offsets, vectors=vectors)
+
+
+def _remove_stale_matrices(directory: Path, keep: Path) -> None:
+    # Workers still on an older catalog may yet open its file, so only old files
+    # go; processes that already map a removed file keep their pages, and one
+    # that has not opened it yet builds it again
+    cutoff = time.time() - ROLE_MATRIX_KEEP_SECONDS
+    for old in directory.glob("*.npy"):
+        try:
+            if old != keep and old.stat().st_mtime < cutoff:
+                old.unlink()
+        except OSError:
+            pass
+
+
+class Catalog:
+    """
+    One immutable snapshot of roles.json and known_skills.json, plus the
+    structures derived from them. Nothing here is mutated after construction
+    (the role matrix is built once, on first use), so a request can hold on to
+    a snapshot while a newer one is swapped in.
+    """
+
+    def __init__(self, roles: dict[str, list[str]], known_skills: list[str], version: str):
+        self.roles = roles
+        self.known_skills = known_skills
+        self.version = version
+        self.matcher: SkillMatcher = get_matcher(known_skills)
+        self._role_matrix: RoleMatrix | None = None
+        self._lock = threading.Lock()
+
+    def role_matrix(self) -> RoleMatrix:
+        """
+        Stacked embeddings of every role's skills with per-role segment offsets.
+        """
+        if self._role_matrix is None:
+            with self._lock:
+                if self._role_matrix is None:
+                    # Keyed by catalog and embedding settings, so a stale file is never mapped
+                    digest = hashlib.sha256(json.dumps(fingerprint(), sort_keys=True).encode()).hexdigest()
+                    self._role_matrix = load_or_build_role_matrix(self.roles, f"{self.version}-{digest[:12]}")
+        return self._role_matrix
+
+    def role_matrix_loaded(self) -> bool:
+        return self._role_matrix is not None
+
+
+def _signature(paths: list[Path]) -> tuple:
+    # Cheap change detection: modification time and size of each file
+    stats = [os.stat(p) for p in paths]
+    return tuple((s.st_mtime_ns, s.st_size) for s in stats)
+
+
+def load_catalog(roles_path: Path = ROLES_PATH, known_skills_path: Path = KNOWN_SKILLS_PATH) -> Catalog:
+    """
+    Read both files once; the version is a hash of their exact bytes.
+    """
+    roles_bytes = Path(roles_path).read_bytes()
+    known_bytes = Path(known_skills_path).read_bytes()
+    version = hashlib.sha256(roles_bytes + b"\0" + known_bytes).hexdigest()[:12]
+    return Catalog(json.loads(roles_bytes), json.loads(known_bytes), version)
+
+
+class CatalogService:
+    """
+    Holds the current Catalog and swaps in a new one when the files change.
+    """
+
+    def __init__(self, roles_path: Path = ROLES_PATH, known_skills_path: Path = KNOWN_SKILLS_PATH):
+        self.paths = [Path(roles_path), Path(known_skills_path)]
+        self._current: Catalog | None = None
+        self._signature: tuple | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def get(self) -> Catalog:
+        if self._current is None:
+            with self._lock:
+                if self._current is None:
+                    self._signature = _signature(self.paths)
+                    self._current = load_catalog(*self.paths)
+        return self._current
+
+    def loaded(self) -> bool:
+        return self._current is not None
+
+    def reload(self) -> bool:
+        """
+        Load the files again and swap in the result if its version changed.
+        The new snapshot is fully built (embedding store, role matrix) before
+        the swap, so requests never see a half-initialized catalog.
+        Returns True if a new version was installed.
+        """
+        with self._lock:
+            signature = _signature(self.paths)
+            catalog = load_catalog(*self.paths)
+            if self._current is not None and catalog.version == self._current.version:
+                self._signature = signature
+                return False
+
+            if store_loaded():
+                reload_store()
+            if self._current is not None and self._current.role_matrix_loaded():
+                catalog.role_matrix()
+
+            old = self._current.version if self._current else None
+            self._current, self._signature = catalog, signature
+        logger.info("Catalog %s -> %s", old, catalog.version)
+        return True
+
+    def check(self) -> bool:
+        """
+        Reload if either file's mtime or size changed since the last load.
+        """
+        try:
+            if self._current is not None and _signature(self.paths) == self._signature:
+                return False
+            return self.reload()
+        except (OSError, ValueError):
+            # Missing or half-written file: keep the current snapshot and retry next poll
+            logger.warning("Catalog reload failed, keeping version %s", self._current and self._current.version, exc_info=True)
+            return False
+
+    def start(self, interval: float = CATALOG_POLL_SECONDS) -> None:
+        if interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, args=(interval,), name="catalog-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.check()
+
+
+_service = CatalogService()
+
+
+def catalog_service() -> CatalogService:
+    return _service
+
+
+def get_catalog() -> Catalog:
+    """
+    The current catalog snapshot. Take it once per request and use it throughout.
+    """
+    return _service.get()
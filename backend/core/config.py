@@ -0,0 +1,19 @@
+import os
+from pathlib import Path
+
+# Shared paths and settings for the core modules.
+# Everything can be overridden with environment variables (see .env).
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+ROLES_PATH = Path(os.getenv("ROLES_PATH", BACKEND_DIR / "roles.json"))
+KNOWN_SKILLS_PATH = Path(os.getenv("KNOWN_SKILLS_PATH", BACKEND_DIR / "known_skills.json"))
+
+# Directory for generated artifacts (embedding store, caches). Safe to delete.
+CACHE_DIR = Path(os.getenv("SKILLGAP_CACHE_DIR", BACKEND_DIR / ".cache"))
+
+# Sentence-BERT model used for every skill embedding
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+# How that model is run: torch (sentence-transformers) or onnx (int8, onnxruntime)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
@@ -1,13 +1,202 @@
 # averaged Sentence-BERT embeddings
 
-from sentence_transformers import SentenceTransformer
+import os
+import threading
+
 import numpy as np
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+from .config import (
+    CACHE_DIR,
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL,
+    KNOWN_SKILLS_PATH,
+    ROLES_PATH,
+)
+from .embedding_backends import BACKENDS, EmbeddingBackend, load_backend
+from .embedding_store import EmbeddingStore, collect_skills, store_fingerprint
+from .lru import LRUCache
+from .metrics import CACHE_EVENTS, stage
+from .microbatch import MicroBatcher
+
+# Vectors for skills outside the store (mostly manual entries), by normalized text.
+# Bounded by entry count and, if EMBED_CACHE_BYTES is set, by total size.
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "10000"))
+EMBED_CACHE_BYTES = int(os.getenv("EMBED_CACHE_BYTES", "0")) or None
+
+# Concurrent requests' unseen skills are gathered for this long into one model call
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "3"))
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "256"))
+
+_model: EmbeddingBackend | None = None
+_model_lock = threading.Lock()
+
+# Precomputed vectors for every known skill and role skill live here
+STORE_DIR = CACHE_DIR / "embeddings"
+
+_store: EmbeddingStore | None = None
+_store_lock = threading.Lock()
+
+_vector_cache = LRUCache(max_entries=EMBED_CACHE_SIZE, max_bytes=EMBED_CACHE_BYTES, sizeof=lambda v: v.nbytes)
+_cache_counts = {"hits": 0, "misses": 0}
+_counts_lock = threading.Lock()
+
+
+def get_model() -> EmbeddingBackend:
+    """
+    Return the embedding backend chosen by EMBEDDING_BACKEND, loading it on first call.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_backend(EMBEDDING_BACKEND, EMBEDDING_MODEL)
+    return _model
+
+
+def storage_dtype() -> np.dtype:
+    # Known without loading the model, so a saved store can be checked cheaply
+    return BACKENDS[EMBEDDING_BACKEND].storage_dtype
+
+
+def model_loaded() -> bool:
+    return _model is not None
+
+
+def store_loaded() -> bool:
+    return _store is not None
+
+
+def encode(items: list[str]) -> np.ndarray:
+    """
+    Run the model directly, bypassing the embedding store.
+    """
+    return get_model().encode(items)
+
+
+def get_store() -> EmbeddingStore:
+    """
+    Load the embedding store on first use, rebuilding it if roles.json,
+    known_skills.json or the model changed since it was saved.
+    A valid store on disk is loaded without touching the model.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _load_store()
+    return _store
+
+
+def reload_store() -> EmbeddingStore:
+    """
+    Rebuild the store for the current catalog files and swap it in.
+    Lookups keep using the previous store until the new one is ready.
+    """
+    global _store
+    store = _load_store()
+    with _store_lock:
+        _store = store
+    return store
+
+
+def fingerprint() -> dict:
+    """
+    What stored embeddings for the current catalog files and model depend on.
+    """
+    return store_fingerprint(EMBEDDING_MODEL, [ROLES_PATH, KNOWN_SKILLS_PATH], EMBEDDING_BACKEND, storage_dtype())
+
+
+def _load_store() -> EmbeddingStore:
+    return EmbeddingStore.load_or_build(
+        STORE_DIR,
+        collect_skills(ROLES_PATH, KNOWN_SKILLS_PATH),
+        encode,
+        fingerprint(),
+        dtype=storage_dtype(),
+    )
+
+
+def _encode_batch(items: list[str]) -> np.ndarray:
+    with stage("embed_model"):
+        return np.asarray(encode(items), dtype=np.float32)
+
+
+_batcher = MicroBatcher(_encode_batch, EMBED_BATCH_WINDOW_MS / 1000, EMBED_MAX_BATCH, name="embed-batch")
+
+
+def _after_fork_in_child() -> None:
+    # Workers forked by backend.serve keep the loaded model and store, but not
+    # the parent's threads or whatever state its locks were in
+    global _model_lock, _store_lock, _counts_lock
+    _model_lock = threading.Lock()
+    _store_lock = threading.Lock()
+    _counts_lock = threading.Lock()
+    _batcher.after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _cache_key(skill: str) -> str:
+    # Same text up to whitespace gets the same vector
+    return " ".join(skill.split())
+
+
+def encode_cached(items: list[str]) -> np.ndarray:
+    """
+    Encode skills through the LRU cache; misses from concurrent callers
+    are micro-batched into a single model call.
+    """
+    keys = [_cache_key(s) for s in items]
+    rows: list[np.ndarray | None] = [_vector_cache.get(k) for k in keys]
+    missing = list(dict.fromkeys(k for k, row in zip(keys, rows) if row is None))
+
+    misses = sum(row is None for row in rows)
+    with _counts_lock:
+        _cache_counts["misses"] += misses
+        _cache_counts["hits"] += len(rows) - misses
+    CACHE_EVENTS.inc(misses, cache="embeddings", result="miss")
+    CACHE_EVENTS.inc(len(rows) - misses, cache="embeddings", result="hit")
+
+    if missing:
+        encoded = dict(zip(missing, _batcher.submit(missing)))
+        for key, vec in encoded.items():
+            # A copy in storage dtype, so a cached row does not keep the batch matrix alive
+            _vector_cache.set(key, vec.astype(storage_dtype()))
+        rows = [encoded[k] if row is None else row for k, row in zip(keys, rows)]
+
+    return np.stack(rows).astype(np.float32, copy=False) if rows else np.empty((0, 0), dtype=np.float32)
+
+
+def embedding_stats() -> dict:
+    """
+    Cache hit ratio plus batch-size and latency histograms of model calls.
+    """
+    with _counts_lock:
+        hits, misses = _cache_counts["hits"], _cache_counts["misses"]
+    return {
+        "cache": {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            "entries": len(_vector_cache),
+            "bytes": _vector_cache.nbytes,
+        },
+        "encode": _batcher.stats(),
+    }
+
 
 def get_embeddings(items: list[str]) -> np.ndarray:
-    return model.encode(items, convert_to_numpy=True)
+    # Known skills come from the store; only unseen skills go through the cache and the model
+    return get_store().lookup(items, encode_cached)
 
 def average_embedding(items: list[str]) -> np.ndarray:
     embeds = get_embeddings(items)
-    return np.mean(embeds, axis=0)
\ No newline at end of file
+    return np.mean(embeds, axis=0)
+
+
+if __name__ == "__main__":
+    # Build the store ahead of time, e.g. while building the container image
+    store = get_store()
+    print(f"Embedding store ready: {len(store)} skills x {store.dim} dims in {STORE_DIR}")
@@ -0,0 +1,171 @@
+import json
+import re
+from pathlib import Path
+from typing import Protocol
+
+import numpy as np
+
+from .config import CACHE_DIR
+
+# Exported ONNX models, one directory per sentence-transformers model
+ONNX_DIR = CACHE_DIR / "onnx"
+
+ONNX_META_FILE = "backend.json"
+
+
+class EmbeddingBackend(Protocol):
+    """
+    Anything that turns a list of strings into one embedding row per string.
+    storage_dtype is the dtype used for vectors kept in the store and caches.
+    """
+
+    name: str
+    storage_dtype: np.dtype
+
+    def encode(self, items: list[str]) -> np.ndarray: ...
+
+
+class TorchBackend:
+    """
+    The reference implementation: sentence-transformers on PyTorch.
+    """
+
+    name = "torch"
+    storage_dtype = np.dtype(np.float32)
+
+    def __init__(self, model_name: str):
+        # deferred: importing sentence_transformers pulls in torch (several seconds)
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def encode(self, items: list[str]) -> np.ndarray:
+        return self.model.encode(items, convert_to_numpy=True)
+
+
+def onnx_dir(model_name: str) -> Path:
+    return ONNX_DIR / re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+
+
+def export_onnx(model_name: str, out_dir: Path | None = None, quantize: bool = True) -> Path:
+    """
+    Export the model's transformer to ONNX, optionally with dynamic int8 weights,
+    next to its tokenizer and the pooling settings needed to reproduce
+    SentenceTransformer.encode. Needs torch, onnx, onnxscript (for torch.onnx.export
+    on recent torch) and onnxruntime (see requirements-onnx.txt); run once at build time:
+        python -m backend.core.embedding_backends
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    out_dir = Path(out_dir or onnx_dir(model_name))
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    st = SentenceTransformer(model_name, device="cpu")
+    transformer = st[0].auto_model.eval()
+    transformer.config.return_dict = False
+    st.tokenizer.save_pretrained(out_dir)
+
+    pooling = next(m for m in st if isinstance(m, Pooling))
+    if not pooling.pooling_mode_mean_tokens:
+        raise ValueError(f"{model_name} does not use mean pooling, which the ONNX backend implements")
+
+    # Trace with every input the tokenizer produces (BERT models also take token_type_ids)
+    sample = st.tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    fp32_path = out_dir / "model.onnx"
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "tokens"} for name in input_names + ["last_hidden_state"]},
+            opset_version=14,
+        )
+
+    model_file = fp32_path.name
+    if quantize:
+        model_file = "model.int8.onnx"
+        quantize_dynamic(str(fp32_path), str(out_dir / model_file), weight_type=QuantType.QInt8)
+
+    meta = {
+        "model": model_name,
+        "model_file": model_file,
+        "input_names": input_names,
+        "max_length": st.max_seq_length,
+        "normalize": any(isinstance(m, Normalize) for m in st),
+    }
+    (out_dir / ONNX_META_FILE).write_text(json.dumps(meta, indent=2))
+    return out_dir
+
+
+class OnnxBackend:
+    """
+    The same model exported to ONNX (int8 weights by default) and run with
+    onnxruntime: mean pooling over the attention mask, then L2 normalization
+    if the original model normalizes. Needs neither torch nor
+    sentence-transformers at runtime once the export exists.
+    Vectors are stored as float16, which halves the store and cache footprint.
+    """
+
+    name = "onnx"
+    storage_dtype = np.dtype(np.float16)
+
+    def __init__(self, model_name: str, model_dir: Path | None = None, threads: int | None = None):
+        # Exporting needs torch and takes a while, so it is never done on a request
+        model_dir = Path(model_dir or onnx_dir(model_name))
+        if not (model_dir / ONNX_META_FILE).exists():
+            raise FileNotFoundError(
+                f"No ONNX export of {model_name} in {model_dir}; "
+                "run `python -m backend.core.embedding_backends` first"
+            )
+
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.meta = json.loads((model_dir / ONNX_META_FILE).read_text())
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            str(model_dir / self.meta["model_file"]), options, providers=["CPUExecutionProvider"]
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+    def encode(self, items: list[str]) -> np.ndarray:
+        if not items:
+            return np.empty((0, 0), dtype=np.float32)
+
+        tokens = self.tokenizer(
+            items, padding=True, truncation=True, max_length=self.meta["max_length"], return_tensors="np"
+        )
+        inputs = {name: tokens[name].astype(np.int64) for name in self.meta["input_names"]}
+        hidden = self.session.run(None, inputs)[0]
+
+        # Mean over real tokens only, as sentence-transformers' Pooling does
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.meta["normalize"]:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+
+BACKENDS = {"torch": TorchBackend, "onnx": OnnxBackend}
+
+
+def load_backend(name: str, model_name: str) -> EmbeddingBackend:
+    try:
+        backend_cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {name!r}, expected one of {sorted(BACKENDS)}") from None
+    return backend_cls(model_name)
+
+
+if __name__ == "__main__":
+    # Export ahead of time, e.g. while building the container image
+    from .config import EMBEDDING_MODEL
+    print(f"ONNX model exported to {export_onnx(EMBEDDING_MODEL)}")
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import BinaryIO
+
+import numpy as np
+
+# Bump when the on-disk layout changes so old stores are rebuilt
+STORE_VERSION = 1
+
+VECTORS_FILE = "vectors.npy"
+META_FILE = "meta.json"
+
+
+def file_digest(path: Path) -> str:
+    """
+    SHA-256 of a file's bytes, used to detect edits to the JSON catalogs.
+    """
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def write_atomic(path: Path, write: Callable[[BinaryIO], None]) -> None:
+    """
+    Write `path` through a temporary file of its own in the same directory, then
+    rename it into place: readers and concurrent writers never share a partial file.
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def store_fingerprint(
+    model_name: str,
+    sources: Iterable[Path],
+    backend: str = "torch",
+    dtype: np.dtype | str = np.float32,
+) -> dict:
+    """
+    Everything a stored embedding depends on: store layout, model, how the model
+    is run, the stored dtype and the source files.
+    """
+    return {
+        "version": STORE_VERSION,
+        "model": model_name,
+        "backend": backend,
+        "dtype": np.dtype(dtype).name,
+        "sources": {Path(p).name: file_digest(p) for p in sources},
+    }
+
+
+def collect_skills(roles_path: Path, known_skills_path: Path) -> list[str]:
+    """
+    Every known skill followed by every role skill, deduplicated in a stable order.
+    """
+    known = json.loads(Path(known_skills_path).read_text())
+    roles = json.loads(Path(roles_path).read_text())
+    skills = list(known)
+    for role_skills in roles.values():
+        skills.extend(role_skills)
+    return list(dict.fromkeys(skills))
+
+
+class EmbeddingStore:
+    """
+    Precomputed embeddings for a fixed skill vocabulary.
+
+    On disk the store is a float32 or float16 matrix (vectors.npy, memory-mapped on load)
+    plus meta.json holding the vocabulary and the fingerprint it was built from.
+    Skills outside the vocabulary are handed to the encode function on lookup.
+    """
+
+    def __init__(self, vocab: list[str], vectors: np.ndarray, fingerprint: dict):
+        if len(vocab) != len(vectors):
+            raise ValueError("Vocabulary and vector matrix have different lengths")
+        self.vocab = list(vocab)
+        self.vectors = vectors
+        self.fingerprint = fingerprint
+        self.index = {skill: i for i, skill in enumerate(self.vocab)}
+
+    def __len__(self) -> int:
+        return len(self.vocab)
+
+    def __contains__(self, skill: str) -> bool:
+        return skill in self.index
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    def lookup(self, items: list[str], encode: Callable[[list[str]], np.ndarray]) -> np.ndarray:
+        """
+        Return one embedding row per item, in order.
+        Stored skills are copied out of the matrix; only unseen skills are encoded.
+        """
+        out = np.empty((len(items), self.dim), dtype=np.float32)
+        unseen: dict[str, list[int]] = {}
+
+        for i, skill in enumerate(items):
+            row = self.index.get(skill)
+            if row is None:
+                unseen.setdefault(skill, []).append(i)
+            else:
+                out[i] = self.vectors[row]
+
+        # Encode each unseen skill once, even if it appears several times
+        if unseen:
+            new_skills = list(unseen)
+            encoded = np.asarray(encode(new_skills), dtype=np.float32)
+            for skill, vec in zip(new_skills, encoded):
+                out[unseen[skill]] = vec
+
+        return out
+
+    @classmethod
+    def build(
+        cls,
+        skills: list[str],
+        encode: Callable[[list[str]], np.ndarray],
+        fingerprint: dict,
+        dtype: np.dtype | str = np.float32,
+    ) -> "EmbeddingStore":
+        vocab = list(dict.fromkeys(skills))
+        vectors = np.asarray(encode(vocab), dtype=dtype)
+        return cls(vocab, vectors, fingerprint)
+
+    def save(self, directory: Path) -> None:
+        """
+        Write the store atomically: readers never see a half-written matrix,
+        and meta.json is replaced last so it always describes vectors.npy.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        write_atomic(directory / VECTORS_FILE, lambda f: np.save(f, np.ascontiguousarray(self.vectors)))
+        meta = {"fingerprint": self.fingerprint, "vocab": self.vocab}
+        write_atomic(directory / META_FILE, lambda f: f.write(json.dumps(meta).encode()))
+
+    @classmethod
+    def load(cls, directory: Path, fingerprint: dict | None = None) -> "EmbeddingStore | None":
+        """
+        Load a saved store, or return None if it is missing, corrupt or stale.
+        """
+        directory = Path(directory)
+        try:
+            meta = json.loads((directory / META_FILE).read_text())
+            vectors = np.load(directory / VECTORS_FILE, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+        if fingerprint is not None and meta.get("fingerprint") != fingerprint:
+            return None
+        if vectors.ndim != 2 or len(vectors) != len(meta.get("vocab", [])):
+            return None
+
+        return cls(meta["vocab"], vectors, meta["fingerprint"])
+
+    @classmethod
+    def load_or_build(
+        cls,
+        directory: Path,
+        skills: list[str],
+        encode: Callable[[list[str]], np.ndarray],
+        fingerprint: dict,
+        dtype: np.dtype | str = np.float32,
+    ) -> "EmbeddingStore":
+        """
+        Reuse the store on disk if it matches the fingerprint, otherwise rebuild and save it.
+        """
+        store = cls.load(directory, fingerprint)
+        if store is not None:
+            return store
+
+        store = cls.build(skills, encode, fingerprint, dtype)
+        try:
+            store.save(directory)
+        except OSError:
+            # Read-only filesystem: keep serving from memory
+            pass
+        return store
@@ -0,0 +1,254 @@
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from sqlalchemy import (
+    Column,
+    Float,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    Text,
+    create_engine,
+    delete,
+    select,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# How a handler reports bad input (e.g. an unknown role or a PDF over the limits)
+# or an unavailable dependency (a model that failed to load, a database error)
+HANDLER_ERRORS = (ValueError, RuntimeError, OSError)
+
+
+class QueueFull(Exception):
+    """
+    Raised by submit() when max_queued jobs are already waiting.
+    """
+
+
+@dataclass
+class Job:
+    id: str
+    status: str
+    payload: dict
+    pdf: bytes | None = None
+    result: dict = field(default_factory=dict)
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    def view(self) -> dict:
+        """
+        What clients see: status plus whatever part of the result exists so far.
+        """
+        return {"job_id": self.id, "status": self.status, "result": dict(self.result), "error": self.error}
+
+
+class SQLiteJobTable:
+    """
+    Persistent copy of every job, so status survives a restart and
+    jobs that were queued or running are picked up again.
+    """
+
+    def __init__(self, url: str):
+        if url.startswith("sqlite:///") and url != "sqlite:///:memory:":
+            Path(url.removeprefix("sqlite:///")).parent.mkdir(parents=True, exist_ok=True)
+        self.engine = create_engine(url)
+        self.table = Table(
+            "jobs",
+            MetaData(),
+            Column("id", String(32), primary_key=True),
+            Column("status", String(16), nullable=False),
+            Column("payload", Text, nullable=False),
+            Column("pdf", LargeBinary),
+            Column("result", Text, nullable=False),
+            Column("error", Text),
+            Column("created_at", Float, nullable=False),
+            Column("updated_at", Float, nullable=False),
+        )
+        self.table.metadata.create_all(self.engine)
+
+    def save(self, job: Job) -> None:
+        values = {
+            "id": job.id,
+            "status": job.status,
+            "payload": json.dumps(job.payload),
+            "pdf": job.pdf,
+            "result": json.dumps(job.result),
+            "error": job.error,
+            "created_at": job.created_at,
+            "updated_at": job.updated_at,
+        }
+        stmt = sqlite_insert(self.table).values(**values)
+        stmt = stmt.on_conflict_do_update(index_elements=[self.table.c.id], set_=values)
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+
+    def load(self, job_id: str) -> Job | None:
+        with self.engine.connect() as conn:
+            row = conn.execute(select(self.table).where(self.table.c.id == job_id)).first()
+        return self._job(row) if row is not None else None
+
+    def unfinished(self) -> list[Job]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(self.table).where(self.table.c.status.in_([QUEUED, RUNNING])).order_by(self.table.c.created_at)
+            ).all()
+        return [self._job(row) for row in rows]
+
+    def purge(self, before: float) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(
+                delete(self.table).where(self.table.c.status.in_([DONE, FAILED]), self.table.c.updated_at < before)
+            )
+
+    @staticmethod
+    def _job(row) -> Job:
+        return Job(
+            id=row.id,
+            status=row.status,
+            payload=json.loads(row.payload),
+            pdf=row.pdf,
+            result=json.loads(row.result),
+            error=row.error,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+        )
+
+
+class JobQueue:
+    """
+    In-process job queue drained by a pool of worker threads.
+
+    handler(payload, pdf, update) runs one job. It calls update(partial) each
+    time part of the result is ready; pollers see those parts immediately.
+    Finished jobs are kept for `ttl` seconds. With a SQLiteJobTable every
+    change is written through, and unfinished jobs are re-queued on start().
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[dict, bytes | None, Callable[[dict], None]], None],
+        workers: int = 2,
+        max_queued: int = 100,
+        ttl: float = 3600,
+        table: SQLiteJobTable | None = None,
+    ):
+        self.handler = handler
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self.table = table
+        self._jobs: dict[str, Job] = {}
+        self._queue: queue.Queue[str | None] = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+    def submit(self, payload: dict, pdf: bytes | None = None) -> Job:
+        if self._queue.qsize() >= self.max_queued:
+            raise QueueFull(f"{self.max_queued} jobs are already queued")
+
+        job = Job(id=uuid.uuid4().hex, status=QUEUED, payload=payload, pdf=pdf)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._persist(job)
+        self._queue.put(job.id)
+        return job
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job.view()
+        # Possibly finished by an earlier process
+        if self.table is not None:
+            job = self.table.load(job_id)
+            return job.view() if job is not None else None
+        return None
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        if self.table is not None:
+            for job in self.table.unfinished():
+                job.status = QUEUED
+                with self._lock:
+                    self._jobs[job.id] = job
+                self._queue.put(job.id)
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5) -> None:
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _work(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            with self._lock:
+                job = self._jobs.get(job_id)
+            if job is None:
+                continue
+            self._run(job)
+            self._purge()
+
+    def _run(self, job: Job) -> None:
+        self._change(job, status=RUNNING)
+
+        def update(partial: dict) -> None:
+            self._change(job, result={**job.result, **partial})
+
+        try:
+            self.handler(job.payload, job.pdf, update)
+        except HANDLER_ERRORS as e:
+            logger.warning("Job %s failed: %s", job.id, e)
+            status, error = FAILED, str(e) or type(e).__name__
+        except Exception as e:
+            # A bug in the handler fails the job without taking the worker down
+            logger.exception("Job %s crashed", job.id)
+            status, error = FAILED, str(e) or type(e).__name__
+        else:
+            status, error = DONE, None
+
+        # The PDF is only needed while the job runs
+        job.pdf = None
+        self._change(job, status=status, error=error)
+
+    def _change(self, job: Job, **changes) -> None:
+        with self._lock:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.updated_at = time.time()
+        self._persist(job)
+
+    def _persist(self, job: Job) -> None:
+        if self.table is not None:
+            self.table.save(job)
+
+    def _purge(self) -> None:
+        before = time.time() - self.ttl
+        with self._lock:
+            expired = [i for i, j in self._jobs.items() if j.status in (DONE, FAILED) and j.updated_at < before]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if self.table is not None:
+            self.table.purge(before)
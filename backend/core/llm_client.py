@@ -0,0 +1,142 @@
+import asyncio
+import os
+import weakref
+
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    OpenAIError,
+    RateLimitError,
+)
+
+from .metrics import LLM_RETRIES, stage
+from .resilience import CircuitBreaker, CircuitOpen, RetryBudget, backoff_delay
+
+# Async OpenAI access for the API: one pooled client per event loop, a per-call
+# timeout, bounded concurrency, jittered exponential backoff within a global
+# retry budget, and a circuit breaker that fails fast while the provider is down.
+# OPENAI_BASE_URL points the client at another endpoint, e.g. a local stub.
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))            # seconds per attempt
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_CAP = float(os.getenv("LLM_BACKOFF_CAP", "8"))
+LLM_RETRY_BUDGET_RATIO = float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.2"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+# Errors worth another attempt; anything else (bad request, auth) is final
+RETRYABLE = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError, TimeoutError)
+
+retry_budget = RetryBudget(LLM_RETRY_BUDGET_RATIO)
+breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET)
+
+
+# Replaces AsyncOpenAI on every loop when set, e.g. with a stub in benchmarks
+_client_override = None
+
+
+class _LoopState:
+    # The HTTP connection pool and the semaphore both belong to one event loop
+    def __init__(self):
+        self.client = _client_override or AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=OPENAI_BASE_URL,
+            timeout=LLM_TIMEOUT,
+            max_retries=0,   # retries happen below, within the budget
+        )
+        self.semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        self.inflight: dict[str, asyncio.Task] = {}
+
+
+_states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+
+
+def _state() -> _LoopState:
+    loop = asyncio.get_running_loop()
+    state = _states.get(loop)
+    if state is None:
+        state = _states[loop] = _LoopState()
+    return state
+
+
+def set_client(client) -> None:
+    """
+    Use this client instead of AsyncOpenAI, e.g. a local stub in benchmarks.
+    """
+    global _client_override
+    _client_override = client
+    _states.clear()
+
+
+def reset() -> None:
+    """
+    Drop clients and breaker/budget state, e.g. after changing settings in tests.
+    """
+    global retry_budget, breaker
+    _states.clear()
+    retry_budget = RetryBudget(LLM_RETRY_BUDGET_RATIO)
+    breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET)
+
+
+def _retry_after(e: Exception) -> float | None:
+    # Honour the provider's Retry-After hint on 429s when it sends one
+    response = getattr(e, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+async def chat_completion(**kwargs):
+    """
+    client.chat.completions.create with timeouts, retries and the circuit breaker.
+    Raises CircuitOpen without calling the provider while the breaker is open.
+    """
+    if not breaker.allow():
+        raise CircuitOpen("The LLM provider is degraded")
+
+    state = _state()
+    retry_budget.deposit()
+    attempt = 0
+    while True:
+        try:
+            async with state.semaphore:
+                with stage("llm"):
+                    resp = await asyncio.wait_for(state.client.chat.completions.create(**kwargs), LLM_TIMEOUT)
+        except RETRYABLE as e:
+            breaker.record_failure()
+            if attempt >= LLM_MAX_RETRIES or not breaker.allow() or not retry_budget.withdraw():
+                raise
+            delay = _retry_after(e) or backoff_delay(attempt, LLM_BACKOFF_BASE, LLM_BACKOFF_CAP)
+            LLM_RETRIES.inc()
+            attempt += 1
+            await asyncio.sleep(min(delay, LLM_BACKOFF_CAP))
+        except OpenAIError:
+            # The provider answered, just not with something usable
+            breaker.record_success()
+            raise
+        except BaseException:
+            breaker.abandon()
+            raise
+        else:
+            breaker.record_success()
+            return resp
+
+
+async def coalesced(key: str, factory):
+    """
+    Await factory() once per key at a time; concurrent callers share the result.
+    """
+    state = _state()
+    task = state.inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        state.inflight[key] = task
+        task.add_done_callback(lambda _: state.inflight.pop(key, None))
+    # shield: a cancelled caller must not cancel the shared call for the others
+    return await asyncio.shield(task)
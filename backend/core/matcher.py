@@ -0,0 +1,172 @@
+import difflib
+from collections import deque
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+
+
+def _is_word(ch: str) -> bool:
+    # Same notion of a word character as the regex \b boundary
+    return ch.isalnum() or ch == "_"
+
+
+def _trigrams(s: str) -> set[str]:
+    # Padded so short strings and shared prefixes/suffixes still produce grams
+    padded = f"  {s} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Automaton:
+    """
+    Aho-Corasick automaton: finds every occurrence of every pattern in one pass,
+    so scanning costs O(len(text) + matches) regardless of vocabulary size.
+    """
+
+    def __init__(self, patterns: list[str]):
+        self.lengths = [len(p) for p in patterns]
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail = [0]
+        self.out: list[list[int]] = [[]]
+
+        # 1. Trie of all patterns
+        for pid, pattern in enumerate(patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(pid)
+
+        # 2. Failure links, breadth first; outputs inherit from their fallback state
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[tuple[int, int, int]]:
+        """
+        Yield (start, end, pattern_id) for every occurrence, overlaps included.
+        """
+        goto, fail, out, lengths = self.goto, self.fail, self.out, self.lengths
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pid in out[state]:
+                yield i + 1 - lengths[pid], i + 1, pid
+
+
+class SkillMatcher:
+    """
+    Every lookup structure for one skill vocabulary, built once and reused:
+      - a lowercase hash map for exact lookups
+      - an Aho-Corasick automaton for word-boundary and substring matches
+      - a trigram index that narrows fuzzy-match candidates before difflib scores them
+    """
+
+    def __init__(self, known_skills: Iterable[str]):
+        self.known_skills = list(known_skills)
+        self._vocab = set(self.known_skills)
+
+        # Lowercase key -> canonical skill; the first spelling in the list wins
+        self._exact: dict[str, str] = {}
+        for skill in self.known_skills:
+            key = skill.lower()
+            if key.strip():
+                self._exact.setdefault(key, skill)
+
+        # When every skill starts and ends with a word character, any occurrence
+        # at token boundaries is also a \b-bounded match that find_all reports
+        self.word_bounded = all(_is_word(k[0]) and _is_word(k[-1]) for k in self._exact)
+
+        self._keys = list(self._exact)
+        self._automaton = _Automaton(self._keys)
+
+        self._grams: dict[str, list[int]] = {}
+        for kid, key in enumerate(self._keys):
+            for gram in _trigrams(key):
+                self._grams.setdefault(gram, []).append(kid)
+
+    def __contains__(self, skill: str) -> bool:
+        # Case-sensitive membership, like `skill in known_skills`
+        return skill in self._vocab
+
+    def lookup(self, raw: str) -> str | None:
+        """
+        Case-insensitive exact match.
+        """
+        return self._exact.get(raw.strip().lower())
+
+    def find_all(self, text: str) -> set[str]:
+        """
+        Canonical skills that occur in text as whole words (regex \\b semantics),
+        case-insensitively.
+        """
+        lowered = text.lower()
+        n = len(lowered)
+        found = set()
+        for start, end, kid in self._automaton.iter_matches(lowered):
+            before = start > 0 and _is_word(lowered[start - 1])
+            after = end < n and _is_word(lowered[end])
+            if before != _is_word(lowered[start]) and after != _is_word(lowered[end - 1]):
+                found.add(self._exact[self._keys[kid]])
+        return found
+
+    def find_substring(self, raw: str) -> str | None:
+        """
+        The earliest-listed skill contained anywhere in raw, e.g. "docker-compose" -> "Docker".
+        """
+        # Keys are in first-seen list order, so the smallest id is the earliest-listed skill
+        kids = [kid for _, _, kid in self._automaton.iter_matches(raw.lower())]
+        return self._exact[self._keys[min(kids)]] if kids else None
+
+    def fuzzy(self, raw: str, cutoff: float = 0.7) -> str | None:
+        """
+        Closest spelling by difflib ratio, scored only against skills sharing a trigram.
+        """
+        lw = raw.strip().lower()
+        candidates = {kid for gram in _trigrams(lw) for kid in self._grams.get(gram, ())}
+        match = difflib.get_close_matches(lw, [self._keys[kid] for kid in candidates], n=1, cutoff=cutoff)
+        return self._exact[match[0]] if match else None
+
+    def resolve(self, raw: str, cutoff: float = 0.7) -> str | None:
+        """
+        The canonical skill for raw by exact, substring, then fuzzy match; None if none applies.
+        """
+        word = raw.strip()
+        if not word:
+            return None
+        return self.lookup(word) or self.find_substring(word) or self.fuzzy(word, cutoff)
+
+    def normalize(self, raw: str, cutoff: float = 0.7) -> str:
+        """
+        Normalize a raw skill string to a canonical skill:
+        1. exact match
+        2. substring match
+        3. fuzzy match
+        4. fallback: return original input
+        """
+        return self.resolve(raw, cutoff) or raw.strip()
+
+
+@lru_cache(maxsize=8)
+def _matcher_for(vocab: tuple[str, ...]) -> SkillMatcher:
+    return SkillMatcher(vocab)
+
+
+def get_matcher(known_skills: Iterable[str]) -> SkillMatcher:
+    """
+    Shared matcher for a vocabulary; built on first use and cached.
+    """
+    return _matcher_for(tuple(known_skills))
@@ -0,0 +1,212 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Instrumentation switches; with METRICS=off every call below is a cheap no-op
+METRICS_ENABLED = os.getenv("METRICS", "on").lower() != "off"
+SERVER_TIMING = os.getenv("SERVER_TIMING", "off").lower() == "on"
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    A value that only goes up, per label combination.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            return [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in sorted(self.values.items())]
+
+
+class Gauge(Counter):
+    """
+    A value that goes up and down, e.g. requests currently in flight.
+    """
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self.values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """
+    Observations counted into fixed buckets, plus their sum and count.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.values: dict[tuple, list] = {}  # key -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            row = self.values.get(key)
+            if row is None:
+                row = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[bisect_left(self.buckets, value)] += 1
+            row[-1] += value
+
+    def _samples(self) -> list[str]:
+        lines = []
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self.values.items())
+        for key, row in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), row):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {row[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Every metric in the Prometheus text exposition format.
+        """
+        return "\n".join(line for m in self.metrics for line in m.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter("skillgap_requests_total", "HTTP requests by handler and status.", ("handler", "status")))
+REQUEST_SECONDS = REGISTRY.register(Histogram("skillgap_request_seconds", "HTTP request latency by handler.", ("handler",)))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge("skillgap_requests_in_flight", "HTTP requests being handled."))
+POOL_PENDING = REGISTRY.register(Gauge("skillgap_pool_pending", "Tasks queued or running per execution pool.", ("pool",)))
+STAGE_SECONDS = REGISTRY.register(Histogram("skillgap_stage_seconds", "Time spent per pipeline stage.", ("stage",)))
+CACHE_EVENTS = REGISTRY.register(Counter("skillgap_cache_events_total", "Cache lookups by cache and result.", ("cache", "result")))
+LLM_ERRORS = REGISTRY.register(Counter("skillgap_llm_errors_total", "Failed recommendation requests by kind.", ("kind",)))
+LLM_RETRIES = REGISTRY.register(Counter("skillgap_llm_retries_total", "LLM calls retried after a transient error."))
+RESUME_PAGES = REGISTRY.register(
+    Histogram("skillgap_resume_pages", "Pages per extracted resume.", buckets=(1, 2, 3, 5, 10, 20, 50))
+)
+
+# Stage timings of the current request, for the Server-Timing header
+_request_timings: ContextVar[list | None] = ContextVar("request_timings", default=None)
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, stage=self.name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((self.name, elapsed))
+        return False
+
+
+def stage(name: str):
+    """
+    Time a block as one pipeline stage:
+        with stage("embed"):
+            ...
+    Recorded in skillgap_stage_seconds and, inside a request, in its Server-Timing header.
+    """
+    return _Stage(name) if METRICS_ENABLED else _NULL_STAGE
+
+
+def start_request_timings() -> list:
+    """
+    Start collecting stage timings for the current request (context-local).
+    """
+    timings: list = []
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing(timings: list, total: float | None = None) -> str:
+    """
+    Format (stage, seconds) pairs as a Server-Timing header; repeated stages are summed.
+    """
+    merged: dict[str, float] = {}
+    for name, seconds in timings:
+        merged[name] = merged.get(name, 0.0) + seconds
+    if total is not None:
+        merged["total"] = total
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in merged.items())
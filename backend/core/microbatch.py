@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+
+import numpy as np
+
+# Histogram bucket upper bounds
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+LATENCY_MS_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def _bucket(value: float, bounds: tuple) -> str:
+    for bound in bounds:
+        if value <= bound:
+            return f"<={bound}"
+    return f">{bounds[-1]}"
+
+
+class MicroBatcher:
+    """
+    Gathers calls from many threads over a short window into one call of `fn`.
+
+    Each submit() hands over a list of strings and blocks until its rows come
+    back. A background thread takes the first waiting request, keeps collecting
+    for `window` seconds (or until max_batch strings), deduplicates the strings
+    across requests, calls fn once and hands every caller its own rows.
+    With window <= 0 submit() just calls fn directly.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[list[str]], np.ndarray],
+        window: float = 0.003,
+        max_batch: int = 256,
+        name: str = "microbatch",
+    ):
+        self.fn = fn
+        self.window = window
+        self.max_batch = max_batch
+        self.name = name
+        self._queue: queue.Queue[tuple[list[str], Future]] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._sizes = {_bucket(b, BATCH_SIZE_BUCKETS): 0 for b in BATCH_SIZE_BUCKETS + (BATCH_SIZE_BUCKETS[-1] + 1,)}
+        self._latency = {_bucket(b, LATENCY_MS_BUCKETS): 0 for b in LATENCY_MS_BUCKETS + (LATENCY_MS_BUCKETS[-1] + 1,)}
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+
+    def submit(self, items: list[str]) -> np.ndarray:
+        if self.window <= 0:
+            return self._call(items)
+
+        future: Future = Future()
+        self._queue.put((items, future))
+        self._ensure_thread()
+        return future.result()
+
+    def after_fork(self) -> None:
+        """
+        Start over in a forked child: the parent's thread does not exist there,
+        and its queue and lock may have been in use at the moment of the fork.
+        """
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "batch_size": dict(self._sizes),
+                "latency_ms": {
+                    "count": self._batches,
+                    "sum": round(self._latency_sum, 3),
+                    "max": round(self._latency_max, 3),
+                    "histogram": dict(self._latency),
+                },
+            }
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def _call(self, items: list[str]) -> np.ndarray:
+        start = time.perf_counter()
+        result = self.fn(items)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self._batches += 1
+            self._items += len(items)
+            self._sizes[_bucket(len(items), BATCH_SIZE_BUCKETS)] += 1
+            self._latency[_bucket(elapsed_ms, LATENCY_MS_BUCKETS)] += 1
+            self._latency_sum += elapsed_ms
+            self._latency_max = max(self._latency_max, elapsed_ms)
+        return result
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0][0])
+
+            # Keep collecting until the window closes or the batch is full
+            deadline = time.monotonic() + self.window
+            while size < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+                size += len(batch[-1][0])
+
+            unique = list(dict.fromkeys(s for items, _ in batch for s in items))
+            try:
+                vectors = np.asarray(self._call(unique)) if unique else None
+            except Exception as e:  # noqa: BLE001 - every waiter gets the error, whatever it is
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            row = {s: i for i, s in enumerate(unique)}
+            for items, future in batch:
+                future.set_result(vectors[[row[s] for s in items]] if items else np.empty((0, 0), dtype=np.float32))
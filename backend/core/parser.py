@@ -1,96 +1,274 @@
-import fitz  # PyMuPDF - For reading and extracting text from a PDF file
-import spacy # process and clean text. Breaks the text into words (tokens), removes punctuation, and helps normalize the input
+import hashlib
 import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
 from pathlib import Path
-import difflib
-import re  # Make sure this is imported
 
+import fitz  # PyMuPDF - For reading and extracting text from a PDF file
+
+from .config import KNOWN_SKILLS_PATH
+from .embedder import get_embeddings
+from .lru import LRUCache
+from .matcher import get_matcher
+from .metrics import CACHE_EVENTS, RESUME_PAGES, stage
+from .skill_index import get_skill_index
+
+logger = logging.getLogger(__name__)
+
+# Limits for uploaded PDFs; anything larger is rejected before it can block a worker
+MAX_PDF_BYTES = int(os.getenv("MAX_PDF_BYTES", str(10 * 1024 * 1024)))
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "30"))
+PDF_TIME_LIMIT = float(os.getenv("PDF_TIME_LIMIT", "15"))   # seconds for the whole document
+SLOW_PAGE_SECONDS = float(os.getenv("SLOW_PAGE_SECONDS", "0.5"))
+
+# Extracted text keyed by SHA-256 of the PDF bytes, so re-uploads skip PyMuPDF
+_text_cache = LRUCache(
+    max_entries=int(os.getenv("PDF_TEXT_CACHE_SIZE", "512")),
+    max_bytes=int(os.getenv("PDF_TEXT_CACHE_BYTES", str(64 * 1024 * 1024))),
+    sizeof=sys.getsizeof,
+)
+
+
+# Free text that no spelling rule recognizes (e.g. "ML", "K8s") is mapped to the
+# nearest known skill by embedding, if the cosine similarity reaches this cutoff.
+# Opt-in: it loads the embedding model for any input the spelling rules miss.
+SEMANTIC_NORMALIZE = os.getenv("SEMANTIC_NORMALIZE", "off").lower() == "on"
+SEMANTIC_CUTOFF = float(os.getenv("SEMANTIC_CUTOFF", "0.75"))
+
+# Skill extraction only reads doc.ents, so every other component is left out
+SPACY_EXCLUDE = ["tagger", "parser", "lemmatizer", "attribute_ruler", "senter"]
+
+# Whether extract_skills runs spaCy NER after the whole-word pass:
+#   on   - always
+#   off  - never
+#   auto - only when NER can add skills the whole-word pass misses (default)
+SKILL_NER = os.getenv("SKILL_NER", "auto").lower()
+
+# Long texts are fed to spaCy in chunks of at most this many characters
+NER_CHUNK_CHARS = int(os.getenv("NER_CHUNK_CHARS", "20000"))
+NER_BATCH_SIZE = int(os.getenv("NER_BATCH_SIZE", "16"))
+NER_N_PROCESS = int(os.getenv("NER_N_PROCESS", "1"))
+
+# spaCy’s English NLP model, loaded on first use (see get_nlp)
+_nlp = None
+_nlp_lock = threading.Lock()
 
-# Load spaCy’s English NLP model
-nlp = spacy.load("en_core_web_sm")
+
+def get_nlp():
+    """
+    Return spaCy's English model trimmed to tokenization and NER, loading it on first call.
+    """
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                import spacy  # deferred: importing spaCy alone takes about a second
+                nlp = spacy.load("en_core_web_sm", exclude=SPACY_EXCLUDE)
+
+                # The shared tok2vec only feeds the excluded components; ner has its own
+                if "tok2vec" in nlp.pipe_names and not nlp.get_pipe("tok2vec").listening_components:
+                    nlp.remove_pipe("tok2vec")
+                _nlp = nlp
+    return _nlp
+
+
+def nlp_loaded() -> bool:
+    return _nlp is not None
 
 
 # Load a list of skills from known_skills.json. 
 # Defaults to 'known_skills.json' in this directory"
-def load_known_skills(path: Path | str = None) -> list[str]:
+def load_known_skills(path: Path | str | None = None) -> list[str]:
     if path is None:
-        path = Path(__file__).parent.parent / "known_skills.json"
+        path = KNOWN_SKILLS_PATH
     return json.loads(Path(path).read_text())
 
 
+def _normalize_all(raw_skills: list[str], known_skills: list[str], cutoff: float = 0.7) -> list[str]:
+    matcher = get_matcher(known_skills)
+    resolved = {raw: matcher.resolve(raw, cutoff) for raw in raw_skills}
+
+    # Everything the spelling rules missed is embedded in one batch
+    unresolved = [raw for raw, skill in resolved.items() if skill is None]
+    semantic = {}
+    if SEMANTIC_NORMALIZE and unresolved:
+        with stage("semantic_normalize"):
+            nearest = get_skill_index(known_skills).nearest(get_embeddings(unresolved), SEMANTIC_CUTOFF)
+        semantic = {raw: skill for raw, skill in zip(unresolved, nearest) if skill is not None}
+
+    return [resolved[raw] or semantic.get(raw, raw) for raw in raw_skills]
+
+
 def normalize_skill(raw: str, known_skills: list[str], cutoff: float = 0.7) -> str:
     """
     Normalize a raw skill string to a canonical skill:
     1. exact match
     2. substring match
-    3. fuzzy match (difflib)
-    4. fallback: return original input
+    3. fuzzy match (difflib, over trigram-filtered candidates)
+    4. semantic match (nearest known skill by embedding, if SEMANTIC_NORMALIZE is on)
+    5. fallback: return original input
+    The lookup structures are built once per vocabulary (see matcher.py, skill_index.py).
     """
     word = raw.strip()
-    if not word:
-        return word
+    return _normalize_all([word], known_skills, cutoff)[0] if word else word
 
-    lw = word.lower()
-    known_lc = [s.lower() for s in known_skills]
 
-    # 1. Exact match
-    for skill in known_skills:
-        if skill.lower() == lw:
-            return skill
+class PDFLimitError(ValueError):
+    """
+    The PDF exceeds the configured byte, page or time limit.
+    """
 
-    # 2. Substring match
-    for skill in known_skills:
-        if skill.lower() in lw:
-            return skill
 
-    # 3. Fuzzy match
-    match = difflib.get_close_matches(lw, known_lc, n=1, cutoff=cutoff)
-    if match:
-        idx = known_lc.index(match[0])
-        return known_skills[idx]
+@dataclass(frozen=True)
+class PageText:
+    number: int
+    text: str
+    seconds: float
 
-    # 4. Fallback: not found
-    return word
+
+@dataclass(frozen=True)
+class PDFExtraction:
+    text: str
+    sha256: str
+    page_seconds: list[float]   # empty when served from the cache
+    cached: bool
+
+
+# Takes in PDF content as bytes, opens the PDF in memory using
+# PyMuPDF and yields each page's text as soon as it is extracted
+def iter_pdf_pages(
+    pdf_bytes: bytes,
+    max_pages: int = MAX_PDF_PAGES,
+    time_limit: float = PDF_TIME_LIMIT,
+) -> Iterator[PageText]:
+    if len(pdf_bytes) > MAX_PDF_BYTES:
+        raise PDFLimitError(f"PDF is larger than {MAX_PDF_BYTES} bytes")
+
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        if doc.page_count > max_pages:
+            raise PDFLimitError(f"PDF has {doc.page_count} pages, the limit is {max_pages}")
+
+        deadline = time.perf_counter() + time_limit
+        for page in doc:
+            start = time.perf_counter()
+            text = page.get_text()
+            seconds = time.perf_counter() - start
+
+            if seconds > SLOW_PAGE_SECONDS:
+                logger.warning("Slow PDF page %d: %.2fs", page.number, seconds)
+            yield PageText(page.number, text, seconds)
+
+            if time.perf_counter() > deadline:
+                raise PDFLimitError(f"PDF text extraction took longer than {time_limit}s")
+
+
+def extract_pdf(pdf_bytes: bytes) -> PDFExtraction:
+    """
+    Extract text with limits enforced, reusing earlier results for identical bytes.
+    """
+    digest = hashlib.sha256(pdf_bytes).hexdigest()
+    text = _text_cache.get(digest)
+    if text is not None:
+        CACHE_EVENTS.inc(cache="pdf_text", result="hit")
+        return PDFExtraction(text=text, sha256=digest, page_seconds=[], cached=True)
+
+    CACHE_EVENTS.inc(cache="pdf_text", result="miss")
+    with stage("pdf_text"):
+        pages = list(iter_pdf_pages(pdf_bytes))
+    RESUME_PAGES.observe(len(pages))
+    text = "".join(p.text for p in pages)
+    _text_cache.set(digest, text)
+    return PDFExtraction(text=text, sha256=digest, page_seconds=[p.seconds for p in pages], cached=False)
 
 
-# Takes in PDF content as bytes, opens the PDF in memory using 
-# PyMuPDF and loops through each page and collects the text
 def extract_text_from_pdf(pdf_bytes: bytes) -> str:
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    text = ""
-    for page in doc:
-        text += page.get_text()
-    return text
+    return extract_pdf(pdf_bytes).text
 
 
-def extract_skills(text: str, known_skills: list[str]) -> list[str]:
+def _chunks(text: str, size: int = NER_CHUNK_CHARS) -> Iterator[str]:
+    # Split at the last line break (or space) before the limit so words stay whole
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            cut = text.rfind("\n", start, end)
+            if cut <= start:
+                cut = text.rfind(" ", start, end)
+            if cut > start:
+                end = cut + 1
+        yield text[start:end]
+        start = end
+
+
+def _use_ner(matcher, ner: bool | None) -> bool:
+    if ner is not None:
+        return ner
+    if SKILL_NER == "auto":
+        # NER only keeps entities that exactly equal a known skill, which the
+        # whole-word pass already finds unless a skill starts or ends with
+        # punctuation (e.g. "C++")
+        return not matcher.word_bounded
+    return SKILL_NER == "on"
+
+
+def extract_skills(text: str, known_skills: list[str], ner: bool | None = None) -> list[str]:
     """
     Extract skills from text using:
-      1. regex exact matches
-      2. spaCy named entities
+      1. whole-word exact matches (Aho-Corasick)
+      2. spaCy named entities (see SKILL_NER; `ner` overrides it)
       3. normalization (fuzzy match)
     """
-    # 1. Exact matches using regex
-    pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, known_skills)) + r")\b", re.IGNORECASE)
-    found = {m.group(0) for m in pattern.finditer(text)}
+    matcher = get_matcher(known_skills)
+
+    # 1. Whole-word matches in a single pass over the text
+    with stage("skill_match"):
+        found = matcher.find_all(text)
 
     # 2. Named Entity Recognition
-    doc = nlp(text)
-    for ent in doc.ents:
-        if ent.text in known_skills:
-            found.add(ent.text)
+    if _use_ner(matcher, ner):
+        with stage("ner"):
+            for doc in get_nlp().pipe(_chunks(text)):
+                found.update(ent.text for ent in doc.ents if ent.text in matcher)
 
     # 3. Normalize everything
-    normalized = [normalize_skill(s, known_skills) for s in found]
+    normalized = [matcher.normalize(s) for s in found]
     return sorted(set(normalized))
 
+
+def extract_skills_batch(
+    texts: list[str],
+    known_skills: list[str],
+    ner: bool | None = None,
+    n_process: int = NER_N_PROCESS,
+    batch_size: int = NER_BATCH_SIZE,
+) -> list[list[str]]:
+    """
+    extract_skills for many texts, with all of them streamed through one nlp.pipe.
+    """
+    matcher = get_matcher(known_skills)
+    found = [matcher.find_all(text) for text in texts]
+
+    if _use_ner(matcher, ner):
+        # Each chunk carries the index of the text it came from
+        chunks = ((chunk, i) for i, text in enumerate(texts) for chunk in _chunks(text))
+        docs = get_nlp().pipe(chunks, as_tuples=True, n_process=n_process, batch_size=batch_size)
+        for doc, i in docs:
+            found[i].update(ent.text for ent in doc.ents if ent.text in matcher)
+
+    return [sorted({matcher.normalize(s) for s in skills}) for skills in found]
+
 def extract_user_skills_manual(manual_input: str, known_skills: list[str]) -> list[str]:
     """
     Parse and normalize comma-separated manual input skills.
     Returns a cleaned and deduplicated list.
     """
     raw_skills = [s.strip() for s in manual_input.split(",") if s.strip()]
-    normalized = [normalize_skill(s, known_skills) for s in raw_skills]
+    normalized = _normalize_all(raw_skills, known_skills)
     return sorted(set(normalized))
 
 
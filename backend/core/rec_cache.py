@@ -0,0 +1,170 @@
+import hashlib
+import json
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future
+from pathlib import Path
+
+from sqlalchemy import (
+    Column,
+    Float,
+    MetaData,
+    String,
+    Table,
+    Text,
+    create_engine,
+    delete,
+    select,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .lru import LRUCache
+from .metrics import CACHE_EVENTS
+
+
+def recommendation_key(skills: Iterable[str], model: str, prompt_version: str, namespace: str = "set") -> str:
+    """
+    Cache key for a recommendation request: the normalized, sorted skill set
+    plus everything else that changes the answer (model, prompt version).
+    """
+    normalized = sorted({s.strip().lower() for s in skills if s.strip()})
+    payload = json.dumps([namespace, model, prompt_version, normalized])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SQLiteTier:
+    """
+    Persistent tier: one row per key holding the JSON value and when it was stored.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl: float | None = None,
+        clock: Callable[[], float] = time.time,
+        table: str = "recommendations",
+    ):
+        if url.startswith("sqlite:///") and url != "sqlite:///:memory:":
+            Path(url.removeprefix("sqlite:///")).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.clock = clock
+        self.engine = create_engine(url)
+        self.table = Table(
+            table,
+            MetaData(),
+            Column("key", String(64), primary_key=True),
+            Column("value", Text, nullable=False),
+            Column("created_at", Float, nullable=False),
+        )
+        self.table.metadata.create_all(self.engine)
+        self.purge_expired()
+
+    def get(self, key: str) -> dict | None:
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(self.table.c.value, self.table.c.created_at).where(self.table.c.key == key)
+            ).first()
+        if row is None:
+            return None
+        if self.ttl is not None and row.created_at + self.ttl <= self.clock():
+            return None
+        return json.loads(row.value)
+
+    def set(self, key: str, value: dict) -> None:
+        stmt = sqlite_insert(self.table).values(key=key, value=json.dumps(value), created_at=self.clock())
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[self.table.c.key],
+            set_={"value": stmt.excluded.value, "created_at": stmt.excluded.created_at},
+        )
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+
+    def purge_expired(self) -> None:
+        if self.ttl is None:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.created_at + self.ttl <= self.clock()))
+
+
+class RecommendationCache:
+    """
+    Two-tier cache for LLM recommendations: an in-process LRU in front of an
+    optional SQLite table, both with the same TTL.
+
+    get_or_compute also de-duplicates concurrent misses (single flight): while one
+    caller is computing a key, other callers for that key wait for its result
+    instead of calling the LLM again. Only successful results are stored; if the
+    computation raises, every waiter gets the exception and nothing is cached.
+
+    `name` labels the cache in metrics, so other JSON values can use it too.
+    """
+
+    def __init__(self, memory: LRUCache, disk: SQLiteTier | None = None, name: str = "recommendations"):
+        self.memory = memory
+        self.disk = disk
+        self.name = name
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0}
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self._count("disk_hits")
+                self.memory.set(key, value)
+                return value
+
+        return None
+
+    def set(self, key: str, value: dict) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def get_or_compute(self, key: str, compute: Callable[[], dict]) -> dict:
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.counters["misses"] += 1
+            else:
+                self.counters["coalesced"] += 1
+        CACHE_EVENTS.inc(cache=self.name, result="miss" if leader else "coalesced")
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+        CACHE_EVENTS.inc(cache=self.name, result=name)
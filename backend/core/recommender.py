@@ -1,11 +1,73 @@
+import asyncio
+import json
 import os
-import json 
 
 from dotenv import load_dotenv
-from openai import OpenAI, OpenAIError, RateLimitError # OpenAI client and error handling
+
+# OpenAI client and error handling
+from openai import OpenAI, OpenAIError, RateLimitError
+
+from . import llm_client
+from .config import CACHE_DIR
+from .lru import LRUCache
+from .metrics import LLM_ERRORS, stage
+from .rec_cache import RecommendationCache, SQLiteTier, recommendation_key
+from .resilience import CircuitOpen
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+
+# Bump whenever SYSTEM_PROMPT or USER_TEMPLATE change so cached answers are not reused
+PROMPT_VERSION = "1"
+
+# "set": one prompt for the whole missing-skill list (default)
+# "per_skill": recommendations cached per skill; only uncached skills go to the LLM
+REC_MODE = os.getenv("REC_MODE", "set").lower()
+
+# Completion tokens one batched per-skill request may use; larger batches are split
+REC_TOKEN_BUDGET = int(os.getenv("REC_TOKEN_BUDGET", "1500"))
+TOKENS_PER_SKILL = 80  # rough size of one skill's entry in the JSON reply
+
+# Bump whenever PER_SKILL_SYSTEM_PROMPT changes
+PER_SKILL_PROMPT_VERSION = "1"
+
+CATEGORIES = ("courses", "projects", "certifications")
+
+# Recommendation cache settings; set REC_CACHE_DB=none to keep the cache in memory only
+REC_CACHE_SIZE = int(os.getenv("REC_CACHE_SIZE", "1024"))
+REC_CACHE_TTL = float(os.getenv("REC_CACHE_TTL", str(7 * 24 * 3600)))
+REC_CACHE_DB = os.getenv("REC_CACHE_DB", f"sqlite:///{CACHE_DIR / 'recommendations.db'}")
+
+# Built on first use so importing this module never fails without credentials
+_client = None
+
+
+def get_client() -> OpenAI:
+    global _client
+    if _client is None:
+        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
+
+
+def set_client(client) -> None:
+    """
+    Replace the OpenAI client, e.g. with a local stub in benchmarks.
+    """
+    global _client
+    _client = client
+
+
+_cache = None
+
+
+def get_cache() -> RecommendationCache:
+    global _cache
+    if _cache is None:
+        disk = None if REC_CACHE_DB.lower() == "none" else SQLiteTier(REC_CACHE_DB, ttl=REC_CACHE_TTL)
+        _cache = RecommendationCache(LRUCache(max_entries=REC_CACHE_SIZE, ttl=REC_CACHE_TTL), disk)
+    return _cache
+
 
 # tells the LLM exactly how to behave and format output
 SYSTEM_PROMPT = """
@@ -28,54 +90,298 @@ Now, respond in that exact JSON-only format.
 # This template will be filled in with the user’s actual missing skills
 USER_TEMPLATE = "The user is missing these skills: {skills}."
 
+# Per-skill mode: one entry per skill so each can be cached and reused on its own
+PER_SKILL_SYSTEM_PROMPT = """
+You are a JSON-only career advisor. When given a list of missing skills,
+you must reply *exactly* with a single JSON object and *nothing else*.
+Use every skill, spelled exactly as given, as a key. Each value has one short
+course, one project and one certification for that skill.
+
+Example format:
+User: The user is missing these skills: Pandas, SQL.
+Assistant:
+{
+  "Pandas": {"courses": ["Intro to Pandas"], "projects": ["Analyze sales data with Pandas"], "certifications": ["Pandas Certification"]},
+  "SQL": {"courses": ["SQL for Data Analysis"], "projects": ["Build a SQL dashboard"], "certifications": ["SQL Certification"]}
+}
+
+Now, respond in that exact JSON-only format.
+"""
 
-def get_recommendations(missing: list[str]) -> dict:
-    # If there are no missing skills, return empty recommendations
-    if not missing:
-        return {
-            "courses": [],
-            "projects": [],
-            "certifications": []
-        }
 
+def _set_request(missing: list[str]) -> dict:
     # Format system/user messages for OpenAI Chat API
     messages = [
         {"role": "system", "content": SYSTEM_PROMPT.strip()},
         {"role": "user", "content": USER_TEMPLATE.format(skills=", ".join(missing))}
     ]
 
-    try:
-        # Call OpenAI ChatCompletion with deterministic settings (no randomness)
-        resp = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            temperature=0.0,     # zero randomness
-            top_p=1.0,           # full probability mass
-            max_tokens=250       # limit output size
-        )
+    # Deterministic settings (no randomness)
+    return {
+        "model": MODEL,
+        "messages": messages,
+        "temperature": 0.0,     # zero randomness
+        "top_p": 1.0,           # full probability mass
+        "max_tokens": 250,      # limit output size
+    }
+
+
+def _reply_content(resp) -> str:
+    # Refusals and tool or empty replies carry no content
+    content = resp.choices[0].message.content
+    if content is None:
+        raise ValueError("Unexpected format: the reply has no content")
+    return content.strip()
+
+
+def _parse_set_reply(resp) -> dict:
+    # Extract and trim the output string
+    content = _reply_content(resp)
+
+    # Ensure output starts/ends like a valid JSON object
+    if not (content.startswith("{") and content.endswith("}")):
+        raise ValueError(f"Unexpected format: {content!r}")
+
+    # Parse and return JSON object
+    return json.loads(content)
+
+
+def _per_skill_request(skills: list[str]) -> dict:
+    messages = [
+        {"role": "system", "content": PER_SKILL_SYSTEM_PROMPT.strip()},
+        {"role": "user", "content": USER_TEMPLATE.format(skills=", ".join(skills))}
+    ]
+    return {
+        "model": MODEL,
+        "messages": messages,
+        "temperature": 0.0,
+        "top_p": 1.0,
+        "max_tokens": min(REC_TOKEN_BUDGET, TOKENS_PER_SKILL * len(skills) + 20),
+        "response_format": {"type": "json_object"},
+    }
+
+
+def _parse_per_skill_reply(skills: list[str], resp) -> dict[str, dict]:
+    reply = json.loads(_reply_content(resp))
+    if not isinstance(reply, dict):
+        raise TypeError(f"Unexpected format: {reply!r}")
+
+    # Accept keys that differ from the requested spelling only by case/whitespace
+    by_key = {str(k).strip().lower(): v for k, v in reply.items()}
+    entries = {}
+    for skill in skills:
+        entry = by_key.get(skill.strip().lower())
+        if isinstance(entry, dict) and all(isinstance(entry.get(c, []), list) for c in CATEGORIES):
+            entries[skill] = {c: [str(x) for x in entry.get(c, [])] for c in CATEGORIES}
+    return entries
+
+
+def _fetch_recommendations(missing: list[str]) -> dict:
+    """
+    Ask the LLM for recommendations. Raises on API errors and on output that is
+    not a JSON object, so failures never reach the cache.
+    """
+    with stage("llm"):
+        resp = get_client().chat.completions.create(**_set_request(missing))
+    return _parse_set_reply(resp)
+
+
+def _fetch_per_skill(skills: list[str]) -> dict[str, dict]:
+    """
+    One structured request for several skills. Returns {skill: entry} for every
+    skill the reply covers with a well-formed entry; the rest are left out.
+    """
+    with stage("llm"):
+        resp = get_client().chat.completions.create(**_per_skill_request(skills))
+    return _parse_per_skill_reply(skills, resp)
 
-        # Extract and trim the output string
-        content = resp.choices[0].message.content.strip()
 
-        # Ensure output starts/ends like a valid JSON object
-        if not (content.startswith("{") and content.endswith("}")):
-            raise ValueError(f"Unexpected format: {content!r}")
+def _skill_batches(skills: list[str]) -> list[list[str]]:
+    # As many skills per request as the token budget allows (at least one)
+    size = max(1, (REC_TOKEN_BUDGET - 20) // TOKENS_PER_SKILL)
+    return [skills[i:i + size] for i in range(0, len(skills), size)]
 
-        # Parse and return JSON object
-        return json.loads(content)
+
+def _merge(entries: list[dict]) -> dict:
+    # Concatenate per-skill entries in missing-skill order, dropping duplicates
+    merged = {c: [] for c in CATEGORIES}
+    for entry in entries:
+        for c in CATEGORIES:
+            for item in entry.get(c, []):
+                if item not in merged[c]:
+                    merged[c].append(item)
+    return merged
+
+
+def _recommendations_per_skill(missing: list[str]) -> dict:
+    """
+    Build recommendations from per-skill cache entries, asking the LLM only for
+    skills with no entry yet (batched into as few requests as the budget allows).
+    """
+    cache = get_cache()
+    skills = list(dict.fromkeys(s.strip() for s in missing if s.strip()))
+    keys = {s: recommendation_key([s], MODEL, PER_SKILL_PROMPT_VERSION, namespace="skill") for s in skills}
+
+    found = {s: cache.get(keys[s]) for s in skills}
+    uncached = [s for s in skills if found[s] is None]
+
+    for batch in _skill_batches(uncached):
+        for skill, entry in _fetch_per_skill(batch).items():
+            cache.set(keys[skill], entry)
+            found[skill] = entry
+
+    if uncached and all(found[s] is None for s in uncached):
+        raise ValueError("LLM reply had no usable per-skill entries")
+
+    return _merge([found[s] for s in skills if found[s] is not None])
+
+
+def get_recommendations(missing: list[str], mode: str | None = None) -> dict:
+    # If there are no missing skills, return empty recommendations
+    if not missing:
+        return {
+            "courses": [],
+            "projects": [],
+            "certifications": []
+        }
+
+    # temperature=0.0 makes answers deterministic, so identical missing-skill sets share one
+    key = recommendation_key(missing, MODEL, PROMPT_VERSION)
+
+    try:
+        if (mode or REC_MODE) == "per_skill":
+            return _recommendations_per_skill(missing)
+        return get_cache().get_or_compute(key, lambda: _fetch_recommendations(missing))
 
     except (RateLimitError, OpenAIError) as e:
         # Handles rate limit or other API issues
+        LLM_ERRORS.inc(kind="rate_limit" if isinstance(e, RateLimitError) else "api")
         return {
             "courses": [f"[LLM error: {e}]"],
             "projects": [],
             "certifications": []
         }
     
-    except (ValueError, json.JSONDecodeError):
+    except (ValueError, TypeError, json.JSONDecodeError):
         # Handles JSON parsing issues if model responds badly
+        LLM_ERRORS.inc(kind="parse")
         return {
             "courses": ["[Failed to parse LLM output — ensure it’s valid JSON]"],
             "projects": [],
             "certifications": []
-        }
\ No newline at end of file
+        }
+
+
+# Async path used by the API: shares prompts, parsing and the cache with the
+# sync functions above, but calls the LLM through llm_client (pooled async
+# client, timeouts, retry budget, circuit breaker) and degrades instead of failing.
+
+class FallbackRecommendations(dict):
+    """
+    Recommendations served while the LLM is unavailable: whatever per-skill
+    entries are cached, otherwise empty lists. Never stored in any cache.
+    """
+
+
+async def _off_loop(fn, *args):
+    # The cache's SQLite tier blocks, so cache calls run on a worker thread
+    return await asyncio.to_thread(fn, *args)
+
+
+def _cache_get(key: str) -> dict | None:
+    return get_cache().get(key)
+
+
+def _cache_set(key: str, value: dict) -> None:
+    get_cache().set(key, value)
+
+
+def _cached_entries(keys: dict[str, str]) -> dict[str, dict | None]:
+    cache = get_cache()
+    return {s: cache.get(key) for s, key in keys.items()}
+
+
+def _per_skill_keys(skills: list[str]) -> dict[str, str]:
+    return {s: recommendation_key([s], MODEL, PER_SKILL_PROMPT_VERSION, namespace="skill") for s in skills}
+
+
+async def _cached_only(missing: list[str]) -> FallbackRecommendations:
+    entries = await _off_loop(_cached_entries, _per_skill_keys(missing))
+    return FallbackRecommendations(_merge([e for e in entries.values() if e is not None]))
+
+
+def _store_entries(entries: dict[str, dict]) -> None:
+    cache = get_cache()
+    for key, entry in entries.items():
+        cache.set(key, entry)
+
+
+async def _afetch_recommendations(missing: list[str], key: str) -> dict:
+    resp = await llm_client.chat_completion(**_set_request(missing))
+    value = _parse_set_reply(resp)
+    await _off_loop(_cache_set, key, value)
+    return value
+
+
+async def _afetch_per_skill(skills: list[str]) -> dict[str, dict]:
+    resp = await llm_client.chat_completion(**_per_skill_request(skills))
+    return _parse_per_skill_reply(skills, resp)
+
+
+async def _arecommendations_per_skill(missing: list[str]) -> dict:
+    # Same as _recommendations_per_skill, with the uncached batches sent concurrently
+    skills = list(dict.fromkeys(s.strip() for s in missing if s.strip()))
+    keys = _per_skill_keys(skills)
+
+    found = await _off_loop(_cached_entries, keys)
+    uncached = [s for s in skills if found[s] is None]
+
+    replies = await asyncio.gather(*(_afetch_per_skill(b) for b in _skill_batches(uncached)), return_exceptions=True)
+    errors = [r for r in replies if isinstance(r, BaseException)]
+    fetched = {}
+    for reply in replies:
+        if not isinstance(reply, BaseException):
+            fetched.update(reply)
+    if fetched:
+        await _off_loop(_store_entries, {keys[s]: entry for s, entry in fetched.items()})
+    found.update(fetched)
+
+    if uncached and all(found[s] is None for s in uncached):
+        raise errors[0] if errors else ValueError("LLM reply had no usable per-skill entries")
+
+    merged = _merge([found[s] for s in skills if found[s] is not None])
+    if any(found[s] is None for s in skills):
+        # Some skills got no entry: serve the rest, but never cache it as a complete answer
+        LLM_ERRORS.inc(kind="partial")
+        return FallbackRecommendations(merged)
+    return merged
+
+
+async def aget_recommendations(missing: list[str], mode: str | None = None) -> dict:
+    """
+    Async get_recommendations. On provider errors, timeouts or an open circuit it
+    returns FallbackRecommendations instead of error strings.
+    """
+    if not missing:
+        return {c: [] for c in CATEGORIES}
+
+    try:
+        if (mode or REC_MODE) == "per_skill":
+            return await _arecommendations_per_skill(missing)
+
+        key = recommendation_key(missing, MODEL, PROMPT_VERSION)
+        cached = await _off_loop(_cache_get, key)
+        if cached is not None:
+            return cached
+        # Concurrent requests for the same skill set share one LLM call
+        return await llm_client.coalesced(key, lambda: _afetch_recommendations(missing, key))
+
+    except CircuitOpen:
+        LLM_ERRORS.inc(kind="circuit_open")
+    except TimeoutError:
+        LLM_ERRORS.inc(kind="timeout")
+    except (RateLimitError, OpenAIError) as e:
+        LLM_ERRORS.inc(kind="rate_limit" if isinstance(e, RateLimitError) else "api")
+    except (ValueError, TypeError, json.JSONDecodeError):
+        LLM_ERRORS.inc(kind="parse")
+    return await _cached_only(missing)
@@ -0,0 +1,181 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+
+import numpy as np
+
+from .embedder import get_embeddings
+
+# Skill rows scored per matrix product; bounds the temporary similarity block
+BLOCK_ROWS = 8192
+
+
+def _normalize_rows(m: np.ndarray) -> np.ndarray:
+    m = np.atleast_2d(np.asarray(m, dtype=np.float32))
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    return m / np.where(norms == 0, 1, norms)
+
+
+class SkillIndex:
+    """
+    Exact nearest-neighbour search over skill embeddings by cosine similarity.
+
+    Vectors are normalized once on insert, so a query is a blocked matrix
+    product plus a running top-k. At the size of a skill vocabulary (thousands
+    of rows) this takes well under a millisecond and, unlike an approximate
+    index, never misses the true neighbour.
+
+    Skills can be added at any time; the buffer grows geometrically and
+    searches already running keep the rows they started with.
+    """
+
+    def __init__(self, dim: int, block_rows: int = BLOCK_ROWS):
+        self.block_rows = block_rows
+        self.skills: list[str] = []
+        self.index: dict[str, int] = {}
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_vectors(cls, skills: list[str], vectors: np.ndarray, block_rows: int = BLOCK_ROWS) -> "SkillIndex":
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        index = cls(vectors.shape[1], block_rows)
+        index.add(skills, vectors)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.skills)
+
+    def __contains__(self, skill: str) -> bool:
+        return skill in self.index
+
+    @property
+    def dim(self) -> int:
+        return self._vectors.shape[1]
+
+    def add(self, skills: list[str], vectors: np.ndarray) -> None:
+        """
+        Insert skills not already indexed; existing skills keep their vectors.
+        """
+        vectors = _normalize_rows(vectors)
+        if len(skills) != len(vectors):
+            raise ValueError("Skills and vectors have different lengths")
+
+        with self._lock:
+            # Skill -> row in `vectors`, first occurrence only
+            rows: dict[str, int] = {}
+            for i, skill in enumerate(skills):
+                if skill not in self.index:
+                    rows.setdefault(skill, i)
+            if not rows:
+                return
+
+            size = len(self.skills)
+            needed = size + len(rows)
+            if needed > len(self._vectors):
+                # A fresh buffer, so snapshots taken by running searches stay intact
+                grown = np.empty((max(needed, 2 * len(self._vectors)), self.dim), dtype=np.float32)
+                grown[:size] = self._vectors[:size]
+                self._vectors = grown
+
+            self._vectors[size:needed] = vectors[list(rows.values())]
+            for offset, skill in enumerate(rows):
+                self.index[skill] = size + offset
+            self.skills.extend(rows)
+
+    def snapshot(self) -> tuple[list[str], np.ndarray]:
+        """
+        The indexed skills and their normalized vectors, as of now.
+        """
+        with self._lock:
+            n = len(self.skills)
+            return self.skills[:n], self._vectors[:n]
+
+    def search(self, queries: np.ndarray, k: int = 1) -> list[list[tuple[str, float]]]:
+        """
+        The k most similar skills for each query vector, best first, as (skill, cosine).
+        """
+        q = _normalize_rows(queries)
+        skills, vectors = self.snapshot()
+        n = len(skills)
+
+        k = min(k, n)
+        if k == 0:
+            return [[] for _ in range(len(q))]
+
+        best_scores = np.empty((len(q), 0), dtype=np.float32)
+        best_ids = np.empty((len(q), 0), dtype=np.int64)
+        for start in range(0, n, self.block_rows):
+            block = vectors[start:start + self.block_rows]
+            sims = q @ block.T
+
+            # Merge this block into the running top-k
+            scores = np.concatenate([best_scores, sims], axis=1)
+            ids = np.concatenate([best_ids, np.broadcast_to(np.arange(start, start + len(block)), sims.shape)], axis=1)
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                ids = np.take_along_axis(ids, top, axis=1)
+            best_scores, best_ids = scores, ids
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return [
+            [(skills[best_ids[i, j]], float(best_scores[i, j])) for j in order[i]]
+            for i in range(len(q))
+        ]
+
+    def nearest(self, queries: np.ndarray, cutoff: float) -> list[str | None]:
+        """
+        The closest skill for each query vector, or None when it is below cutoff.
+        """
+        return [hits[0][0] if hits and hits[0][1] >= cutoff else None for hits in self.search(queries, k=1)]
+
+
+# Indexes by vocabulary, most recently used last
+MAX_INDEXES = 8
+_indexes: OrderedDict[tuple[str, ...], SkillIndex] = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _index_for(vocab: tuple[str, ...], base: SkillIndex | None) -> SkillIndex:
+    # Only skills the base index lacks are embedded
+    if base is None:
+        return SkillIndex.from_vectors(list(vocab), get_embeddings(list(vocab)))
+    indexed, vectors = base.snapshot()
+    wanted = set(vocab)
+    if all(s in wanted for s in indexed):
+        # The catalog only grew: the base index is extended in place
+        index = base
+    else:
+        # Skills were removed: keep the rows still wanted
+        rows = [i for i, s in enumerate(indexed) if s in wanted]
+        index = SkillIndex.from_vectors([indexed[i] for i in rows], vectors[rows])
+    new = [s for s in vocab if s not in index]
+    if new:
+        index.add(new, get_embeddings(new))
+    return index
+
+
+def get_skill_index(known_skills: Iterable[str]) -> SkillIndex:
+    """
+    Shared index over a vocabulary's embeddings; built on first use and cached.
+    A new vocabulary (e.g. after a catalog reload) starts from the most recently
+    used index and only embeds the skills that one lacks.
+    """
+    vocab = tuple(dict.fromkeys(known_skills))
+    with _indexes_lock:
+        index = _indexes.get(vocab)
+        if index is not None:
+            _indexes.move_to_end(vocab)
+            return index
+        base_vocab, base = next(reversed(_indexes.items()), (None, None))
+
+    index = _index_for(vocab, base)
+    with _indexes_lock:
+        if index is base:
+            # Grown past its old vocabulary, so no longer valid for it
+            _indexes.pop(base_vocab, None)
+        _indexes[vocab] = index
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
@@ -0,0 +1,211 @@
+"""
+Multi-worker serving with shared model memory.
+
+    python -m backend.serve [--workers 4] [--host 0.0.0.0] [--port 8000] [--report-after 30]
+
+Instead of `uvicorn --workers N`, where every worker loads its own models and
+builds its own matrices, this parent process:
+
+  1. builds the embedding store and role matrix files in a throwaway child
+     (so the parent never runs inference and starts no native thread pools),
+  2. preloads spaCy and the embedding model, and memory-maps the store and
+     role matrix from those files,
+  3. freezes the garbage collector so collections in the workers do not
+     write to (and so copy) the preloaded objects,
+  4. binds the socket and forks the workers, which share all of the above
+     copy-on-write or through the page cache.
+
+Workers that die are replaced. A per-worker memory report (RSS, PSS and shared
+pages from /proc/<pid>/smaps_rollup) is logged --report-after seconds after
+start and on SIGUSR1.
+"""
+import argparse
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+
+logger = logging.getLogger("backend.serve")
+
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def _prepare() -> None:
+    # Runs in a spawned child: may run the model, then exits with its threads
+    from backend.core.catalog import get_catalog
+    from backend.core.embedder import get_store
+
+    get_store()
+    get_catalog().role_matrix()
+
+
+def preload() -> None:
+    """
+    Load everything the workers share. Nothing here starts a thread.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    child = ctx.Process(target=_prepare, name="prepare")
+    child.start()
+    child.join()
+    if child.exitcode != 0:
+        logger.warning("Building the shared embedding files failed; workers will build their own")
+
+    from backend.core.catalog import get_catalog
+    from backend.core.embedder import get_model, get_store
+    from backend.core.parser import get_nlp
+
+    steps = [get_nlp, get_model]
+    if child.exitcode == 0:
+        # Both are memory-mapped from the files written above, no inference needed
+        steps += [get_store, lambda: get_catalog().role_matrix()]
+    for step in steps:
+        try:
+            step()
+        except Exception:
+            # Workers load what is missing lazily, each on its own
+            logger.exception("Preloading failed")
+
+
+def parse_smaps_rollup(text: str) -> dict[str, int]:
+    """
+    The SMAPS_FIELDS of a smaps_rollup file, in kB.
+    """
+    values = {}
+    for line in text.splitlines():
+        name, _, rest = line.partition(":")
+        if name in SMAPS_FIELDS:
+            values[name] = int(rest.split()[0])
+    return values
+
+
+def memory_report(pids: list[int]) -> list[dict]:
+    """
+    Memory of each process in MB. `shared` is what the process maps but does
+    not pay for alone (RSS - PSS): roughly what preloading saved per worker.
+    """
+    report = []
+    for pid in pids:
+        try:
+            kb = parse_smaps_rollup(Path(f"/proc/{pid}/smaps_rollup").read_text())
+        except OSError:
+            continue
+        report.append({
+            "pid": pid,
+            "rss_mb": round(kb.get("Rss", 0) / 1024, 1),
+            "pss_mb": round(kb.get("Pss", 0) / 1024, 1),
+            "shared_mb": round((kb.get("Rss", 0) - kb.get("Pss", 0)) / 1024, 1),
+            "private_mb": round((kb.get("Private_Clean", 0) + kb.get("Private_Dirty", 0)) / 1024, 1),
+        })
+    return report
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, log_level: str) -> None:
+    import uvicorn
+
+    from backend.api.main import app
+
+    # Handlers inherited from the parent would stop the parent, not this worker
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+    config = uvicorn.Config(app, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def fork_worker(sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(sock, log_level)
+        except BaseException:
+            logger.exception("Worker crashed")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    args.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    args.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    args.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    args.add_argument("--report-after", type=float, default=30, help="Seconds until the memory report; 0 disables it")
+    args.add_argument("--log-level", default="info")
+    args = args.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    if not hasattr(os, "fork"):
+        sys.exit("backend.serve needs fork(); use uvicorn directly on this platform")
+
+    # Workers find everything loaded already; a background warm-up would only add a thread
+    os.environ.setdefault("WARMUP_MODELS", "off")
+
+    start = time.monotonic()
+    preload()
+    logger.info("Preloaded shared models in %.1fs", time.monotonic() - start)
+
+    sock = bind_socket(args.host, args.port)
+    gc.collect()
+    gc.freeze()
+
+    workers = {fork_worker(sock, args.log_level) for _ in range(args.workers)}
+    logger.info("Serving on %s:%d with workers %s", args.host, args.port, sorted(workers))
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def report(signum=None, frame=None):
+        logger.info("Memory (parent first): %s", json.dumps(memory_report([os.getpid(), *sorted(workers)])))
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGUSR1, report)
+    if args.report_after > 0:
+        signal.signal(signal.SIGALRM, report)
+        signal.setitimer(signal.ITIMER_REAL, args.report_after)
+
+    # Supervise: replace workers that exit unexpectedly until asked to stop
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            logger.warning("Worker %d exited with status %d, starting another", pid, status)
+            time.sleep(1)   # no tight loop if workers die right away
+            workers.add(fork_worker(sock, args.log_level))
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
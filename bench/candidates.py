@@ -0,0 +1,66 @@
+"""
+Role search over a synthetic candidate store.
+
+    python -m bench.candidates [--candidates 100000] [--skills 12] [--repeat 10]
+
+Candidates draw their skills from known_skills.json; embeddings are random
+unit vectors of the model's size, so no model is needed. Prints one JSON
+object with the time to add everyone and the search latencies per role.
+"""
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+
+from backend.core.analyzer import load_role_skills
+from backend.core.candidates import CandidateStore
+from backend.core.parser import load_known_skills
+
+DIM = 384  # all-MiniLM-L6-v2
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=100_000)
+    parser.add_argument("--skills", type=int, default=12, help="Mean skills per candidate")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed searches per role")
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+
+    def embed(skills):
+        return rng.normal(size=(len(skills), DIM)).astype(np.float32)
+
+    vocab = load_known_skills()
+    store = CandidateStore(embed=embed)
+    start = time.perf_counter()
+    for i in range(args.candidates):
+        size = max(1, int(rng.poisson(args.skills)))
+        store.add(f"c{i}", f"resume-{i}.pdf", list(rng.choice(vocab, size=min(size, len(vocab)), replace=False)))
+    add_seconds = time.perf_counter() - start
+
+    roles = load_role_skills()
+    store.search(next(iter(roles.values())), top_k=args.top_k)   # packs the index
+    latencies = {}
+    for role, skills in roles.items():
+        role_vecs = embed(skills)
+        times = []
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            store.search(skills, role_vecs, top_k=args.top_k)
+            times.append(time.perf_counter() - t)
+        latencies[role] = {"median_ms": round(statistics.median(times) * 1000, 2), "max_ms": round(max(times) * 1000, 2)}
+
+    print(json.dumps({
+        "candidates": args.candidates,
+        "vocabulary": len(store.vocab),
+        "add_seconds": round(add_seconds, 2),
+        "search": latencies,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
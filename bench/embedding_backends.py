@@ -0,0 +1,74 @@
+"""
+Throughput and memory of each embedding backend on the same skill list.
+
+    python -m bench.embedding_backends [--backends torch onnx] [--repeat 20] [--batch 64]
+
+Every backend runs in its own interpreter so its RSS is measured in isolation.
+Prints one JSON object per backend. The onnx backend needs requirements-onnx.txt
+and an export made beforehand with python -m backend.core.embedding_backends.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+PROBE = """
+import json, resource, sys, time
+from backend.core.config import EMBEDDING_MODEL
+from backend.core.embedding_backends import load_backend
+from backend.core.parser import load_known_skills
+
+name, repeat, batch = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+start = time.perf_counter()
+backend = load_backend(name, EMBEDDING_MODEL)
+load_seconds = time.perf_counter() - start
+
+skills = load_known_skills()
+texts = [f"{skills[i % len(skills)]} {i}" for i in range(batch)]
+backend.encode(texts[:8])  # first call allocates buffers
+
+latencies = []
+for _ in range(repeat):
+    t = time.perf_counter()
+    backend.encode(texts)
+    latencies.append(time.perf_counter() - t)
+latencies.sort()
+
+print(json.dumps({
+    "backend": name,
+    "load_seconds": round(load_seconds, 3),
+    "texts_per_second": round(batch * repeat / sum(latencies), 1),
+    "batch_ms_p50": round(latencies[len(latencies) // 2] * 1000, 2),
+    "rss_mb": round(rss_mb(), 1),
+    "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+}))
+"""
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--repeat", type=int, default=20, help="Timed encode calls per backend")
+    parser.add_argument("--batch", type=int, default=64, help="Texts per encode call")
+    args = parser.parse_args(argv)
+
+    for name in args.backends:
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE, name, str(args.repeat), str(args.batch)],
+            capture_output=True, text=True, check=False,
+        )
+        if out.returncode != 0:
+            print(json.dumps({"backend": name, "error": out.stderr.strip().splitlines()[-1]}))
+        else:
+            print(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
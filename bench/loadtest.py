@@ -0,0 +1,488 @@
+"""
+Load test of /api/analyze against a local stub of the chat completions API.
+
+    python -m bench.loadtest [--concurrency 8 | --rps 20] [--requests 200] [--workers 1]
+                             [--llm-latency-ms 800] [--llm-error-rate 0.05] [--trace trace.jsonl]
+
+Starts a stub OpenAI endpoint in this process (configurable latency, error
+and timeout injection) and the API in a subprocess pointed at it (uvicorn, or
+backend.serve with --workers > 1), then replays a mix of PDF and manual-skill
+requests either closed-loop at a fixed concurrency or open-loop at a target
+request rate. --url targets an API that is already running instead.
+
+Requests come from a JSONL trace, one object per line:
+
+    {"kind": "pdf", "role": "Data Scientist", "pages": 3}
+    {"kind": "pdf", "path": "resumes/alice.pdf"}
+    {"kind": "manual", "manual_skills": "Python, SQL, k8s"}
+
+("role" is optional), or are generated from --pdf-share and --seed. The trace is
+cycled until --requests have been sent, so the API started here runs with its
+response, recommendation, PDF text and embedding caches off: every request goes
+through the whole pipeline. --warm-caches keeps them (and the environment's
+settings win either way). Reports throughput, latency percentiles, error rate,
+the Server-Timing stage breakdown and cache hit rates (from /metrics) as JSON
+(stdout or --out) and as a table on stderr.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+from backend.core.analyzer import load_role_skills
+from backend.core.parser import load_known_skills
+from bench.pipeline import StubChat, make_pdf, make_resume_text, make_skill_list
+
+
+@dataclass
+class StubSettings:
+    latency_ms: float = 800.0
+    jitter_ms: float = 200.0
+    error_rate: float = 0.0
+    error_status: int = 429
+    timeout_rate: float = 0.0
+    timeout_s: float = 60.0
+
+
+@dataclass
+class StubStats:
+    calls: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class OpenAIStub:
+    """
+    POST /v1/chat/completions with well-formed JSON replies after a random delay;
+    a share of calls fail with error_status or hang for timeout_s instead.
+    """
+
+    def __init__(self, settings: StubSettings, seed: int = 0, port: int = 0):
+        self.settings = settings
+        self.stats = StubStats()
+        self.rng = random.Random(seed)
+        self.chat = StubChat()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive, like the real API
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+                status, body = stub.respond(request)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def respond(self, request: dict) -> tuple[int, dict]:
+        s = self.settings
+        with self.stats.lock:
+            self.stats.calls += 1
+            roll = self.rng.random()
+            delay = max(0.0, self.rng.gauss(s.latency_ms, s.jitter_ms)) / 1000
+
+        if roll < s.timeout_rate:
+            with self.stats.lock:
+                self.stats.timeouts += 1
+            time.sleep(s.timeout_s)
+        else:
+            time.sleep(delay)
+        if roll < s.timeout_rate + s.error_rate:
+            with self.stats.lock:
+                self.stats.errors += 1
+            return s.error_status, {"error": {"message": "injected error", "type": "stub"}}
+
+        reply = self.chat.reply(request.get("messages", []), request.get("response_format"))
+        return 200, {
+            "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply.choices[0].message.content}, "finish_reason": "stop"}],
+        }
+
+    def start(self) -> None:
+        threading.Thread(target=self.server.serve_forever, name="openai-stub", daemon=True).start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+
+
+@dataclass
+class Request:
+    kind: str                    # "pdf" or "manual"
+    role: str
+    pdf: bytes | None = None
+    manual_skills: str | None = None
+
+
+def load_trace(path: Path, roles: list[str], known_skills: list[str], seed: int) -> list[Request]:
+    rng = random.Random(seed)
+    requests = []
+    for line in Path(path).read_text().splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        role = item.get("role") or rng.choice(roles)
+        if item.get("kind", "manual") == "pdf":
+            if "path" in item:
+                pdf = (Path(path).parent / item["path"]).read_bytes()
+            else:
+                pdf = make_pdf(make_resume_text(known_skills, int(item.get("pages", 1)), rng))
+            requests.append(Request("pdf", role, pdf=pdf))
+        else:
+            skills = item.get("manual_skills") or ", ".join(make_skill_list(known_skills, int(item.get("skills", 10)), rng))
+            requests.append(Request("manual", role, manual_skills=skills))
+    return requests
+
+
+def synthetic_trace(count: int, pdf_share: float, roles: list[str], known_skills: list[str], seed: int) -> list[Request]:
+    # A fixed pool of distinct inputs; the run cycles through it
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        role = rng.choice(roles)
+        if rng.random() < pdf_share:
+            pdf = make_pdf(make_resume_text(known_skills, rng.choice([1, 1, 2, 3]), rng))
+            requests.append(Request("pdf", role, pdf=pdf))
+        else:
+            skills = ", ".join(make_skill_list(known_skills, rng.randint(3, 25), rng))
+            requests.append(Request("manual", role, manual_skills=skills))
+    return requests
+
+
+@dataclass
+class Sample:
+    kind: str
+    status: int | str            # HTTP status, or the exception name
+    seconds: float
+    stages: dict[str, float]     # Server-Timing durations in ms
+
+
+def parse_server_timing(header: str | None) -> dict[str, float]:
+    stages = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if name and key == "dur":
+                stages[name] = float(value)
+    return stages
+
+
+async def send(client: httpx.AsyncClient, request: Request) -> Sample:
+    data = {"role": request.role}
+    files = None
+    if request.kind == "pdf":
+        files = {"file": ("resume.pdf", request.pdf, "application/pdf")}
+    else:
+        data["manual_skills"] = request.manual_skills
+
+    start = time.perf_counter()
+    try:
+        r = await client.post("/api/analyze", data=data, files=files)
+        await r.aread()
+        status, stages = r.status_code, parse_server_timing(r.headers.get("server-timing"))
+    except httpx.HTTPError as e:
+        status, stages = type(e).__name__, {}
+    return Sample(request.kind, status, time.perf_counter() - start, stages)
+
+
+async def run_load(url: str, trace: list[Request], total: int, concurrency: int | None, rps: float | None, timeout: float) -> tuple[list[Sample], float]:
+    """
+    Closed loop (`concurrency` requests always in flight) or open loop (a new
+    request every 1/rps seconds, whatever the latency). Returns samples and wall time.
+    """
+    limits = httpx.Limits(max_connections=concurrency or 1000, max_keepalive_connections=concurrency or 1000)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        samples: list[Sample] = []
+        start = time.perf_counter()
+
+        if rps:
+            async def fire(i):
+                samples.append(await send(client, trace[i % len(trace)]))
+
+            tasks = []
+            for i in range(total):
+                delay = start + i / rps - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(fire(i)))
+            await asyncio.gather(*tasks)
+        else:
+            counter = iter(range(total))
+
+            async def worker():
+                for i in counter:
+                    samples.append(await send(client, trace[i % len(trace)]))
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+        return samples, time.perf_counter() - start
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(p):
+        # Nearest rank
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {
+        "p50": round(rank(50), 2),
+        "p95": round(rank(95), 2),
+        "p99": round(rank(99), 2),
+        "max": round(ordered[-1], 2),
+        "mean": round(sum(ordered) / len(ordered), 2),
+    }
+
+
+def summarize(samples: list[Sample], wall: float) -> dict:
+    def group(items: list[Sample]) -> dict:
+        errors: dict[str, int] = {}
+        for s in items:
+            if not (isinstance(s.status, int) and s.status < 400):
+                errors[str(s.status)] = errors.get(str(s.status), 0) + 1
+        return {
+            "requests": len(items),
+            "error_rate": round(sum(errors.values()) / len(items), 4) if items else 0.0,
+            "errors": errors,
+            "latency_ms": percentiles([s.seconds * 1000 for s in items]),
+        }
+
+    ok = [s for s in samples if isinstance(s.status, int) and s.status < 400]
+    stage_names = list(dict.fromkeys(name for s in ok for name in s.stages))
+    return {
+        "duration_s": round(wall, 2),
+        "throughput_rps": round(len(samples) / wall, 2) if wall else 0.0,
+        "overall": group(samples),
+        "by_kind": {kind: group([s for s in samples if s.kind == kind]) for kind in sorted({s.kind for s in samples})},
+        "stages_ms": {name: percentiles([s.stages[name] for s in ok if name in s.stages]) for name in stage_names},
+    }
+
+
+def table(report: dict) -> str:
+    s = report["summary"]
+    errors = s["overall"]["errors"] or ""
+    lines = [
+        f"{report['meta']['requests']} requests in {s['duration_s']}s: {s['throughput_rps']} req/s, error rate {s['overall']['error_rate']:.2%} {errors}",
+        "",
+        f"{'':<24} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'mean':>9}  (ms)",
+    ]
+
+    def row(name, stats):
+        if stats:
+            lines.append(f"{name:<24} " + " ".join(f"{stats[k]:>9.1f}" for k in ("p50", "p95", "p99", "max", "mean")))
+
+    row("latency", s["overall"]["latency_ms"])
+    for kind, stats in s["by_kind"].items():
+        row(f"  {kind} ({stats['requests']})", stats["latency_ms"])
+    for name, stats in s["stages_ms"].items():
+        row(f"stage {name}", stats)
+    caches = report.get("caches")
+    if caches:
+        lines += ["", "Cache hit rates: " + ", ".join(
+            f"{name} {c['hit_rate']:.0%} of {c['lookups']}" for name, c in sorted(caches.items()) if c["lookups"]
+        )]
+    stub = report.get("stub")
+    if stub:
+        lines += ["", f"LLM stub: {stub['calls']} calls, {stub['errors']} injected errors, {stub['timeouts']} timeouts"]
+    return "\n".join(lines)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Caches that would turn the trace's repeats into lookups
+COLD_CACHES = {
+    "RESPONSE_CACHE_SIZE": "0",
+    "REC_CACHE_SIZE": "0",
+    "PDF_TEXT_CACHE_SIZE": "0",
+    "EMBED_CACHE_SIZE": "0",
+}
+
+
+def start_api(port: int, workers: int, stub_url: str, warm_caches: bool = False) -> subprocess.Popen:
+    """
+    The API in its own process (so it does not share a GIL with the load generator).
+    Settings from the environment take precedence over the ones chosen here.
+    """
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": stub_url,
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "stub"),
+        "SERVER_TIMING": "on",
+    }
+    defaults = {"WARMUP_MODELS": "blocking", "REC_CACHE_DB": "none", "CANDIDATE_DB": "none"}
+    if not warm_caches:
+        defaults.update(COLD_CACHES)
+    for name, value in defaults.items():
+        env.setdefault(name, value)
+
+    if workers > 1:
+        cmd = [sys.executable, "-m", "backend.serve", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--report-after", "0"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "backend.api.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    return subprocess.Popen(cmd, env=env)
+
+
+def cache_events(url: str) -> dict[tuple[str, str], float] | None:
+    """
+    skillgap_cache_events_total by (cache, result) from /metrics, or None if
+    metrics are off. With several workers this is whichever one answered.
+    """
+    try:
+        r = httpx.get(f"{url}/metrics", timeout=10)
+    except httpx.HTTPError:
+        return None
+    if r.status_code != 200:
+        return None
+    events = {}
+    for line in r.text.splitlines():
+        if line.startswith("skillgap_cache_events_total{"):
+            labels, _, value = line.partition("} ")
+            fields = dict(part.split("=", 1) for part in labels.split("{", 1)[1].split(","))
+            events[(fields["cache"].strip('"'), fields["result"].strip('"'))] = float(value)
+    return events
+
+
+def cache_report(before: dict | None, after: dict | None) -> dict | None:
+    # Hit rate per cache over the run; every result but a miss is served without the work
+    if before is None or after is None:
+        return None
+    caches: dict[str, dict] = {}
+    for (cache, result), value in after.items():
+        delta = value - before.get((cache, result), 0.0)
+        entry = caches.setdefault(cache, {"lookups": 0, "hits": 0})
+        entry["lookups"] += int(delta)
+        if result != "miss":
+            entry["hits"] += int(delta)
+    for entry in caches.values():
+        entry["hit_rate"] = round(entry["hits"] / entry["lookups"], 4) if entry["lookups"] else None
+    return caches
+
+
+def wait_until_up(url: str, process: subprocess.Popen | None, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"API exited with status {process.returncode}")
+        try:
+            if httpx.get(f"{url}/api/roles", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"API at {url} did not come up within {timeout}s")
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    load = args.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, help="Closed loop: requests in flight (default 8)")
+    load.add_argument("--rps", type=float, help="Open loop: requests started per second")
+    args.add_argument("--requests", type=int, default=200, help="Requests to send in total")
+    args.add_argument("--trace", type=Path, help="JSONL trace to replay (default: synthetic)")
+    args.add_argument("--pdf-share", type=float, default=0.5, help="Share of PDF requests in a synthetic trace")
+    args.add_argument("--distinct", type=int, default=50, help="Distinct inputs in a synthetic trace")
+    args.add_argument("--seed", type=int, default=0)
+    args.add_argument("--url", help="Load an API that is already running (point its OPENAI_BASE_URL at --stub-port)")
+    args.add_argument("--workers", type=int, default=1, help="API worker processes; >1 uses backend.serve")
+    args.add_argument("--stub-port", type=int, default=0)
+    args.add_argument("--llm-latency-ms", type=float, default=800.0)
+    args.add_argument("--llm-jitter-ms", type=float, default=200.0)
+    args.add_argument("--llm-error-rate", type=float, default=0.0, help="Share of LLM calls answered with --llm-error-status")
+    args.add_argument("--llm-error-status", type=int, default=429)
+    args.add_argument("--llm-timeout-rate", type=float, default=0.0, help="Share of LLM calls that hang for --llm-timeout-s")
+    args.add_argument("--llm-timeout-s", type=float, default=60.0)
+    args.add_argument("--warm-caches", action="store_true", help="Keep the API's caches on (they are off by default)")
+    args.add_argument("--request-timeout", type=float, default=120.0)
+    args.add_argument("--startup-timeout", type=float, default=300.0)
+    args.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    args = args.parse_args(argv)
+    concurrency = None if args.rps else (args.concurrency or 8)
+
+    roles, known_skills = list(load_role_skills()), load_known_skills()
+    if args.trace:
+        trace = load_trace(args.trace, roles, known_skills, args.seed)
+    else:
+        trace = synthetic_trace(args.distinct, args.pdf_share, roles, known_skills, args.seed)
+    if not trace:
+        sys.exit("The trace is empty")
+
+    stub = OpenAIStub(
+        StubSettings(args.llm_latency_ms, args.llm_jitter_ms, args.llm_error_rate, args.llm_error_status, args.llm_timeout_rate, args.llm_timeout_s),
+        seed=args.seed,
+        port=args.stub_port,
+    )
+    stub.start()
+    print(f"LLM stub listening on {stub.url}", file=sys.stderr)
+
+    process = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        process = start_api(port, args.workers, stub.url, args.warm_caches)
+    try:
+        wait_until_up(url, process, args.startup_timeout)
+        before = cache_events(url)
+        samples, wall = asyncio.run(run_load(url, trace, args.requests, concurrency, args.rps, args.request_timeout))
+        caches = cache_report(before, cache_events(url))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        stub.stop()
+
+    report = {
+        "meta": {
+            "url": url,
+            "requests": args.requests,
+            "concurrency": concurrency,
+            "rps": args.rps,
+            "workers": args.workers if args.url is None else None,
+            "caches": "as configured" if args.url or args.warm_caches else "off",
+            "trace": str(args.trace) if args.trace else f"synthetic ({args.distinct} inputs, {args.pdf_share:.0%} PDF)",
+            "llm_stub": vars(stub.settings),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "summary": summarize(samples, wall),
+        "caches": caches,
+        "stub": {"calls": stub.stats.calls, "errors": stub.stats.errors, "timeouts": stub.stats.timeouts},
+    }
+    print(table(report), file=sys.stderr)
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
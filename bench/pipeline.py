@@ -0,0 +1,259 @@
+"""
+End-to-end benchmark of the analysis pipeline on synthetic resumes.
+
+    python -m bench.pipeline [--repeat 10] [--out bench-results.json] [--compare baseline.json]
+
+Times each stage (PDF text extraction, skill extraction, normalization, the
+compute_* functions) and the full /api/analyze route through TestClient, at
+several input sizes. The OpenAI client is replaced by a local stub, so no
+network or API key is needed; spaCy and the embedding model must be installed.
+Caches that would turn repeats into lookups are cleared before every timed call.
+
+Results are written as JSON. With --compare, medians are checked against an
+earlier run and the exit status is 1 if any got slower than --tolerance allows.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from types import SimpleNamespace
+
+import fitz
+
+# Stub recommendations and synthetic resumes must never land in the persistent stores
+os.environ["REC_CACHE_DB"] = "none"
+os.environ["CANDIDATE_DB"] = "none"
+
+from backend.api.response_cache import response_cache
+from backend.core import embedder, llm_client, parser, recommender
+from backend.core.analyzer import (
+    compute_match_score,
+    compute_missing,
+    compute_per_skill_score,
+    compute_similarity_details,
+    load_role_skills,
+)
+from backend.core.parser import (
+    extract_skills,
+    extract_text_from_pdf,
+    load_known_skills,
+    normalize_skill,
+)
+
+# Resume sizes in pages and manual skill-list lengths
+PDF_PAGES = {"small": 1, "medium": 3, "large": 10}
+SKILL_COUNTS = {"small": 5, "medium": 20, "large": 100}
+
+FILLER = (
+    "Led a team delivering reliable services for customers across several regions. "
+    "Improved latency and reduced costs by automating deployment and monitoring. "
+    "Worked closely with product and design to ship features on a weekly cadence. "
+)
+FREE_TEXT_SKILLS = ["ML", "Postgres", "k8s", "Prompt engineering", "Spark", "Data viz", "pyhton", "javscript"]
+
+
+class StubChat:
+    # Stands in for client.chat.completions with well-formed JSON replies
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def create(self, messages, response_format=None, **kwargs):
+        time.sleep(self.delay)
+        return self.reply(messages, response_format)
+
+    def reply(self, messages, response_format=None):
+        skills = messages[-1]["content"].split(": ", 1)[1].rstrip(".").split(", ")
+
+        def entry(s):
+            return {"courses": [f"Learn {s}"], "projects": [f"Build with {s}"], "certifications": []}
+
+        if response_format:
+            reply = {s: entry(s) for s in skills}
+        else:
+            reply = {c: [x for s in skills for x in entry(s)[c]] for c in recommender.CATEGORIES}
+        message = SimpleNamespace(content=json.dumps(reply))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class AsyncStubChat(StubChat):
+    # The same replies for the async client used by the API
+    async def create(self, messages, response_format=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self.reply(messages, response_format)
+
+
+def stub_openai(delay: float = 0.0) -> None:
+    recommender.set_client(SimpleNamespace(chat=SimpleNamespace(completions=StubChat(delay))))
+    llm_client.set_client(SimpleNamespace(chat=SimpleNamespace(completions=AsyncStubChat(delay))))
+
+
+def make_resume_text(known_skills: list[str], pages: int, rng: random.Random) -> list[str]:
+    page_texts = []
+    for _ in range(pages):
+        skills = rng.sample(known_skills, k=min(8, len(known_skills)))
+        lines = [FILLER * 3, "Skills: " + ", ".join(skills), FILLER * 2, "Tools: " + ", ".join(rng.sample(FREE_TEXT_SKILLS, 3))]
+        page_texts.append("\n".join(lines))
+    return page_texts
+
+
+def make_pdf(page_texts: list[str]) -> bytes:
+    doc = fitz.open()
+    for text in page_texts:
+        page = doc.new_page()
+        page.insert_textbox(page.rect + (50, 50, -50, -50), text, fontsize=10)
+    return doc.tobytes()
+
+
+def make_skill_list(known_skills: list[str], count: int, rng: random.Random) -> list[str]:
+    pool = known_skills + FREE_TEXT_SKILLS
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def clear_caches() -> None:
+    parser._text_cache.clear()
+    embedder._vector_cache.clear()
+    cache = response_cache()
+    if cache is not None:
+        cache.memory.clear()
+
+
+def timeit(fn: Callable[[], object], repeat: int, setup: Callable[[], None] = clear_caches) -> dict:
+    """
+    Run fn once to warm up, then `repeat` times with setup() untimed before each call.
+    """
+    setup()
+    fn()
+    samples = []
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "repeat": repeat,
+        "min_ms": round(samples[0] * 1000, 3),
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(repeat: int, role: str, seed: int = 0) -> dict:
+    # deferred: only the route benchmark needs these
+    from fastapi.testclient import TestClient
+
+    from backend.api.main import app
+
+    rng = random.Random(seed)
+    known_skills = load_known_skills()
+    role_skills = load_role_skills()[role]
+    stub_openai()
+
+    results = {}
+
+    def record(name: str, size: str, fn: Callable[[], object]) -> None:
+        results[f"{name}[{size}]"] = timeit(fn, repeat)
+        print(f"{name + '[' + size + ']':<40} {results[f'{name}[{size}]']['median_ms']:>10.3f} ms", file=sys.stderr)
+
+    with TestClient(app) as client:
+        for size, pages in PDF_PAGES.items():
+            page_texts = make_resume_text(known_skills, pages, rng)
+            pdf = make_pdf(page_texts)
+            text = extract_text_from_pdf(pdf)
+
+            record("extract_text_from_pdf", size, lambda pdf=pdf: extract_text_from_pdf(pdf))
+            record("extract_skills", size, lambda text=text: extract_skills(text, known_skills))
+
+            def post_pdf(pdf=pdf):
+                r = client.post("/api/analyze", data={"role": role}, files={"file": ("resume.pdf", pdf, "application/pdf")})
+                r.raise_for_status()
+            record("api_analyze_pdf", size, post_pdf)
+
+        for size, count in SKILL_COUNTS.items():
+            raw = make_skill_list(known_skills, count, rng)
+            user_skills = sorted({normalize_skill(s, known_skills) for s in raw})
+
+            record("normalize_skill", size, lambda raw=raw: [normalize_skill(s, known_skills) for s in raw])
+            record("compute_missing", size, lambda user_skills=user_skills: compute_missing(user_skills, role_skills))
+            record("compute_match_score", size, lambda user_skills=user_skills: compute_match_score(user_skills, role_skills))
+            record("compute_per_skill_score", size, lambda user_skills=user_skills: compute_per_skill_score(user_skills, role_skills))
+            record("compute_similarity_details", size, lambda user_skills=user_skills: compute_similarity_details(user_skills, role_skills))
+
+            def post_manual(raw=raw):
+                r = client.post("/api/analyze", data={"role": role, "manual_skills": ", ".join(raw)})
+                r.raise_for_status()
+            record("api_analyze_manual", size, post_manual)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "role": role,
+            "repeat": repeat,
+            "embedding_backend": embedder.EMBEDDING_BACKEND,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Benchmarks whose median is more than `tolerance` (a fraction) slower than the baseline.
+    """
+    regressions = []
+    for name, stats in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        ratio = stats["median_ms"] / max(before["median_ms"], 1e-9)
+        if ratio > 1 + tolerance:
+            regressions.append(f"{name}: {before['median_ms']:.3f} -> {stats['median_ms']:.3f} ms ({ratio:.2f}x)")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = argparse.ArgumentParser(description="Benchmark the analysis pipeline.")
+    args.add_argument("--repeat", type=int, default=10, help="Timed runs per benchmark")
+    args.add_argument("--role", default="Data Scientist", help="Role from roles.json to analyze against")
+    args.add_argument("--out", help="Write results JSON here (default: stdout)")
+    args.add_argument("--compare", help="Baseline results JSON to check for regressions")
+    args.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown vs baseline, e.g. 0.2 = 20%%")
+    args = args.parse_args(argv)
+
+    result = run(args.repeat, args.role)
+    payload = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
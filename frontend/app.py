@@ -1,15 +1,47 @@
-import streamlit as st
-import requests
+import hashlib
+import json
 import os
+
 import pandas as pd
+import requests
+import streamlit as st
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 # Load environment variables if needed
-from dotenv import load_dotenv
 load_dotenv()
 
 # Backend API base URL (can override with .env)
 API_BASE = os.getenv("API_BASE_URL", "http://localhost:8000/api")
 
+# Longest wait for the next part of a streamed analysis (seconds)
+STREAM_TIMEOUT = float(os.getenv("STREAM_TIMEOUT", "120"))
+
+# How long the roles list is reused before asking the backend again (seconds)
+ROLES_TTL = float(os.getenv("ROLES_TTL", "300"))
+
+# Finished analyses kept per browser session
+MAX_MEMOIZED_RESULTS = int(os.getenv("MAX_MEMOIZED_RESULTS", "20"))
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """
+    One keep-alive HTTP session shared by every rerun and user of this process.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_data(ttl=ROLES_TTL, show_spinner=False)
+def fetch_roles() -> list[str]:
+    response = get_session().get(f"{API_BASE}/roles", timeout=10)
+    response.raise_for_status()
+    return response.json()
+
 
 # Page configuration
 st.set_page_config(
@@ -42,8 +74,8 @@ else:
 # Fetch available roles from backend (with loading spinner)
 try:
     with st.spinner("Loading available roles..."):
-        roles = requests.get(f"{API_BASE}/roles").json()
-except Exception as e:
+        roles = fetch_roles()
+except (requests.RequestException, ValueError) as e:
     st.error(f"Failed to load roles from API: {e}")
     st.stop()
 
@@ -60,53 +92,15 @@ selected_role = st.selectbox(
     key="selected_role"
 )
 
-# Analyze button triggers API call
-if st.button("Analyze My Skills"):
-    with st.spinner("Analyzing your skills..."):
-        # Prepare payload
-        files = None
-        data = {"role": selected_role}
-        if detection_mode == "Upload Resume" and resume_file:
-            files = {"file": (resume_file.name, resume_file.getvalue(), "application/pdf")}
-        else:
-            data["manual_skills"] = ",".join(user_skills)
-
-        # Call backend
-        try:
-            response = requests.post(
-                f"{API_BASE}/analyze", files=files, data=data
-            )
-            response.raise_for_status()
-            result = response.json()
-        except Exception as e:
-            st.error(f"API request failed: {e}")
-            st.stop()
-
-    # Display results
-    st.markdown("---")
-    st.metric(label="Match Score", value=f"{result['match_score']}%")
-
-    # Add vertical space (2 blank lines)
-    st.markdown("<br><br>", unsafe_allow_html=True)
-
-    col1, col2, col3, col4 = st.columns(4)
-
-    with col1:
-        st.subheader("Your Skills")
-        for skill in result["user_skills"]:
-            st.markdown(f"- **{skill}**")
-
-    with col2:
-        st.subheader("Job Skills")
-        for skill in result["job_skills"]:
+def show_skills(area, title, skills):
+    with area.container():
+        st.subheader(title)
+        for skill in skills:
             st.markdown(f"- **{skill}**")
 
-    with col3:
-        st.subheader("Missing Skills")
-        for skill in result["missing_skills"]:
-            st.markdown(f"- **{skill}**")
 
-    with col4:
+def show_similarity(area, similarity_details):
+    with area.container():
         st.subheader("Skill Similarity Breakdown")
         # Build and display the similarity table
         sim_df = pd.DataFrame([
@@ -115,27 +109,139 @@ if st.button("Analyze My Skills"):
                 "Matched Skill": detail["matched_skill"],
                 "Match Score": detail["score"]
             }
-            for js, detail in result["similarity_details"].items()
+            for js, detail in similarity_details.items()
         ])
 
         # Format Match Score to percent with 2 significant digits
         sim_df["Match Score"] = sim_df["Match Score"].apply(lambda x: f"{x:.2f}".rstrip('0').rstrip('.') + '%')
-        
+
         st.table(sim_df)
 
-    # Add vertical space (2 blank lines)
-    st.markdown("<br><br>", unsafe_allow_html=True)
 
+def show_recommendations(recommendations):
     st.subheader("Recommended Learning Path")
 
     with st.expander("Recommended Courses"):
-        for course in result["recommendations"]["courses"]:
+        for course in recommendations["courses"]:
             st.markdown(f"- {course}")
 
     with st.expander("Hands-on Projects"):
-        for project in result["recommendations"]["projects"]:
+        for project in recommendations["projects"]:
             st.markdown(f"- {project}")
 
     with st.expander("Suggested Certifications"):
-        for cert in result["recommendations"]["certifications"]:
+        for cert in recommendations["certifications"]:
             st.markdown(f"- {cert}")
+
+
+def iter_events(response):
+    """
+    Yield (event, data) pairs from a text/event-stream response.
+    """
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+def result_events(result):
+    # The stream's events rebuilt from a finished result, to show a memoized analysis
+    return [
+        ("skills", {"user_skills": result["user_skills"], "job_skills": result["job_skills"]}),
+        ("analysis", {"match_score": result["match_score"], "missing_skills": result["missing_skills"]}),
+        ("similarity", {"similarity_details": result["similarity_details"]}),
+        ("recommendations", {"recommendations": result["recommendations"]}),
+    ]
+
+
+def result_areas():
+    # Placeholders in page order, filled as the events come in
+    st.markdown("---")
+    areas = {"status": st.empty(), "score": st.empty()}
+    # Add vertical space (2 blank lines)
+    st.markdown("<br><br>", unsafe_allow_html=True)
+    col1, col2, col3, col4 = st.columns(4)
+    areas.update(user=col1.empty(), job=col2.empty(), missing=col3.empty(), similarity=col4.empty())
+    st.markdown("<br><br>", unsafe_allow_html=True)
+    areas["recommendations"] = st.container()
+    return areas
+
+
+def show_event(areas, event, payload):
+    if event == "skills":
+        show_skills(areas["user"], "Your Skills", payload["user_skills"])
+        show_skills(areas["job"], "Job Skills", payload["job_skills"])
+    elif event == "analysis":
+        areas["score"].metric(label="Match Score", value=f"{payload['match_score']}%")
+        show_skills(areas["missing"], "Missing Skills", payload["missing_skills"])
+        areas["status"].info("Finding recommendations...")
+    elif event == "similarity":
+        show_similarity(areas["similarity"], payload["similarity_details"])
+    elif event == "recommendations":
+        with areas["recommendations"]:
+            show_recommendations(payload["recommendations"])
+    elif event == "error":
+        st.error(f"Analysis failed: {payload['detail']}")
+
+
+def stream_analysis(areas, files, data):
+    """
+    Stream an analysis into the page; returns the final result, or None if it failed.
+    """
+    result = None
+    areas["status"].info("Analyzing your skills...")
+    try:
+        with get_session().post(f"{API_BASE}/analyze/stream", files=files, data=data, stream=True, timeout=STREAM_TIMEOUT) as response:
+            response.raise_for_status()
+            for event, payload in iter_events(response):
+                if event == "result":
+                    result = payload
+                else:
+                    show_event(areas, event, payload)
+    except (requests.RequestException, ValueError) as e:
+        st.error(f"API request failed: {e}")
+    finally:
+        areas["status"].empty()
+    return result
+
+
+# Analyses already done this session, by input and role, so reruns never re-post the PDF
+if detection_mode == "Upload Resume" and resume_file:
+    source = hashlib.sha256(resume_file.getvalue()).hexdigest()
+else:
+    # Built like the backend's manual-input key: the same sorted set of entries
+    source = ",".join(sorted(set(user_skills)))
+result_key = (detection_mode, source, selected_role)
+results = st.session_state.setdefault("results", {})
+
+# Analyze button streams the analysis and shows each part as it arrives; after
+# that, reruns (any widget change) show the same result again from session state
+pressed = st.button("Analyze My Skills")
+if result_key in results and (pressed or st.session_state.get("shown_result") == result_key):
+    areas = result_areas()
+    for event, payload in result_events(results[result_key]):
+        show_event(areas, event, payload)
+    areas["status"].empty()
+    st.session_state.shown_result = result_key
+elif pressed:
+    # Prepare payload
+    files = None
+    data = {"role": selected_role}
+    if detection_mode == "Upload Resume" and resume_file:
+        files = {"file": (resume_file.name, resume_file.getvalue(), "application/pdf")}
+    else:
+        data["manual_skills"] = ",".join(user_skills)
+
+    result = stream_analysis(result_areas(), files, data)
+    # Fallback recommendations (LLM unavailable) are worth asking for again
+    if result is not None and not result.get("recommendations_fallback"):
+        results[result_key] = result
+        while len(results) > MAX_MEMOIZED_RESULTS:
+            results.pop(next(iter(results)))
+        st.session_state.shown_result = result_key
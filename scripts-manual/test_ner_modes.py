@@ -0,0 +1,44 @@
+# test_ner_modes.py
+# Compare skill extraction with and without spaCy NER on a folder of resumes:
+#   python scripts-manual/test_ner_modes.py path/to/resumes [--n-process 2 --batch-size 16]
+
+import argparse
+import time
+from pathlib import Path
+
+from backend.core.parser import (
+    extract_skills,
+    extract_skills_batch,
+    extract_text_from_pdf,
+    get_nlp,
+    load_known_skills,
+)
+
+args = argparse.ArgumentParser()
+args.add_argument("folder")
+args.add_argument("--n-process", type=int, default=1)
+args.add_argument("--batch-size", type=int, default=16)
+args = args.parse_args()
+
+texts = [extract_text_from_pdf(p.read_bytes()) for p in sorted(Path(args.folder).glob("*.pdf"))]
+known_skills = load_known_skills()
+get_nlp()  # load the model before timing
+print(f"{len(texts)} resumes, {sum(map(len, texts))} characters")
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<22} {time.perf_counter() - start:8.3f}s")
+    return result
+
+
+without_ner = timed("no NER", lambda: [extract_skills(t, known_skills, ner=False) for t in texts])
+with_ner = timed("NER, one at a time", lambda: [extract_skills(t, known_skills, ner=True) for t in texts])
+batched = timed("NER, nlp.pipe", lambda: extract_skills_batch(
+    texts, known_skills, ner=True, n_process=args.n_process, batch_size=args.batch_size))
+
+# Skills NER found that the whole-word pass did not
+extra = sum(len(set(a) - set(b)) for a, b in zip(with_ner, without_ner))
+print(f"Skills added by NER: {extra}")
+assert batched == with_ner
@@ -0,0 +1,68 @@
+import numpy as np
+
+from backend.core.analyzer import (
+    analyze_skills,
+    analyze_vectors,
+    build_role_matrix,
+    rank_roles,
+)
+
+'''
+Check the vectorized engine against the original per-pair loops.
+
+'''
+
+def reference_best(user_skills, user_vecs, role_skills, role_vecs):
+    # The nested loops the engine replaced, kept here as the oracle
+    best = []
+    for r, r_vec in zip(role_skills, role_vecs):
+        b = 0.0
+        for u, u_vec in zip(user_skills, user_vecs):
+            if u.strip().lower() == r.strip().lower():
+                b = 1.0
+                break
+            sim = float(np.dot(r_vec, u_vec) / (np.linalg.norm(r_vec) * np.linalg.norm(u_vec) + 1e-8))
+            b = max(b, sim)
+        best.append(b)
+    return best
+
+
+def test_analyze_vectors_matches_reference_loops():
+    rng = np.random.default_rng(0)
+    user_skills = ["python", "Docker", "Go", "Excel"]
+    role_skills = ["Python", "SQL", "Kubernetes", "Pandas", "Go"]
+    user_vecs = rng.normal(size=(len(user_skills), 16)).astype(np.float32)
+    role_vecs = rng.normal(size=(len(role_skills), 16)).astype(np.float32)
+
+    result = analyze_vectors(user_skills, user_vecs, role_skills, role_vecs, threshold=0.3)
+    best = reference_best(user_skills, user_vecs, role_skills, role_vecs)
+
+    assert abs(result.score - round(float(np.mean(best)) * 100, 2)) < 0.01
+    assert result.missing == sorted(r for r, b in zip(role_skills, best) if b < 0.3)
+
+    # Exact (case-insensitive) matches get full credit and name the matching skill
+    assert result.details["Python"] == {"matched_skill": "python", "score": 100.0}
+    assert result.details["Go"]["matched_skill"] == "Go"
+    for r, b in zip(role_skills, best):
+        assert abs(result.details[r]["score"] - round(b * 100, 2)) < 0.01
+
+
+def test_rank_roles_agrees_with_per_role_analysis():
+    roles_map = {
+        "Data Scientist": ["Python", "Pandas", "SQL"],
+        "Empty": [],
+        "Backend Engineer": ["python", "Docker", "REST", "SQL"],
+    }
+    user_skills = ["Python", "SQL", "Docker"]
+
+    ranked = rank_roles(user_skills, build_role_matrix(roles_map))
+    assert [m.role for m in ranked][-1] == "Empty"
+
+    # One batched pass gives the same numbers as analyzing each role on its own
+    for match in ranked:
+        single = analyze_skills(user_skills, roles_map[match.role])
+        assert abs(match.score - single.score) < 0.01
+        assert match.missing == single.missing
+
+    subset = rank_roles(user_skills, build_role_matrix(roles_map), roles=["Backend Engineer"], top_k=1)
+    assert [m.role for m in subset] == ["Backend Engineer"]
@@ -0,0 +1,68 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.api import routes
+from backend.api.main import app
+from backend.core.analyzer import SkillAnalysis
+from backend.core.catalog import get_catalog
+
+'''
+Streaming /api/analyze: events arrive in pipeline order and the final result
+matches AnalyzeResponse.
+
+'''
+
+
+def parse_events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def fake_pipeline(monkeypatch, recommend):
+    monkeypatch.setattr(routes, "extract_user_skills_manual", lambda raw, known: ["Python", "SQL"])
+    monkeypatch.setattr(
+        routes, "analyze_skills",
+        lambda user, job: SkillAnalysis(score=50.0, missing=["Docker"], details={"Docker": {"matched_skill": "", "score": 0.0}}),
+    )
+    monkeypatch.setattr(routes, "aget_recommendations", recommend)
+
+
+def test_events_in_order(monkeypatch):
+    async def recommend(missing):
+        return {"courses": [f"Learn {s}" for s in missing], "projects": [], "certifications": []}
+
+    fake_pipeline(monkeypatch, recommend)
+    role = next(iter(get_catalog().roles))
+
+    r = TestClient(app).post("/api/analyze/stream", data={"role": role, "manual_skills": "python, sql"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_events(r.text)
+    assert [name for name, _ in events] == ["skills", "analysis", "similarity", "recommendations", "result"]
+    assert events[1][1] == {"match_score": 50.0, "missing_skills": ["Docker"]}
+
+    result = routes.AnalyzeResponse(**events[-1][1])
+    assert result.user_skills == ["Python", "SQL"]
+    assert result.recommendations["courses"] == ["Learn Docker"]
+    assert result.catalog_version == get_catalog().version
+
+
+def test_errors(monkeypatch):
+    async def recommend(missing):
+        raise RuntimeError("provider exploded")
+
+    fake_pipeline(monkeypatch, recommend)
+    client = TestClient(app)
+
+    # Input problems are still plain HTTP errors
+    assert client.post("/api/analyze/stream", data={"role": "No Such Role", "manual_skills": "x"}).status_code == 400
+
+    # Failures after the first event arrive as an error event
+    role = next(iter(get_catalog().roles))
+    events = parse_events(client.post("/api/analyze/stream", data={"role": role, "manual_skills": "x"}).text)
+    assert events[-1] == ("error", {"detail": "provider exploded"})
@@ -0,0 +1,140 @@
+import hashlib
+import io
+import json
+import time
+import zipfile
+
+import fitz
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend.api.execution import cpu_pool
+from backend.api.main import app
+from backend.core import batch
+from backend.core.batch import analyze_batch, iter_pdfs
+from backend.core.catalog import get_catalog
+from backend.core.parser import PDFLimitError
+
+'''
+Batch analysis: zip members are read within the PDF size limit, unreadable
+documents become error lines, and parsed resumes are embedded together.
+
+'''
+
+
+def make_pdf(text):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    return doc.tobytes()
+
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def fake_embed(calls):
+    def embed(skills):
+        calls.append(list(skills))
+        return np.array([
+            np.random.default_rng(int(hashlib.sha256(s.lower().encode()).hexdigest()[:8], 16)).normal(size=8)
+            for s in skills
+        ], dtype=np.float32)
+    return embed
+
+
+def fake_extract_batch(calls):
+    def extract(texts, known_skills):
+        calls.append(len(texts))
+        # Skills are the words of each text's first line
+        return [text.split("\n")[0].split() for text in texts]
+    return extract
+
+
+def test_iter_pdfs_limits_and_bad_members():
+    pdf = make_pdf("Python SQL")
+    archive = make_zip({
+        "a.pdf": pdf,
+        "notes.txt": b"not a resume",
+        "big.pdf": b"%PDF" + b"0" * 5000,     # compresses well, decompresses past the limit
+        "b.pdf": pdf,
+    })
+    docs = list(iter_pdfs("resumes.zip", io.BytesIO(archive), max_bytes=len(pdf) + 100))
+    assert [name for name, _ in docs] == ["a.pdf", "big.pdf", "b.pdf"]
+    assert docs[0][1] == pdf and docs[2][1] == pdf
+    assert isinstance(docs[1][1], PDFLimitError)
+
+    # A member whose compressed data is damaged
+    damaged = bytearray(make_zip({"ok.pdf": pdf, "broken.pdf": pdf * 3}))
+    start = damaged.find(b"broken.pdf") + len("broken.pdf")
+    damaged[start + 20:start + 40] = b"\0" * 20
+    docs = dict(iter_pdfs("resumes.zip", io.BytesIO(bytes(damaged))))
+    assert docs["ok.pdf"] == pdf and isinstance(docs["broken.pdf"], Exception)
+
+    # Not a zip at all, despite the name
+    [(name, error)] = iter_pdfs("resumes.zip", io.BytesIO(b"garbage"))
+    assert name == "resumes.zip" and isinstance(error, zipfile.BadZipFile)
+
+    # A single PDF over the limit
+    [(_, error)] = iter_pdfs("big.pdf", io.BytesIO(pdf), max_bytes=10)
+    assert isinstance(error, PDFLimitError)
+
+
+def test_every_resume_once_and_groups_parsed_and_embedded_together(monkeypatch):
+    embed_calls, extract_calls = [], []
+    monkeypatch.setattr(batch, "get_embeddings", fake_embed(embed_calls))
+    extract = fake_extract_batch(extract_calls)
+
+    # The first group finishes last: results come in group completion order
+    def slow_first(texts, known_skills):
+        if texts[0].startswith("Python skill0\n"):
+            time.sleep(0.3)
+        return extract(texts, known_skills)
+
+    monkeypatch.setattr(batch, "extract_skills_batch", slow_first)
+
+    docs = [(f"r{i}.pdf", make_pdf(f"Python skill{i}")) for i in range(12)]
+    docs.insert(5, ("broken.pdf", b"not a pdf"))
+    docs.insert(7, ("big.pdf", PDFLimitError("PDF is larger than 10 bytes")))
+
+    results = list(analyze_batch(iter(docs), ["Python", "SQL"], [], workers=4, max_in_flight=16, group_size=4))
+    assert sorted(r["filename"] for r in results) == sorted(name for name, _ in docs)
+    assert "r0.pdf" in {r["filename"] for r in results[-4:]}
+    errors = {r["filename"]: r["error"] for r in results if "error" in r}
+    assert set(errors) == {"broken.pdf", "big.pdf"} and "larger than" in errors["big.pdf"]
+    assert all(r["match_score"] >= 50 for r in results if "error" not in r)
+
+    # One skill extraction and one embedding call per group of 4 (plus the role's vectors)
+    assert sorted(extract_calls) == [2, 2, 4, 4]   # the second group holds both bad documents
+    assert len([c for c in embed_calls if c != ["Python", "SQL"]]) == 4
+
+
+def test_batch_endpoint(monkeypatch):
+    monkeypatch.setattr(batch, "get_embeddings", fake_embed([]))
+    monkeypatch.setattr(batch, "extract_skills_batch", fake_extract_batch([]))
+    role, role_skills = next(iter(get_catalog().roles.items()))
+
+    archive = make_zip({"good.pdf": make_pdf(" ".join(role_skills)), "bad.pdf": b"not a pdf"})
+    files = [
+        ("files", ("resumes.zip", archive, "application/zip")),
+        ("files", ("single.pdf", make_pdf("Nothing relevant"), "application/pdf")),
+    ]
+    response = TestClient(app).post("/api/analyze/batch", data={"role": role}, files=files)
+    assert response.status_code == 200
+
+    lines = {r["filename"]: r for r in map(json.loads, response.text.splitlines())}
+    assert set(lines) == {"good.pdf", "bad.pdf", "single.pdf"}
+    assert "error" in lines["bad.pdf"]
+    assert lines["good.pdf"]["missing_skills"] == []
+    assert lines["single.pdf"]["match_score"] < lines["good.pdf"]["match_score"]
+
+
+def test_batch_endpoint_rejects_when_the_cpu_pool_is_full(monkeypatch):
+    monkeypatch.setattr(cpu_pool(), "max_pending", 0)
+    role = next(iter(get_catalog().roles))
+    files = [("files", ("single.pdf", make_pdf("Python"), "application/pdf"))]
+    response = TestClient(app).post("/api/analyze/batch", data={"role": role}, files=files)
+    assert response.status_code == 429
@@ -0,0 +1,151 @@
+import hashlib
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend.api import routes
+from backend.api.main import app
+from backend.core import candidates as candidates_module
+from backend.core.analyzer import analyze_vectors
+from backend.core.candidates import CandidateStore, SQLiteCandidateTable
+from backend.core.catalog import get_catalog
+
+'''
+Candidate store: role search matches the analyzer, incremental adds, persistence
+and several processes sharing one database.
+
+'''
+
+VOCAB = [f"skill {i}" for i in range(40)] + ["Python", "SQL", "Docker"]
+ROLE = ["python", "SQL", "Kubernetes", "skill 3", "skill 17"]
+
+
+def fake_embed(skills):
+    # Deterministic vector per skill, with "skill 3" and "skill 3 advanced" close together
+    vectors = []
+    for s in skills:
+        seed = int(hashlib.sha256(s.lower().removesuffix(" advanced").encode()).hexdigest()[:8], 16)
+        v = np.random.default_rng(seed).normal(size=16)
+        if s.endswith(" advanced"):
+            v = v + np.random.default_rng(seed + 1).normal(scale=0.2, size=16)
+        vectors.append(v)
+    return np.array(vectors, dtype=np.float32)
+
+
+def candidates(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {f"c{i}": list(rng.choice(VOCAB, size=rng.integers(1, 8), replace=False)) for i in range(n)}
+
+
+def expected(skills):
+    return analyze_vectors(skills, fake_embed(skills), ROLE, fake_embed(ROLE))
+
+
+def test_scores_match_analyzer():
+    store = CandidateStore(embed=fake_embed, block=7)   # several blocks
+    people = candidates(60)
+    people["c60"] = ["skill 3 advanced", "Python"]
+    for cid, skills in people.items():
+        assert store.add(cid, f"{cid}.pdf", skills)
+    assert not store.add("empty", "empty.pdf", [])
+
+    matches = store.search(ROLE, top_k=len(people))
+    assert len(matches) == len(people)
+    assert [m.score for m in matches] == sorted((m.score for m in matches), reverse=True)
+    for m in matches:
+        analysis = expected(people[m.candidate_id])
+        assert abs(m.score - analysis.score) < 0.01
+        assert m.missing == analysis.missing
+
+    top = store.search(ROLE, top_k=3)
+    assert [m.candidate_id for m in top] == [m.candidate_id for m in matches[:3]]
+
+
+def test_incremental_adds_and_persistence(tmp_path):
+    url = f"sqlite:///{tmp_path / 'candidates.db'}"
+    store = CandidateStore(SQLiteCandidateTable(url), embed=fake_embed)
+    store.add("a", "a.pdf", ["skill 1"])
+    assert store.search(ROLE, top_k=1)[0].candidate_id == "a"
+
+    # Added after a search; replacing keeps one entry per id
+    store.add("b", "b.pdf", ["Python", "SQL", "skill 3"])
+    store.add("a", "a2.pdf", ["skill 2"])
+    assert len(store) == 2
+    first = store.search(ROLE, top_k=2)
+    assert [m.candidate_id for m in first] == ["b", "a"] and first[1].name == "a2.pdf"
+
+    # A new process reads everything back without embedding the vocabulary again
+    calls = []
+
+    def counting_embed(skills):
+        calls.append(list(skills))
+        return fake_embed(skills)
+
+    restarted = CandidateStore(SQLiteCandidateTable(url), embed=counting_embed)
+    assert restarted.search(ROLE, top_k=2) == first
+    assert calls == [ROLE]
+
+    # Vectors from another model are recomputed
+    calls.clear()
+    other = CandidateStore(SQLiteCandidateTable(url), embed=counting_embed, model="other-model")
+    assert other.search(ROLE, top_k=2) == first
+    assert len(calls) == 2 and sorted(calls[0]) == sorted(["skill 1", "Python", "SQL", "skill 3", "skill 2"])
+
+
+def test_vectors_are_tagged_with_model_and_backend(monkeypatch):
+    torch_tag = CandidateStore(embed=fake_embed).model
+    monkeypatch.setattr(candidates_module, "EMBEDDING_BACKEND", "onnx")
+    monkeypatch.setattr(candidates_module, "storage_dtype", lambda: np.dtype(np.float16))
+    assert CandidateStore(embed=fake_embed).model != torch_tag
+
+
+def test_stores_sharing_a_database(tmp_path):
+    # Two workers on one database, each loaded before the other writes
+    url = f"sqlite:///{tmp_path / 'candidates.db'}"
+    first = CandidateStore(SQLiteCandidateTable(url), embed=fake_embed)
+    second = CandidateStore(SQLiteCandidateTable(url), embed=fake_embed)
+    assert len(first) == len(second) == 0
+
+    people = candidates(20, seed=1)
+    used = {s for skills in people.values() for s in skills} | {"Python", "skill 3"}
+    for i, (cid, skills) in enumerate(people.items()):
+        (first if i % 2 else second).add(cid, f"{cid}.pdf", skills)
+    first.add("c0", "c0-again.pdf", ["Python", "skill 3"])
+    people["c0"] = ["Python", "skill 3"]
+
+    for store in (first, second):
+        assert len(store) == len(people)
+        matches = store.search(ROLE, top_k=len(people))
+        for m in matches:
+            analysis = expected(people[m.candidate_id])
+            assert abs(m.score - analysis.score) < 0.01
+            assert m.missing == analysis.missing
+        assert next(m.name for m in matches if m.candidate_id == "c0") == "c0-again.pdf"
+
+    # Each skill is stored once, under one id
+    table = SQLiteCandidateTable(url)
+    rows = table.skills_after(0)
+    names = [row.name for row in rows]
+    assert len(names) == len(set(names)) == len(used)
+    for row in rows:
+        assert np.allclose(np.frombuffer(row.vector, dtype=np.float32), fake_embed([row.name])[0])
+
+
+def test_candidates_endpoint(monkeypatch):
+    role, role_skills = next(iter(get_catalog().roles.items()))
+    store = CandidateStore(embed=fake_embed)
+    store.add("strong", "strong.pdf", role_skills)
+    store.add("weak", "weak.pdf", ["skill 5"])
+    monkeypatch.setattr(routes, "get_candidate_store", lambda: store)
+    client = TestClient(app)
+
+    # Off by default: analyzed resumes are not kept, so there is nothing to search
+    monkeypatch.setattr(routes, "STORE_CANDIDATES", False)
+    disabled = client.get(f"/api/roles/{role}/candidates")
+    assert disabled.status_code == 404 and "STORE_CANDIDATES" in disabled.json()["detail"]
+
+    monkeypatch.setattr(routes, "STORE_CANDIDATES", True)
+    body = client.get(f"/api/roles/{role}/candidates", params={"top_k": 1}).json()
+    assert body["total"] == 2
+    assert [(c["candidate_id"], c["match_score"], c["missing_skills"]) for c in body["candidates"]] == [("strong", 100.0, [])]
+    assert client.get("/api/roles/No Such Role/candidates").status_code == 404
@@ -0,0 +1,87 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from backend.core.analyzer import RoleMatrix
+from backend.core.catalog import CatalogService, load_or_build_role_matrix
+
+'''
+Catalog service: versioned snapshots, change detection and safe reloads;
+role matrices shared through memory-mapped files.
+
+'''
+
+
+def write(path, data):
+    path.write_text(json.dumps(data))
+    # Bump the mtime explicitly; fast successive writes can share a timestamp
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_reload_swaps_snapshot_only_on_change(tmp_path):
+    roles, known = tmp_path / "roles.json", tmp_path / "known.json"
+    write(roles, {"Backend": ["Python", "SQL"]})
+    write(known, ["Python", "SQL"])
+
+    service = CatalogService(roles, known)
+    first = service.get()
+    assert first.roles == {"Backend": ["Python", "SQL"]} and "SQL" in first.matcher
+    assert not service.check()
+
+    # Rewriting identical content keeps the version
+    write(roles, {"Backend": ["Python", "SQL"]})
+    assert not service.check() and service.get() is first
+
+    write(known, ["Python", "SQL", "Docker"])
+    assert service.check()
+    second = service.get()
+    assert second.version != first.version and "Docker" in second.matcher
+    assert "Docker" not in first.matcher  # old snapshot is untouched
+
+
+def test_broken_file_keeps_current_snapshot(tmp_path):
+    roles, known = tmp_path / "roles.json", tmp_path / "known.json"
+    write(roles, {"Backend": ["Python"]})
+    write(known, ["Python"])
+    service = CatalogService(roles, known)
+    version = service.get().version
+
+    roles.write_text('{"Backend": [')
+    assert not service.check()
+    assert service.get().version == version
+
+    write(roles, {"Backend": ["Python"], "Data": ["SQL"]})
+    assert service.check() and "Data" in service.get().roles
+
+
+def test_role_matrix_is_memory_mapped_and_reused(tmp_path):
+    roles = {"Backend": ["Python", "SQL"], "Data": ["Pandas"]}
+    builds = []
+
+    def build(roles_map):
+        builds.append(1)
+        skills = [s for r in roles_map for s in roles_map[r]]
+        vectors = np.eye(len(skills), 4, dtype=np.float32)
+        return RoleMatrix(roles=list(roles_map), skills=skills, offsets=np.array([0, 2, 3]), vectors=vectors)
+
+    first = load_or_build_role_matrix(roles, "v1", tmp_path, build)
+    assert isinstance(first.vectors, np.memmap) and not first.vectors.flags.writeable
+
+    # Another process (or snapshot) maps the same file instead of building
+    second = load_or_build_role_matrix(roles, "v1", tmp_path, build)
+    assert len(builds) == 1
+    assert second.skills == ["Python", "SQL", "Pandas"] and list(second.offsets) == [0, 2, 3]
+    assert np.array_equal(second.vectors, first.vectors)
+
+    # A new version keeps recent files, which workers on the old catalog may still open
+    load_or_build_role_matrix(roles, "v2", tmp_path, build)
+    assert len(builds) == 2 and sorted(p.name for p in tmp_path.iterdir()) == ["v1.npy", "v2.npy"]
+
+    # and removes old ones
+    day_ago = time.time() - 2 * 24 * 3600
+    os.utime(tmp_path / "v1.npy", (day_ago, day_ago))
+    load_or_build_role_matrix(roles, "v3", tmp_path, build)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["v2.npy", "v3.npy"]
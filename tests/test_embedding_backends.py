@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from backend.core.config import EMBEDDING_MODEL
+from backend.core.embedding_backends import OnnxBackend, TorchBackend, export_onnx
+from backend.core.parser import load_known_skills
+
+'''
+The ONNX int8 backend stays within a cosine bound of the reference torch model.
+
+'''
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")   # torch.onnx.export and quantize_dynamic
+pytest.importorskip("sentence_transformers")
+
+# Smallest cosine similarity allowed between the two backends' vectors for one skill
+MIN_COSINE = 0.98
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def test_onnx_backend_matches_torch(tmp_path):
+    skills = load_known_skills() + ["Prompt engineering", "k8s", "ML", "Data pipelines with Spark"]
+    reference = TorchBackend(EMBEDDING_MODEL).encode(skills)
+    onnx = OnnxBackend(EMBEDDING_MODEL, model_dir=export_onnx(EMBEDDING_MODEL, tmp_path)).encode(skills)
+
+    drift = cosine_rows(reference, onnx)
+    assert drift.min() >= MIN_COSINE, f"worst skill: {skills[int(drift.argmin())]} ({drift.min():.4f})"
+
+    # float16 storage adds almost nothing on top
+    stored = onnx.astype(np.float16).astype(np.float32)
+    assert cosine_rows(onnx, stored).min() >= 0.9999
+
+
+def test_missing_export_is_an_error_not_an_export(tmp_path):
+    with pytest.raises(FileNotFoundError, match="python -m backend.core.embedding_backends"):
+        OnnxBackend(EMBEDDING_MODEL, model_dir=tmp_path)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from backend.core.embedding_store import EmbeddingStore
+
+'''
+Persist, reload and invalidate the precomputed skill embedding store.
+
+'''
+
+class CountingEncoder:
+    # Deterministic stand-in for the model that records what it was asked to encode
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, items):
+        self.calls.append(list(items))
+        return np.array([[len(s), ord(s[0]), 1.0] for s in items], dtype=np.float32)
+
+
+def test_store_round_trip_and_staleness(tmp_path):
+    skills = ["Python", "SQL", "Docker"]
+    encoder = CountingEncoder()
+
+    store = EmbeddingStore.load_or_build(tmp_path, skills, encoder, {"model": "a"})
+    assert len(store) == 3 and len(encoder.calls) == 1
+
+    # Same fingerprint: loaded from disk (memory-mapped), model not called again
+    reloaded = EmbeddingStore.load_or_build(tmp_path, skills, encoder, {"model": "a"})
+    assert len(encoder.calls) == 1
+    assert isinstance(reloaded.vectors, np.memmap)
+
+    # Only unseen skills reach the encoder, once each
+    vecs = reloaded.lookup(["SQL", "Rust", "Python", "Rust"], encoder)
+    assert encoder.calls[-1] == ["Rust"]
+    assert np.allclose(vecs[0], [3, ord("S"), 1]) and np.allclose(vecs[1], vecs[3])
+
+    # A changed fingerprint (model or JSON hashes) forces a rebuild
+    EmbeddingStore.load_or_build(tmp_path, skills, encoder, {"model": "b"})
+    assert encoder.calls[-1] == skills
+
+
+def test_float16_store_round_trip(tmp_path):
+    encoder = CountingEncoder()
+    store = EmbeddingStore.load_or_build(tmp_path, ["Python", "SQL"], encoder, {"model": "a"}, dtype=np.float16)
+    reloaded = EmbeddingStore.load(tmp_path, {"model": "a"})
+
+    assert reloaded.vectors.dtype == np.float16
+    # Lookups still hand back float32 rows
+    vecs = reloaded.lookup(["SQL", "Python"], encoder)
+    assert vecs.dtype == np.float32 and np.allclose(vecs, store.vectors[[1, 0]])
+
+
+def test_concurrent_saves(tmp_path):
+    # Workers saving at once each write their own temporary files
+    skills = [f"skill {i}" for i in range(2000)]
+    store = EmbeddingStore.build(skills, CountingEncoder(), {"model": "a"})
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: store.save(tmp_path), range(16)))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["meta.json", "vectors.npy"]
+    reloaded = EmbeddingStore.load(tmp_path, {"model": "a"})
+    assert np.array_equal(reloaded.vectors, store.vectors)
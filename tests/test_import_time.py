@@ -0,0 +1,37 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+'''
+Importing the API must stay cheap: no model is loaded until it is needed.
+
+'''
+
+# Seconds allowed for `import backend.api.main`; override for slow CI runners
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", "3.0"))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import backend.api.main
+from backend.core import embedder, parser
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "models_loaded": [embedder.model_loaded(), embedder.store_loaded(), parser.nlp_loaded()],
+    "heavy_modules": [m for m in ("spacy", "sentence_transformers", "torch") if m in sys.modules],
+}))
+"""
+
+
+def test_api_import_is_fast_and_lazy():
+    # A fresh interpreter so nothing imported by other tests is already cached
+    root = Path(__file__).parent.parent
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=root, capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+
+    assert result["models_loaded"] == [False, False, False]
+    assert result["heavy_modules"] == []
+    assert result["seconds"] < IMPORT_TIME_BUDGET, f"import took {result['seconds']:.2f}s"
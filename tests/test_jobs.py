@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from backend.core.jobs import DONE, FAILED, JobQueue, QueueFull, SQLiteJobTable
+
+'''
+Job queue: partial results while running, failures, persistence and limits.
+
+'''
+
+
+def wait_for(queue, job_id, statuses=(DONE, FAILED), timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job stayed {job['status']}")
+
+
+def test_partial_results_then_done():
+    release = threading.Event()
+
+    def handler(payload, pdf, update):
+        update({"match_score": 50.0, "missing_skills": ["SQL"]})
+        release.wait(5)
+        update({"recommendations": {"courses": [payload["role"]]}})
+
+    queue = JobQueue(handler, workers=1)
+    queue.start()
+    try:
+        job_id = queue.submit({"role": "Data Scientist"}).id
+
+        # Score and missing skills are visible before the recommendations
+        deadline = time.monotonic() + 5
+        while "match_score" not in queue.get(job_id)["result"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        partial = queue.get(job_id)
+        assert partial["status"] == "running" and "recommendations" not in partial["result"]
+
+        release.set()
+        done = wait_for(queue, job_id)
+        assert done["status"] == DONE
+        assert done["result"] == {"match_score": 50.0, "missing_skills": ["SQL"], "recommendations": {"courses": ["Data Scientist"]}}
+    finally:
+        queue.stop()
+
+
+def test_failure_is_reported():
+    def handler(payload, pdf, update):
+        raise ValueError("broken PDF")
+
+    queue = JobQueue(handler, workers=1)
+    queue.start()
+    try:
+        job = wait_for(queue, queue.submit({}, b"%PDF").id)
+        assert job["status"] == FAILED and job["error"] == "broken PDF"
+    finally:
+        queue.stop()
+
+
+def test_handler_bug_fails_the_job_not_the_worker():
+    def handler(payload, pdf, update):
+        update({"match_score": payload["score"]})
+
+    queue = JobQueue(handler, workers=1)
+    queue.start()
+    try:
+        job = wait_for(queue, queue.submit({}).id)
+        assert job["status"] == FAILED and job["error"] == "'score'"
+        # The same worker still runs the next job
+        assert wait_for(queue, queue.submit({"score": 1.0}).id)["status"] == DONE
+    finally:
+        queue.stop()
+
+
+def test_queue_limit_and_restart_from_sqlite(tmp_path):
+    url = f"sqlite:///{tmp_path / 'jobs.db'}"
+    seen = []
+
+    def handler(payload, pdf, update):
+        seen.append(pdf)
+        update({"ok": True})
+
+    # Never started: jobs stay queued in the table
+    first = JobQueue(handler, max_queued=1, table=SQLiteJobTable(url))
+    job_id = first.submit({"role": "r"}, b"pdf-bytes").id
+    with pytest.raises(QueueFull):
+        first.submit({"role": "r"})
+
+    # A new process picks the unfinished job up again, PDF included
+    second = JobQueue(handler, table=SQLiteJobTable(url))
+    second.start()
+    try:
+        assert wait_for(second, job_id)["result"] == {"ok": True}
+        assert seen == [b"pdf-bytes"]
+    finally:
+        second.stop()
+
+    # Finished jobs remain pollable from the table
+    assert JobQueue(handler, table=SQLiteJobTable(url)).get(job_id)["status"] == DONE
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.core import llm_client, recommender
+from backend.core.lru import LRUCache
+from backend.core.rec_cache import RecommendationCache
+from backend.core.resilience import CircuitBreaker, RetryBudget
+
+'''
+Async LLM client against a local stub server: retries, timeouts, the circuit
+breaker and the fallback recommendations.
+
+'''
+
+RECS = {"courses": ["Intro to SQL"], "projects": ["Build a SQL dashboard"], "certifications": []}
+
+
+def completion(content: str) -> dict:
+    return {
+        "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+    }
+
+
+class StubServer:
+    # Answers /v1/chat/completions with scripted (status, body, delay) replies; the last one repeats
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("content-length", 0)))
+                stub.calls += 1
+                status, body, delay = stub.script.pop(0) if len(stub.script) > 1 else stub.script[0]
+                time.sleep(delay)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def close(self):
+        self.server.shutdown()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    servers = []
+
+    def start(script, failures=5, timeout=5.0, retries=3):
+        server = StubServer(script)
+        servers.append(server)
+        monkeypatch.setenv("OPENAI_API_KEY", "test")
+        monkeypatch.setattr(llm_client, "OPENAI_BASE_URL", server.url)
+        monkeypatch.setattr(llm_client, "LLM_TIMEOUT", timeout)
+        monkeypatch.setattr(llm_client, "LLM_MAX_RETRIES", retries)
+        monkeypatch.setattr(llm_client, "LLM_BACKOFF_BASE", 0.01)
+        monkeypatch.setattr(llm_client, "retry_budget", RetryBudget())
+        monkeypatch.setattr(llm_client, "breaker", CircuitBreaker(failures, reset_timeout=60))
+        monkeypatch.setattr(recommender, "_cache", RecommendationCache(LRUCache()))
+        llm_client._states.clear()
+        return server
+
+    yield start
+    llm_client._states.clear()
+    for server in servers:
+        server.close()
+
+
+def test_transient_errors_are_retried(stub):
+    server = stub([
+        (429, {"error": {"message": "slow down"}}, 0),
+        (500, {"error": {"message": "oops"}}, 0),
+        (200, completion(json.dumps(RECS)), 0),
+    ])
+
+    recs = asyncio.run(recommender.aget_recommendations(["SQL"]))
+    assert recs == RECS and not isinstance(recs, recommender.FallbackRecommendations)
+    assert server.calls == 3
+
+    # Cached now: no further calls
+    assert asyncio.run(recommender.aget_recommendations(["sql"])) == RECS
+    assert server.calls == 3
+
+
+def test_timeout_falls_back(stub):
+    server = stub([(200, completion(json.dumps(RECS)), 1.0)], timeout=0.2, retries=0)
+    recs = asyncio.run(recommender.aget_recommendations(["SQL"]))
+
+    assert isinstance(recs, recommender.FallbackRecommendations)
+    assert recs == {"courses": [], "projects": [], "certifications": []}
+    assert server.calls == 1
+
+
+def test_breaker_opens_and_fails_fast(stub):
+    server = stub([(500, {"error": {"message": "down"}}, 0)], failures=2)
+
+    first = asyncio.run(recommender.aget_recommendations(["SQL"]))
+    assert isinstance(first, recommender.FallbackRecommendations)
+    assert server.calls == 2  # one retry, then the breaker opened
+    assert llm_client.breaker.state == "open"
+
+    start = time.perf_counter()
+    second = asyncio.run(recommender.aget_recommendations(["Docker"]))
+    assert isinstance(second, recommender.FallbackRecommendations)
+    assert server.calls == 2
+    assert time.perf_counter() - start < 0.1
+
+    # Fallbacks are never cached
+    assert recommender.get_cache().get(recommender.recommendation_key(["SQL"], recommender.MODEL, recommender.PROMPT_VERSION)) is None
+
+
+class ThreadRecordingCache(RecommendationCache):
+    # Records which thread each lookup and store runs on
+    def __init__(self):
+        super().__init__(LRUCache())
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(threading.get_ident())
+        return super().get(key)
+
+    def set(self, key, value):
+        self.threads.append(threading.get_ident())
+        super().set(key, value)
+
+
+@pytest.mark.parametrize("mode", ["set", "per_skill"])
+def test_cache_calls_stay_off_the_event_loop(stub, monkeypatch, mode):
+    stub([(200, completion(json.dumps({"SQL": RECS} if mode == "per_skill" else RECS)), 0)])
+    cache = ThreadRecordingCache()
+    monkeypatch.setattr(recommender, "_cache", cache)
+
+    async def run():
+        loop_thread = threading.get_ident()
+        await recommender.aget_recommendations(["SQL"], mode=mode)   # miss, then stored
+        await recommender.aget_recommendations(["SQL"], mode=mode)   # hit
+        return loop_thread
+
+    loop_thread = asyncio.run(run())
+    assert len(cache.threads) >= 3 and loop_thread not in cache.threads
+
+
+def test_job_stores_fallback_instead_of_error_strings(stub, monkeypatch):
+    from backend.api import jobs
+    from backend.core.analyzer import SkillAnalysis
+
+    stub([(500, {"error": {"message": "down"}}, 0)], retries=0)
+    monkeypatch.setattr(jobs, "extract_user_skills_manual", lambda raw, known: ["Python"])
+    monkeypatch.setattr(jobs, "analyze_skills", lambda user, job: SkillAnalysis(score=50.0, missing=["SQL"], details={}))
+    role = next(iter(jobs.get_catalog().roles))
+
+    result = {}
+    jobs.run_analysis_job({"role": role, "manual_skills": "Python"}, None, result.update)
+    assert result["recommendations"] == {"courses": [], "projects": [], "certifications": []}
+    assert result["recommendations_fallback"] is True
+
+
+def test_partial_per_skill_reply_is_a_fallback(stub):
+    # The reply covers SQL but not Docker
+    stub([(200, completion(json.dumps({"SQL": RECS})), 0)])
+    recs = asyncio.run(recommender.aget_recommendations(["SQL", "Docker"], mode="per_skill"))
+    assert isinstance(recs, recommender.FallbackRecommendations)
+    assert recs["courses"] == RECS["courses"]
+
+
+def test_per_skill_reply_that_is_not_an_object_falls_back(stub):
+    stub([(200, completion(json.dumps([RECS])), 0)])
+    recs = asyncio.run(recommender.aget_recommendations(["SQL"], mode="per_skill"))
+    assert isinstance(recs, recommender.FallbackRecommendations)
+
+
+@pytest.mark.parametrize("mode", ["set", "per_skill"])
+def test_reply_without_content_falls_back(stub, mode):
+    # e.g. a refusal: the message has no content at all
+    reply = completion("")
+    reply["choices"][0]["message"]["content"] = None
+    stub([(200, reply, 0)])
+    recs = asyncio.run(recommender.aget_recommendations(["SQL"], mode=mode))
+    assert isinstance(recs, recommender.FallbackRecommendations)
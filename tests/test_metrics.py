@@ -0,0 +1,31 @@
+from backend.core.metrics import Counter, Histogram, Registry, server_timing
+
+'''
+Metrics: Prometheus text output and Server-Timing formatting.
+
+'''
+
+
+def test_render_counter_and_histogram():
+    registry = Registry()
+    hits = registry.register(Counter("hits_total", "Cache hits.", ("cache",)))
+    latency = registry.register(Histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0)))
+
+    hits.inc(cache="pdf")
+    hits.inc(2, cache="pdf")
+    latency.observe(0.05, stage="ner")
+    latency.observe(0.5, stage="ner")
+    latency.observe(5, stage="ner")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE hits_total counter" in lines
+    assert 'hits_total{cache="pdf"} 3' in lines
+    assert 'latency_seconds_bucket{stage="ner",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="ner",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{stage="ner",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{stage="ner"} 3' in lines
+
+
+def test_server_timing_sums_repeated_stages():
+    header = server_timing([("embed", 0.010), ("llm", 0.2), ("embed", 0.005)], total=0.3)
+    assert header == "embed;dur=15.0, llm;dur=200.0, total;dur=300.0"
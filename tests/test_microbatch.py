@@ -0,0 +1,70 @@
+import threading
+
+import numpy as np
+import pytest
+
+from backend.core import embedder
+from backend.core.microbatch import MicroBatcher
+
+'''
+Micro-batcher: concurrent submits share one call and each gets its own rows.
+
+'''
+
+
+def fake_encode(calls):
+    def encode(items):
+        calls.append(list(items))
+        return np.array([[len(s), ord(s[0])] for s in items], dtype=np.float32)
+    return encode
+
+
+def test_concurrent_submits_are_batched_and_deduplicated():
+    calls = []
+    batcher = MicroBatcher(fake_encode(calls), window=0.2)
+    requests = [["ml", "go"], ["go", "rust"], ["k8s"]]
+    results = [None] * len(requests)
+    start = threading.Barrier(len(requests))
+
+    def worker(i):
+        start.wait()
+        results[i] = batcher.submit(requests[i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(requests))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1 and sorted(calls[0]) == ["go", "k8s", "ml", "rust"]
+    for items, rows in zip(requests, results):
+        assert rows.tolist() == [[len(s), ord(s[0])] for s in items]
+
+    stats = batcher.stats()
+    assert stats["batches"] == 1 and stats["items"] == 4 and stats["batch_size"]["<=4"] == 1
+
+
+def test_errors_reach_every_caller_and_zero_window_calls_directly():
+    def broken(items):
+        raise RuntimeError("model down")
+
+    batcher = MicroBatcher(broken, window=0.01)
+    with pytest.raises(RuntimeError, match="model down"):
+        batcher.submit(["x"])
+
+    calls = []
+    direct = MicroBatcher(fake_encode(calls), window=0)
+    assert direct.submit(["a"]).shape == (1, 2) and calls == [["a"]]
+
+
+def test_embedder_cache_normalizes_whitespace(monkeypatch):
+    calls = []
+    monkeypatch.setattr(embedder, "encode", fake_encode(calls))
+    embedder._vector_cache.clear()
+
+    first = embedder.encode_cached(["Prompt  engineering", "ML"])
+    second = embedder.encode_cached([" Prompt engineering ", "ML", "ML"])
+
+    assert len(calls) == 1
+    assert np.array_equal(second, first[[0, 1, 1]])
+    assert embedder.embedding_stats()["cache"]["hits"] >= 3
@@ -1,4 +1,16 @@
-from backend.core.parser import normalize_skill, load_known_skills
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from backend.core import parser, skill_index
+from backend.core.embedder import get_embeddings
+from backend.core.parser import (
+    extract_user_skills_manual,
+    load_known_skills,
+    normalize_skill,
+)
+from backend.core.skill_index import get_skill_index
 
 '''
 Normalize a raw skill string to a consistent canonical form
@@ -22,3 +34,54 @@ def test_normalize_skill_variants():
         if raw == "K8s" and normalized == raw:
             continue
         assert normalized == expected, f"{raw} normalized to {normalized}, expected {expected}"
+
+
+def fake_embeddings(known, calls):
+    # One axis per known skill plus a spare one; "ML" and "K8s" lie close to
+    # their skills' axes, anything else on the spare axis
+    axes = {s: i for i, s in enumerate(known)}
+    near = {"ML": "Machine Learning", "K8s": "Kubernetes"}
+
+    def embed(skills):
+        calls.append(list(skills))
+        vecs = np.zeros((len(skills), len(known) + 1), dtype=np.float32)
+        for row, s in enumerate(skills):
+            if s in axes:
+                vecs[row, axes[s]] = 1.0
+            elif s in near:
+                vecs[row, axes[near[s]]], vecs[row, -1] = 0.9, 0.3
+            else:
+                vecs[row, -1] = 1.0
+        return vecs
+    return embed
+
+
+def test_semantic_normalize(monkeypatch):
+    known = load_known_skills()
+    calls = []
+    embed = fake_embeddings(known, calls)
+    monkeypatch.setattr(parser, "SEMANTIC_NORMALIZE", True)
+    monkeypatch.setattr(parser, "get_embeddings", embed)
+    monkeypatch.setattr(skill_index, "get_embeddings", embed)
+    monkeypatch.setattr(skill_index, "_indexes", OrderedDict())
+
+    # Only the index can resolve these; the spelling rules leave them unchanged
+    assert normalize_skill("ML", known) == "Machine Learning"
+    assert normalize_skill("K8s", known) == "Kubernetes"
+    # Below the cutoff: the input comes back as is
+    assert normalize_skill("Gardening", known) == "Gardening"
+
+    # Spelling rules run first; only what they miss is embedded, in one batch
+    calls.clear()
+    assert extract_user_skills_manual("pyhton, ML, Gardening", known) == ["Gardening", "Machine Learning", "Python"]
+    assert calls == [["ML", "Gardening"]]
+
+
+def test_semantic_normalize_with_model(monkeypatch):
+    pytest.importorskip("sentence_transformers")
+    known = load_known_skills()
+    monkeypatch.setattr(parser, "SEMANTIC_NORMALIZE", True)
+
+    [[(nearest, _)]] = get_skill_index(known).search(get_embeddings(["ML"]), k=1)
+    assert nearest == "Machine Learning"
+    assert normalize_skill("Underwater basket weaving", known) == "Underwater basket weaving"
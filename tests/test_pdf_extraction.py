@@ -0,0 +1,42 @@
+import fitz
+import pytest
+
+from backend.core import parser
+from backend.core.parser import PDFLimitError, extract_pdf, iter_pdf_pages
+
+'''
+PDF text extraction: page-by-page output, limits and the text cache.
+
+'''
+
+
+def make_pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"Page {i} Python SQL")
+    return doc.tobytes()
+
+
+def test_pages_stream_in_order_with_timings():
+    pages = list(iter_pdf_pages(make_pdf(3)))
+    assert [p.number for p in pages] == [0, 1, 2]
+    assert all("Python" in p.text and p.seconds >= 0 for p in pages)
+
+
+def test_limits_raise(monkeypatch):
+    with pytest.raises(PDFLimitError):
+        list(iter_pdf_pages(make_pdf(3), max_pages=2))
+    with pytest.raises(PDFLimitError):
+        list(iter_pdf_pages(make_pdf(2), time_limit=-1))
+
+    monkeypatch.setattr(parser, "MAX_PDF_BYTES", 10)
+    with pytest.raises(PDFLimitError):
+        list(iter_pdf_pages(make_pdf(1)))
+
+
+def test_identical_bytes_hit_the_text_cache():
+    pdf = make_pdf(2)
+    first = extract_pdf(pdf)
+    second = extract_pdf(pdf)
+    assert not first.cached and len(first.page_seconds) == 2
+    assert second.cached and second.text == first.text and second.sha256 == first.sha256
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from backend.core.lru import LRUCache
+from backend.core.rec_cache import RecommendationCache, SQLiteTier, recommendation_key
+
+'''
+Recommendation cache: key normalization, tiers, TTL, single flight and failures.
+
+'''
+
+RECS = {"courses": ["Intro to Pandas"], "projects": [], "certifications": []}
+
+
+def test_key_ignores_order_case_and_duplicates():
+    a = recommendation_key(["SQL", "Pandas"], "gpt", "1")
+    assert a == recommendation_key([" pandas", "sql", "SQL"], "gpt", "1")
+    assert a != recommendation_key(["SQL", "Pandas"], "gpt", "2")
+    assert a != recommendation_key(["SQL", "Pandas"], "other-model", "1")
+
+
+def test_tiers_ttl_and_failures(tmp_path):
+    now = [1000.0]
+
+    def clock():
+        return now[0]
+
+    url = f"sqlite:///{tmp_path / 'recs.db'}"
+
+    cache = RecommendationCache(LRUCache(ttl=60, clock=clock), SQLiteTier(url, ttl=60, clock=clock))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return RECS
+
+    assert cache.get_or_compute("k", compute) == RECS
+    assert cache.get_or_compute("k", compute) == RECS
+    assert len(calls) == 1
+
+    # A fresh process only has the SQLite tier
+    restarted = RecommendationCache(LRUCache(ttl=60, clock=clock), SQLiteTier(url, ttl=60, clock=clock))
+    assert restarted.get("k") == RECS
+    assert restarted.stats()["disk_hits"] == 1
+
+    # Both tiers expire
+    now[0] += 61
+    assert restarted.get("k") is None and cache.get("k") is None
+
+    # Failures propagate and are never stored
+    def broken():
+        raise ValueError("not JSON")
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute("bad", broken)
+    assert cache.get("bad") is None
+
+
+def test_concurrent_misses_share_one_call():
+    cache = RecommendationCache(LRUCache())
+    calls = []
+    release = threading.Event()
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return RECS
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", slow))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [RECS] * 5
+    assert cache.stats()["misses"] == 1 and cache.stats()["coalesced"] == 4
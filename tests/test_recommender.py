@@ -1,3 +1,9 @@
+import json
+from types import SimpleNamespace
+
+from backend.core import recommender
+from backend.core.lru import LRUCache
+from backend.core.rec_cache import RecommendationCache
 from backend.core.recommender import get_recommendations
 
 '''
@@ -22,4 +28,30 @@ def test_get_recommendations_returns_expected_structure():
 
     # At least one recommendation should exist for CI sanity check
     total_recs = sum(len(v) for v in recommendations.values())
-    assert total_recs > 0, "Expected at least one recommendation"
\ No newline at end of file
+    assert total_recs > 0, "Expected at least one recommendation"
+
+class FakeChat:
+    # Stands in for client.chat.completions and answers per-skill prompts
+    def __init__(self):
+        self.requests = []
+
+    def create(self, messages, **kwargs):
+        skills = messages[-1]["content"].split(": ", 1)[1].rstrip(".").split(", ")
+        self.requests.append(skills)
+        reply = {s: {"courses": [f"Learn {s}"], "projects": [f"Build with {s}"], "certifications": []} for s in skills}
+        message = SimpleNamespace(content=json.dumps(reply))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_per_skill_mode_only_requests_uncached_skills(monkeypatch):
+    chat = FakeChat()
+    monkeypatch.setattr(recommender, "_client", SimpleNamespace(chat=SimpleNamespace(completions=chat)))
+    monkeypatch.setattr(recommender, "_cache", RecommendationCache(LRUCache()))
+
+    first = get_recommendations(["Pandas", "SQL"], mode="per_skill")
+    second = get_recommendations(["SQL", "Docker"], mode="per_skill")
+
+    # One batched request per call, and SQL is not asked for twice
+    assert chat.requests == [["Pandas", "SQL"], ["Docker"]]
+    assert first["courses"] == ["Learn Pandas", "Learn SQL"]
+    assert second["projects"] == ["Build with SQL", "Build with Docker"]
@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from backend.api import response_cache as rc
+from backend.api import routes
+from backend.api.main import app
+from backend.core.analyzer import SkillAnalysis
+from backend.core.catalog import get_catalog
+from backend.core.recommender import FallbackRecommendations
+
+'''
+/api/analyze response cache: repeats skip the pipeline, ETag / If-None-Match
+give 304, and fallback recommendations are never cached.
+
+'''
+
+RECS = {"courses": ["Learn Docker"], "projects": [], "certifications": []}
+
+
+def fake_pipeline(monkeypatch, recs=RECS):
+    calls = []
+
+    def parse(pdf_bytes, known):
+        calls.append("parse")
+        return ["Python"]
+
+    def manual(raw, known):
+        calls.append("manual")
+        return ["Python", "SQL"]
+
+    def analyze(user, job):
+        calls.append("analyze")
+        return SkillAnalysis(score=50.0, missing=["Docker"], details={})
+
+    async def recommend(missing):
+        calls.append("recommend")
+        return recs
+
+    monkeypatch.setattr(routes, "parse_resume", parse)
+    monkeypatch.setattr(routes, "extract_user_skills_manual", manual)
+    monkeypatch.setattr(routes, "analyze_skills", analyze)
+    monkeypatch.setattr(routes, "aget_recommendations", recommend)
+    monkeypatch.setattr(routes, "get_candidate_store", lambda: SimpleNamespace(add=lambda *args: True))
+    monkeypatch.setattr(rc, "_cache", None)
+    return calls
+
+
+def test_repeats_are_served_from_cache(monkeypatch):
+    calls = fake_pipeline(monkeypatch)
+    client = TestClient(app)
+    role = next(iter(get_catalog().roles))
+
+    first = client.post("/api/analyze", data={"role": role, "manual_skills": "Python, SQL"})
+    assert first.status_code == 200 and first.headers["x-cache"] == "miss"
+    etag = first.headers["etag"]
+    assert calls == ["manual", "analyze", "recommend"]
+
+    # Order, spacing and repeated skills do not matter
+    again = client.post("/api/analyze", data={"role": role, "manual_skills": " SQL ,Python, SQL"})
+    assert again.headers["x-cache"] == "hit" and again.headers["etag"] == etag
+    assert again.json() == first.json()
+    assert len(calls) == 3
+
+    # The client already has it
+    not_modified = client.post("/api/analyze", data={"role": role, "manual_skills": "Python, SQL"}, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+
+    # Same PDF bytes: parsed once
+    pdf = {"file": ("resume.pdf", b"%PDF-1.4 fake", "application/pdf")}
+    client.post("/api/analyze", data={"role": role}, files=pdf)
+    client.post("/api/analyze", data={"role": role}, files=pdf)
+    assert calls.count("parse") == 1
+
+
+def test_key_covers_role_catalog_and_input():
+    base = rc.analysis_key(None, "Python, SQL", "Data Scientist", "v1")
+    assert base == rc.analysis_key(None, " SQL,Python ,SQL", "Data Scientist", "v1")
+    # Unknown skills keep their spelling, so case is part of the key
+    assert base != rc.analysis_key(None, "python, sql", "Data Scientist", "v1")
+    assert base != rc.analysis_key(None, "Python, SQL", "ML Engineer", "v1")
+    assert base != rc.analysis_key(None, "Python, SQL", "Data Scientist", "v2")
+    assert rc.analysis_key(b"a", None, "Data Scientist", "v1") != rc.analysis_key(b"b", None, "Data Scientist", "v1")
+
+
+def test_fallbacks_are_not_cached(monkeypatch):
+    calls = fake_pipeline(monkeypatch, FallbackRecommendations(courses=[], projects=[], certifications=[]))
+    client = TestClient(app)
+    role = next(iter(get_catalog().roles))
+
+    for _ in range(2):
+        r = client.post("/api/analyze", data={"role": role, "manual_skills": "Python"})
+        assert r.status_code == 200 and "etag" not in r.headers
+        assert r.json()["recommendations_fallback"] is True
+    assert calls.count("recommend") == 2
+
+
+def test_stream_shares_the_cache(monkeypatch):
+    calls = fake_pipeline(monkeypatch)
+    client = TestClient(app)
+    role = next(iter(get_catalog().roles))
+
+    streamed = client.post("/api/analyze/stream", data={"role": role, "manual_skills": "Python, SQL"})
+    assert len(calls) == 3
+
+    # /analyze and a second stream are both hits, and the replayed events are identical
+    assert client.post("/api/analyze", data={"role": role, "manual_skills": "Python, SQL"}).headers["x-cache"] == "hit"
+    replayed = client.post("/api/analyze/stream", data={"role": role, "manual_skills": "Python, SQL"})
+    assert replayed.headers["x-cache"] == "hit" and replayed.text == streamed.text
+    assert len(calls) == 3
@@ -0,0 +1,75 @@
+import os
+import signal
+
+import numpy as np
+import pytest
+
+from backend.core import embedder
+from backend.serve import memory_report, parse_smaps_rollup
+
+'''
+Prefork server helpers: the per-worker memory report, and forked workers
+reusing the model the parent preloaded.
+
+'''
+
+SMAPS = """\
+00400000-7fff5e9d5000 ---p 00000000 00:00 0                              [rollup]
+Rss:              204800 kB
+Pss:              102400 kB
+Shared_Clean:      81920 kB
+Shared_Dirty:      20480 kB
+Private_Clean:     10240 kB
+Private_Dirty:     92160 kB
+Swap:                  0 kB
+"""
+
+
+def test_parse_smaps_rollup():
+    assert parse_smaps_rollup(SMAPS) == {
+        "Rss": 204800, "Pss": 102400, "Shared_Clean": 81920,
+        "Shared_Dirty": 20480, "Private_Clean": 10240, "Private_Dirty": 92160,
+    }
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="needs Linux /proc")
+def test_memory_report_for_running_processes():
+    report = memory_report([os.getpid(), 2**22 + 1])   # the second pid does not exist
+    assert [r["pid"] for r in report] == [os.getpid()]
+    me = report[0]
+    assert me["rss_mb"] > 0 and me["pss_mb"] <= me["rss_mb"]
+    assert me["shared_mb"] == pytest.approx(me["rss_mb"] - me["pss_mb"], abs=0.2)
+
+
+class CountingBackend:
+    loads = 0
+
+    def __init__(self, *args):
+        CountingBackend.loads += 1
+        self.pid = os.getpid()
+
+    def encode(self, items):
+        return np.ones((len(items), 4), dtype=np.float32)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+def test_forked_worker_reuses_preloaded_model(monkeypatch):
+    monkeypatch.setattr(embedder, "load_backend", CountingBackend)
+    monkeypatch.setattr(embedder, "_model", None)
+    model = embedder.get_model()                        # what preload() does in the parent
+    embedder.encode_cached(["parent warm-up skill"])    # starts the batcher thread (if batching is on)
+
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            signal.alarm(10)   # a batcher waiting on the parent's dead thread would hang
+            vectors = embedder.encode_cached(["skill only the child sees"])
+            same = embedder.get_model() is model and model.pid != os.getpid()
+            code = 0 if same and CountingBackend.loads == 1 and vectors.shape == (1, 4) else 1
+        finally:
+            os._exit(code)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert CountingBackend.loads == 1
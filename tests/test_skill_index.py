@@ -0,0 +1,68 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from backend.core import skill_index
+from backend.core.skill_index import SkillIndex, get_skill_index
+
+'''
+Skill index: blocked search agrees with brute force, and inserts are incremental.
+
+'''
+
+
+def brute_force(vocab: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    v = vocab / np.linalg.norm(vocab, axis=1, keepdims=True)
+    q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return np.argsort(-(q @ v.T), axis=1)[:, :k]
+
+
+def test_blocked_search_matches_brute_force():
+    rng = np.random.default_rng(0)
+    vocab = rng.normal(size=(500, 16)).astype(np.float32)
+    queries = rng.normal(size=(20, 16)).astype(np.float32)
+    skills = [f"skill-{i}" for i in range(len(vocab))]
+
+    index = SkillIndex.from_vectors(skills, vocab, block_rows=64)
+    hits = index.search(queries, k=5)
+
+    expected = brute_force(vocab, queries, 5)
+    assert [[skill for skill, _ in row] for row in hits] == [[skills[j] for j in row] for row in expected]
+    assert all(row[0][1] >= row[-1][1] for row in hits)
+
+
+def test_incremental_add_and_cutoff():
+    index = SkillIndex(dim=2)
+    assert index.search(np.array([1.0, 0.0]), k=3) == [[]]
+
+    index.add(["East"], np.array([[1.0, 0.0]]))
+    index.add(["North", "East"], np.array([[0.0, 2.0], [-1.0, 0.0]]))  # "East" keeps its first vector
+    assert len(index) == 2 and "North" in index
+
+    assert index.nearest(np.array([[0.9, 0.1], [0.1, 0.9], [-1.0, -1.0]]), cutoff=0.8) == ["East", "North", None]
+    for i in range(100):
+        index.add([f"extra-{i}"], np.array([[-1.0, -1.0]]))
+    assert index.nearest(np.array([[-1.0, -1.0]]), cutoff=0.99)[0].startswith("extra-")
+
+
+def test_new_vocabulary_only_embeds_new_skills(monkeypatch):
+    calls = []
+
+    def embed(skills):
+        calls.append(list(skills))
+        return np.array([[len(s), ord(s[0]), 1.0] for s in skills], dtype=np.float32)
+
+    monkeypatch.setattr(skill_index, "get_embeddings", embed)
+    monkeypatch.setattr(skill_index, "_indexes", OrderedDict())
+
+    first = get_skill_index(["Python", "SQL"])
+    assert get_skill_index(["Python", "SQL"]) is first and calls == [["Python", "SQL"]]
+
+    # The catalog grew: the same index, extended with the new skill only
+    grown = get_skill_index(["Python", "SQL", "Docker"])
+    assert grown is first and len(grown) == 3 and calls[-1] == ["Docker"]
+
+    # A skill was removed: a new index from the stored rows, nothing embedded
+    shrunk = get_skill_index(["Python", "Docker"])
+    assert shrunk is not grown and "SQL" not in shrunk and len(calls) == 2
+    assert get_skill_index(["Python", "SQL"]) is not first   # the grown index no longer stands for it
@@ -0,0 +1,60 @@
+import difflib
+import json
+import random
+import re
+
+from backend.core.config import KNOWN_SKILLS_PATH
+from backend.core.matcher import SkillMatcher, get_matcher
+
+'''
+The compiled matcher must agree with the linear scans it replaced.
+
+'''
+
+KNOWN = json.loads(KNOWN_SKILLS_PATH.read_text())
+
+
+def linear_normalize(raw, known_skills, cutoff=0.7):
+    # The original normalize_skill: exact, substring, then difflib over everything
+    word = raw.strip()
+    if not word:
+        return word
+    lw = word.lower()
+    known_lc = [s.lower() for s in known_skills]
+    for skill in known_skills:
+        if skill.lower() == lw:
+            return skill
+    for skill in known_skills:
+        if skill.lower() in lw:
+            return skill
+    match = difflib.get_close_matches(lw, known_lc, n=1, cutoff=cutoff)
+    return known_skills[known_lc.index(match[0])] if match else word
+
+
+def test_normalize_matches_linear_scan():
+    matcher = SkillMatcher(KNOWN)
+    samples = ["pyhton", "docker-compose", "Javascript", "Machine-Learn", "K8s", "seql",
+               "javscript", "  Postgres ", "azure devops pipelines", "reactjs", "", "node"]
+
+    # Plus random typos of every known skill
+    rng = random.Random(0)
+    for skill in KNOWN:
+        chars = list(skill)
+        i = rng.randrange(len(chars))
+        chars[i] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        samples.append("".join(chars))
+
+    for raw in samples:
+        assert matcher.normalize(raw) == linear_normalize(raw, KNOWN), raw
+
+
+def test_find_all_uses_word_boundaries():
+    matcher = get_matcher(KNOWN)
+    text = "Built CI/CD with GitHub Actions and Azure DevOps; pythonic REST APIs in Node.js, some SQL."
+
+    expected = {s for s in KNOWN if re.search(r"\b" + re.escape(s) + r"\b", text, re.IGNORECASE)}
+    assert matcher.find_all(text) == expected
+    assert "Git" not in expected and "Python" not in expected and "Azure DevOps" in expected
+
+    # The matcher is cached per vocabulary
+    assert get_matcher(list(KNOWN)) is matcher
@@ -0,0 +1,40 @@
+from backend.core.matcher import SkillMatcher
+from backend.core.parser import (
+    _chunks,
+    _use_ner,
+    extract_skills,
+    extract_skills_batch,
+    load_known_skills,
+)
+
+'''
+Skill extraction modes: chunking, when NER is needed, and the batch path.
+
+'''
+
+TEXTS = [
+    "Built dashboards in Power BI and pipelines with Python and SQL.",
+    "Docker and Kubernetes on AWS; some machine learning with TensorFlow.",
+    "",
+]
+
+
+def test_chunks_cover_text_without_splitting_words():
+    text = "\n".join(f"line {i} with python and sql" for i in range(200))
+    chunks = list(_chunks(text, size=100))
+    assert "".join(chunks) == text
+    assert all(len(c) <= 100 for c in chunks)
+    assert all(c.endswith("\n") for c in chunks[:-1])
+
+
+def test_auto_mode_only_runs_ner_for_punctuated_skills():
+    assert not _use_ner(SkillMatcher(["Python", "Power BI"]), None)
+    assert _use_ner(SkillMatcher(["Python", "C++"]), None)
+    assert _use_ner(SkillMatcher(["Python"]), True)
+
+
+def test_batch_matches_single_text_extraction():
+    known = load_known_skills()
+    singles = [extract_skills(t, known, ner=False) for t in TEXTS]
+    assert extract_skills_batch(TEXTS, known, ner=False) == singles
+    assert "Python" in singles[0]